@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data pipeline on synthetic OWID-shaped inputs.
+
+Generates number-of-estimated-paralytic-polio-cases-by-world-region.csv and
+polio-vaccine-coverage-of-one-year-olds.csv lookalikes (same columns, regional
+aggregate rows, OWID_WRL world row) at multiples of the current ~8k rows, then
+times each stage and records throughput and peak traced memory (tracemalloc,
+measured in a separate run so tracing does not distort the timings):
+
+  load_csv        parse the case CSV (no cache)
+  binning         assign bins to every case value
+  year_export     dedupe, bin and write all year_YYYY.csv files
+  case_counts     build the year x country matrix, write .bin and .json
+  regional        build regional_polio_data and the aggregate_regions grouping totals
+  regional_csv    the same on the csv_core (standard library) engine, up to
+                  CSV_ENGINE_MAX_SCALE (the engine never runs on inputs that large)
+  integrity       validate the generated DataFiles; peak memory is the largest
+                  max RSS of the worker processes (including pages shared with
+                  the parent after fork), not the parent's traced heap
+
+Results are compared against WorkingFiles/Benchmarks/baseline.json (committed,
+recorded at scales 1,10,100,1000); --save-baseline replaces it, so record it
+with all four scales. The default run stops at 100x because 1000x (8.8M rows)
+takes about 12 minutes and peaks near 5 GB while generating the inputs; pass
+--scales 1,10,100,1000 to include it.
+
+Usage:
+  python benchmark_pipeline.py                        # scales 1,10,100
+  python benchmark_pipeline.py --scales 1,10,100,1000 # include 1000x
+  python benchmark_pipeline.py --scales 1,10,100,1000 --save-baseline
+  python benchmark_pipeline.py --tolerance 0.3        # fail if >30% slower than baseline
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from binning import load_bin_table, assign_bins
+from check_integrity import run_checks
+from create_case_counts_lookup import build_matrix, extract_case_rows, write_binary, write_json
+from csv_core import read_columns
+from metrics import run_main
+from prepare_regional_data import build_regional_data, build_regional_data_lite, CASES_COLUMN, VACCINATION_COLUMN
+from process_complete_polio_dataset import build_year_frames, write_year_files
+from regional_aggregation import (aggregate_regions, aggregate_regions_lite, load_region_mappings,
+                                  load_region_mappings_lite)
+from source_data import parse_csv
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+BENCHMARK_DIR = SCRIPT_DIR.parent / "Benchmarks"
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+
+BASE_COUNTRIES = 201
+YEARS = np.arange(1980, 2024)
+VACCINATION_YEARS = np.arange(1981, 2025)
+REGIONS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+VACCINATION_ONLY_REGIONS = ['Africa (WHO)', 'Americas (WHO)', 'Europe (WHO)',
+                            'High-income countries', 'Low-income countries']
+
+# Timings are best-of-REPEAT; differences below NOISE_FLOOR_S are never regressions
+REPEAT = 3
+NOISE_FLOOR_S = 0.05
+# The csv engine holds every parsed row as Python lists (~600 MB at 100x) and
+# is only chosen below csv_core.FAST_PATH_MAX_BYTES, so larger scales skip it
+CSV_ENGINE_MAX_SCALE = 100
+
+# MARK: - Synthetic data
+
+def synthetic_codes(n):
+    """AAA..ZZZ first (like ISO3), then 8-character S0000001-style codes"""
+    letters = (''.join(p) for p in itertools.product(string.ascii_uppercase, repeat=3))
+    codes = list(itertools.islice(letters, n))
+    codes += [f"S{i:07d}" for i in range(len(codes), n)]
+    return codes
+
+def generate_inputs(scale, out_dir, seed=0):
+    """Write case and vaccination CSVs for scale x the current country count"""
+    rng = np.random.default_rng(seed)
+    n = BASE_COUNTRIES * scale
+    codes = np.array(synthetic_codes(n))
+    entities = np.char.add("Country ", codes)
+    region_of = rng.integers(0, len(REGIONS), n)
+
+    # Cases: log-normal, shrinking over time, with more zero years later on
+    code_idx = np.repeat(np.arange(n), len(YEARS))
+    years = np.tile(YEARS, n)
+    t = (years - YEARS[0]) / (YEARS[-1] - YEARS[0])
+    cases = rng.lognormal(mean=6 - 5 * t, sigma=2.0)
+    cases[rng.random(len(cases)) < 0.2 + 0.7 * t] = 0
+    whole = rng.random(len(cases)) > 0.035  # ~3.5% fractional, like the real export
+    cases = np.where(whole, np.round(cases), np.round(cases, 3))
+
+    countries = pd.DataFrame({'Entity': entities[code_idx], 'Code': codes[code_idx],
+                              'Year': years, CASES_COLUMN: cases})
+    countries['region'] = region_of[code_idx]
+    by_region = countries.groupby(['region', 'Year'])[CASES_COLUMN].sum().reset_index()
+    regions = pd.DataFrame({'Entity': np.array(REGIONS)[by_region['region']], 'Code': None,
+                            'Year': by_region['Year'], CASES_COLUMN: by_region[CASES_COLUMN]})
+    world_sum = countries.groupby('Year')[CASES_COLUMN].sum()
+    world = pd.DataFrame({'Entity': 'World', 'Code': 'OWID_WRL', 'Year': world_sum.index,
+                          CASES_COLUMN: world_sum.to_numpy()})
+    cases_df = pd.concat([countries.drop(columns='region'), regions, world], ignore_index=True)
+    cases_df = cases_df.sort_values(['Entity', 'Year'], kind='stable')
+    cases_file = out_dir / "number-of-estimated-paralytic-polio-cases-by-world-region.csv"
+    cases_df.to_csv(cases_file, index=False)
+
+    # Vaccination: rising coverage from 1981 on, regions and WHO groupings have no code
+    v_idx = np.repeat(np.arange(n), len(VACCINATION_YEARS))
+    v_years = np.tile(VACCINATION_YEARS, n)
+    vt = (v_years - VACCINATION_YEARS[0]) / (VACCINATION_YEARS[-1] - VACCINATION_YEARS[0])
+    coverage = np.clip(20 + 75 * vt + rng.normal(0, 8, len(v_years)), 0, 99).round(2)
+    vacc_countries = pd.DataFrame({'Entity': entities[v_idx], 'Code': codes[v_idx],
+                                   'Year': v_years, VACCINATION_COLUMN: coverage})
+    group_names = REGIONS + VACCINATION_ONLY_REGIONS
+    g_years = np.tile(VACCINATION_YEARS, len(group_names))
+    vacc_groups = pd.DataFrame({
+        'Entity': np.repeat(group_names, len(VACCINATION_YEARS)), 'Code': None, 'Year': g_years,
+        VACCINATION_COLUMN: np.clip(20 + 75 * (g_years - 1981) / 43, 0, 99).round(1)})
+    vacc_world = pd.DataFrame({'Entity': 'World', 'Code': 'OWID_WRL', 'Year': VACCINATION_YEARS,
+                               VACCINATION_COLUMN: np.linspace(22, 85, len(VACCINATION_YEARS)).round(0)})
+    vacc_df = pd.concat([vacc_countries, vacc_groups, vacc_world], ignore_index=True)
+    vacc_file = out_dir / "polio-vaccine-coverage-of-one-year-olds.csv"
+    vacc_df.to_csv(vacc_file, index=False)
+
+    # Region table for the grouping pass: one continent per country, population weights
+    pd.DataFrame({'Code': codes, 'Population': rng.integers(10**4, 10**8, n),
+                  'continent': np.array(REGIONS)[region_of]}).to_csv(out_dir / "country_regions.csv", index=False)
+
+    # Reference files the integrity check needs
+    pd.DataFrame({'Code': codes, 'Entity': entities}).to_csv(out_dir / "countries.csv", index=False)
+    centroids = {code: [round(float(x), 6), round(float(y), 6)]
+                 for code, x, y in zip(codes, rng.random(n), rng.random(n))}
+    with open(out_dir / "centroids.json", 'w') as f:
+        json.dump(centroids, f)
+    (out_dir / "bins.csv").write_bytes((DATA_DIR / "bins.csv").read_bytes())
+    return cases_file, vacc_file
+
+# MARK: - Measurement
+
+def measure(fn, rows=None, repeat=REPEAT):
+    """
+    Time fn untraced (best of `repeat` runs), then run it once more under
+    tracemalloc for peak memory (tracing slows Python-heavy code, so it must
+    not skew the timing). Returns (result, metrics); rows defaults to len(result).
+    """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if rows is None:
+        rows = len(result)
+    return result, {
+        'seconds': round(elapsed, 4),
+        'rows': int(rows),
+        'rows_per_s': round(rows / elapsed) if elapsed > 0 else None,
+        'peak_mb': round(peak / 2**20, 2),
+    }
+
+def run_scale(scale, work_dir, jobs=None):
+    """Generate inputs for one scale and time every stage"""
+    input_dir = work_dir / f"scale_{scale}"
+    output_dir = input_dir / "DataFiles"
+    output_dir.mkdir(parents=True)
+    cases_file, vacc_file = generate_inputs(scale, input_dir)
+    for name in ("countries.csv", "centroids.json", "bins.csv"):
+        (input_dir / name).replace(output_dir / name)
+
+    stages = {}
+    df, stages['load_csv'] = measure(lambda: parse_csv(cases_file))
+    rows = len(df)
+    vacc_df = parse_csv(vacc_file)
+
+    table = load_bin_table(output_dir / "bins.csv")
+    values = df[CASES_COLUMN].to_numpy(dtype=np.float64)
+    _, stages['binning'] = measure(lambda: assign_bins(values, table))
+
+    df_countries = df[df['Code'].notna()]
+    def year_export():
+        frames = build_year_frames(df_countries, table)
+        return write_year_files(frames, output_dir=output_dir)
+    _, stages['year_export'] = measure(year_export, len(df_countries))
+
+    def case_counts():
+        years, codes, matrix = build_matrix(extract_case_rows(df))
+        write_binary(years, codes, matrix, output_dir / "case_counts.bin")
+        write_json(years, codes, matrix, output_dir / "case_counts.json")
+    _, stages['case_counts'] = measure(case_counts, rows)
+
+    mappings_file = input_dir / "country_regions.csv"
+    mappings = load_region_mappings(mappings_file)
+    def regional():
+        build_regional_data(df, vacc_df)
+        return aggregate_regions(df, vacc_df, mappings, CASES_COLUMN, VACCINATION_COLUMN)
+    _, stages['regional'] = measure(regional, rows + len(vacc_df))
+
+    if scale <= CSV_ENGINE_MAX_SCALE:
+        columns = read_columns(cases_file, [CASES_COLUMN])
+        vacc_columns = read_columns(vacc_file, [VACCINATION_COLUMN])
+        mappings_lite = load_region_mappings_lite(mappings_file)
+        def regional_csv():
+            build_regional_data_lite(columns, vacc_columns)
+            return aggregate_regions_lite(columns, vacc_columns, mappings_lite, CASES_COLUMN, VACCINATION_COLUMN)
+        _, stages['regional_csv'] = measure(regional_csv, rows + len(vacc_df))
+        del columns, vacc_columns
+    else:
+        print(f"  Skipping regional_csv above {CSV_ENGINE_MAX_SCALE}x")
+    # The integrity workers fork from this process; drop the inputs first
+    del df, vacc_df, df_countries, values
+
+    year_files = len(list(output_dir.glob("year_*.csv")))
+    report, stages['integrity'] = measure(lambda: run_checks(output_dir, jobs), year_files)
+    # The year files are checked in worker processes, which tracemalloc cannot see
+    stages['integrity']['parent_peak_mb'] = stages['integrity']['peak_mb']
+    if report['worker_max_rss_bytes'] is not None:
+        stages['integrity']['peak_mb'] = round(report['worker_max_rss_bytes'] / 2**20, 2)
+    if not report['ok']:
+        print(f"  WARNING: integrity check reported {len(report['errors'])} errors at scale {scale}")
+
+    return {'scale': scale, 'rows': rows, 'stages': stages}
+
+# MARK: - Baseline comparison
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions: stages slower than baseline by more than tolerance"""
+    base = {(r['scale'], stage): m for r in baseline['results'] for stage, m in r['stages'].items()}
+    regressions = []
+    for result in results:
+        for stage, metrics in result['stages'].items():
+            reference = base.get((result['scale'], stage))
+            if reference is None:
+                continue
+            slower = metrics['seconds'] - reference['seconds']
+            ratio = metrics['seconds'] / reference['seconds'] if reference['seconds'] else float('inf')
+            if ratio > 1 + tolerance and slower > NOISE_FLOOR_S:
+                regressions.append({'scale': result['scale'], 'stage': stage,
+                                    'seconds': metrics['seconds'], 'baseline': reference['seconds'],
+                                    'ratio': round(ratio, 2)})
+    return regressions
+
+def print_results(results):
+    print(f"\n{'scale':>6} {'stage':<12} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak MB':>9}")
+    for result in results:
+        for stage, m in result['stages'].items():
+            rate = f"{m['rows_per_s']:,}" if m['rows_per_s'] else "-"
+            print(f"{result['scale']:>5}x {stage:<12} {m['rows']:>10,} {m['seconds']:>9.3f} {rate:>12} {m['peak_mb']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data")
+    parser.add_argument('--scales', default="1,10,100", help="Comma-separated multiples of the current data size")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes for the integrity check")
+    parser.add_argument('--output', type=Path, default=None, help="Write results JSON to this path")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help="Baseline results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(',') if s]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="polio_bench_") as tmp:
+        for scale in scales:
+            print(f"Benchmarking {scale}x ({BASE_COUNTRIES * scale:,} countries)...")
+            results.append(run_scale(scale, Path(tmp), args.jobs))
+
+    print_results(results)
+    run = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions vs {args.baseline.name}:")
+            for r in regressions:
+                print(f"  {r['scale']}x {r['stage']}: {r['seconds']:.3f}s vs {r['baseline']:.3f}s ({r['ratio']}x)")
+            sys.exit(1)
+        print(f"\n✅ No regressions vs {args.baseline.name} (tolerance {args.tolerance:.0%})")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Vectorized bin assignment for polio case values.
+
+Compiles bins.csv (bin, edge_max, height_m, color_hex) into sorted NumPy edge
+arrays once, then assigns bins, heights and colors to whole columns with a
+single searchsorted pass instead of scanning the bin table per value.
+
+Bin semantics:
+  - NaN or 0 -> bin 0
+  - value <= edge_max of the first matching bin -> that bin
+  - a bin with an empty edge_max is open-ended and catches everything above
+  - values above the last finite edge fall into the highest bin
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics import run_main
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+BINS_FILE = SCRIPT_DIR.parent.parent / "DataFiles" / "bins.csv"
+
+@dataclass(frozen=True)
+class BinTable:
+    """Compiled bin definitions, indexed by position in the bins.csv file"""
+    bins: np.ndarray        # int bin ids, file order
+    heights: np.ndarray     # float height_m per bin
+    colors: np.ndarray      # object array of color_hex per bin
+    edges: np.ndarray       # sorted finite upper edges for bins > 0
+    edge_bins: np.ndarray   # bin id for each slot returned by searchsorted
+
+    def __len__(self):
+        return len(self.bins)
+
+def comment_lines(path):
+    """Line numbers of '#' comment lines (design_bins.py writes one at the top)"""
+    with open(path, encoding='utf-8') as f:
+        return [i for i, line in enumerate(f) if line.startswith('#')]
+
+def load_bin_table(path=BINS_FILE):
+    """Load bins.csv and compile it into a BinTable"""
+    # Not comment='#': color_hex values start with '#' too
+    return compile_bins(pd.read_csv(path, skiprows=comment_lines(path)))
+
+def compile_bins(bins_df):
+    """Compile a bins DataFrame into sorted edge arrays"""
+    bins_df = bins_df.sort_values('bin', kind='stable').reset_index(drop=True)
+    bins = bins_df['bin'].to_numpy(dtype=np.int64)
+    if len(bins) == 0 or bins[0] != 0:
+        raise ValueError("bins.csv must define bin 0 for empty/zero values")
+
+    # Bins above 0 are matched in file order; the first empty edge_max is
+    # the open-ended top bin and nothing after it can be reached.
+    positive = bins_df[bins_df['bin'] > 0]
+    edge_max = positive['edge_max'].to_numpy(dtype=np.float64)
+    open_ended = np.flatnonzero(np.isnan(edge_max))
+    cut = open_ended[0] if len(open_ended) else len(edge_max)
+
+    edges = edge_max[:cut]
+    if np.any(np.diff(edges) <= 0):
+        raise ValueError(f"bins.csv edge_max values must be strictly increasing: {edges.tolist()}")
+
+    positive_bins = positive['bin'].to_numpy(dtype=np.int64)
+    if len(positive_bins) == 0:
+        raise ValueError("bins.csv must define at least one bin above 0")
+    # searchsorted returns len(edges) for values above the last finite edge;
+    # that slot maps to the open-ended bin if present, else the highest bin.
+    overflow_bin = positive_bins[cut] if len(open_ended) else bins[-1]
+    edge_bins = np.append(positive_bins[:cut], overflow_bin)
+
+    return BinTable(
+        bins=bins,
+        heights=bins_df['height_m'].to_numpy(dtype=np.float64),
+        colors=bins_df['color_hex'].to_numpy(dtype=object),
+        edges=edges,
+        edge_bins=edge_bins,
+    )
+
+def assign_bins(values, table):
+    """Return the bin id for every value in one vectorized pass"""
+    values = np.asarray(values, dtype=np.float64)
+    slots = np.searchsorted(table.edges, values, side='left')
+    result = table.edge_bins[slots]
+    result[np.isnan(values) | (values == 0)] = 0
+    return result
+
+def bin_positions(bin_ids, table):
+    """Map bin ids to row positions in the table (for height/color lookups)"""
+    return np.searchsorted(table.bins, bin_ids)
+
+def assign_heights(values, table):
+    """Return height_m for every value"""
+    return table.heights[bin_positions(assign_bins(values, table), table)]
+
+def assign_colors(values, table):
+    """Return color_hex for every value"""
+    return table.colors[bin_positions(assign_bins(values, table), table)]
+
+def apply_bins(df, column, table, prefix=''):
+    """Add Bin, height_m and color_hex columns for df[column] in one pass"""
+    bin_ids = assign_bins(df[column].to_numpy(dtype=np.float64, na_value=np.nan), table)
+    positions = bin_positions(bin_ids, table)
+    df = df.copy()
+    df[f'{prefix}Bin'] = bin_ids
+    df[f'{prefix}height_m'] = table.heights[positions]
+    df[f'{prefix}color_hex'] = table.colors[positions]
+    return df
+
+def main():
+    table = load_bin_table()
+    print(f"Loaded {len(table)} bins from {BINS_FILE}")
+    print(f"Finite edges: {table.edges.tolist()}")
+    samples = [np.nan, 0, 1, 10, 11, 100, 270000, 1_000_000]
+    for value, bin_id in zip(samples, assign_bins(samples, table)):
+        print(f"  {value!r:>10} -> bin {bin_id}")
+
+if __name__ == "__main__":
+    run_main(main)
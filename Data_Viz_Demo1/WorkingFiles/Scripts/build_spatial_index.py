@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Build a spatial hit-test index over centroids.json for map picking.
+
+Two structures are precomputed and written to DataFiles/centroid_index.bin:
+
+  KD-tree  an implicit 2-d tree (points reordered so every range's median is
+           its splitting node) for exact nearest-centroid queries
+  Grid     a fixed-resolution raster holding the nearest code index for each
+           cell center, so a pointer position resolves with one array read
+
+Distances are measured on the map plane, which is twice as wide as it is tall,
+so normalized x differences are scaled by ASPECT. Grid cells farther than
+max_distance (in map heights) from every centroid map to no country.
+
+centroid_index.bin layout (little-endian):
+
+  Header (32 bytes)
+    magic         4s   b'PIDX'
+    version       u16
+    code_width    u16  bytes per code
+    code_count    u32
+    grid_width    u32
+    grid_height   u32
+    cell_bytes    u8   1 or 2 (uint8 / uint16 cells)
+    (3 bytes padding)
+    aspect        f32
+    max_distance  f32
+  Codes:  code_count x code_width ASCII codes, NUL-padded, sorted
+  Points: code_count x (x f32, y f32), in code order
+  Tree:   code_count x u32 code indices in implicit KD-tree order
+  Grid:   grid_height x grid_width cells, row-major from the north-west
+          corner; the largest cell value (0xFF / 0xFFFF) means no country
+
+Usage:
+  python build_spatial_index.py                # build and verify the index
+  python build_spatial_index.py --benchmark    # compare linear scan, KD-tree, grid
+"""
+
+import argparse
+import json
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from metrics import run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+CENTROIDS_FILE = OUTPUT_DIR / "centroids.json"
+INDEX_FILE = OUTPUT_DIR / "centroid_index.bin"
+
+MAGIC = b'PIDX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIB3xff')
+MIN_CODE_WIDTH = 8
+
+ASPECT = 2.0
+GRID_WIDTH = 1024
+GRID_HEIGHT = 512
+MAX_DISTANCE = 0.05
+GRID_BUDGET = 1 << 22
+BAND_ROWS = 8
+
+def load_centroids(path=CENTROIDS_FILE):
+    """Sorted codes and an (n, 2) float32 array of normalized positions"""
+    with open(path) as f:
+        centroids = json.load(f)
+    codes = sorted(centroids)
+    points = np.array([centroids[code] for code in codes], dtype=np.float32).reshape(-1, 2)
+    return codes, points
+
+def scaled(points, aspect=ASPECT):
+    """Normalized coordinates -> map-plane coordinates (height = 1)"""
+    points = np.asarray(points, dtype=np.float64)
+    return np.column_stack([points[..., 0] * aspect, points[..., 1]])
+
+# MARK: - KD-tree
+
+def build_kdtree(points):
+    """
+    Order point indices so that for every range [lo, hi) the median element
+    (lo + hi) // 2 splits the range on axis depth % 2.
+    """
+    order = np.arange(len(points), dtype=np.uint32)
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= 1:
+            continue
+        mid = (lo + hi) // 2
+        axis = depth % 2
+        segment = order[lo:hi]
+        order[lo:hi] = segment[np.argpartition(points[segment, axis], mid - lo)]
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    return order
+
+def kdtree_nearest(tree, x, y, max_d2=float('inf')):
+    """
+    Nearest point to (x, y) in scaled coordinates. tree is the list of scaled
+    (x, y) points in KD-tree order; returns (tree position, squared distance),
+    or (-1, max_d2) if no point is closer than max_d2.
+    """
+    best, best_d2 = -1, max_d2
+    stack = [(0, len(tree), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if lo >= hi:
+            continue
+        mid = (lo + hi) // 2
+        px, py = tree[mid]
+        d2 = (px - x) ** 2 + (py - y) ** 2
+        if d2 < best_d2:
+            best, best_d2 = mid, d2
+        diff = (x - px) if depth % 2 == 0 else (y - py)
+        near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+        # Visit the far side only if the splitting plane is closer than the best so far
+        if diff * diff < best_d2:
+            stack.append((*far, depth + 1))
+        stack.append((*near, depth + 1))
+    return best, best_d2
+
+# MARK: - Grid
+
+def cell_centers(width, height):
+    """Normalized (x, y) of every cell center, row-major from the north-west corner"""
+    xs = (np.arange(width) + 0.5) / width
+    ys = (np.arange(height) + 0.5) / height
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    return np.column_stack([grid_x.ravel(), grid_y.ravel()])
+
+def nearest_indices(points, queries, budget=GRID_BUDGET):
+    """Brute-force nearest point for many queries (chunked to bound memory)"""
+    nearest = np.zeros(len(queries), dtype=np.int64)
+    distance = np.full(len(queries), np.inf)
+    if not len(points):
+        return nearest, distance
+    chunk = max(1, budget // len(points))
+    px, py = points[:, 0], points[:, 1]
+    for start in range(0, len(queries), chunk):
+        block = queries[start:start + chunk]
+        d2 = (block[:, :1] - px) ** 2 + (block[:, 1:] - py) ** 2
+        idx = d2.argmin(axis=1)
+        nearest[start:start + chunk] = idx
+        distance[start:start + chunk] = np.sqrt(d2[np.arange(len(block)), idx])
+    return nearest, distance
+
+def build_grid(points, width=GRID_WIDTH, height=GRID_HEIGHT, aspect=ASPECT, max_distance=MAX_DISTANCE):
+    """Nearest code index per cell, no_code where nothing is within max_distance"""
+    cell_dtype = np.uint8 if len(points) < np.iinfo(np.uint8).max else np.uint16
+    no_code = np.iinfo(cell_dtype).max
+    if len(points) >= no_code:
+        raise ValueError(f"Too many points for a uint16 grid: {len(points)}")
+
+    map_points = scaled(points, aspect)
+    centers = scaled(cell_centers(width, height), aspect)
+    grid = np.full(width * height, no_code, dtype=cell_dtype)
+    # One band of rows at a time: only points within max_distance of the band
+    # can be picked from it, so dense point sets stay cheap
+    for row in range(0, height, BAND_ROWS):
+        cells = slice(row * width, min(row + BAND_ROWS, height) * width)
+        band = centers[cells]
+        near = np.flatnonzero((map_points[:, 1] >= band[0, 1] - max_distance)
+                              & (map_points[:, 1] <= band[-1, 1] + max_distance))
+        if not len(near):
+            continue
+        nearest, distance = nearest_indices(map_points[near], band)
+        grid[cells] = np.where(distance <= max_distance, near[nearest], no_code)
+    return grid.reshape(height, width)
+
+# MARK: - Binary asset
+
+def write_index(codes, points, order, grid, path=INDEX_FILE, aspect=ASPECT, max_distance=MAX_DISTANCE):
+    code_width = max([MIN_CODE_WIDTH] + [len(code.encode('ascii')) for code in codes])
+    height, width = grid.shape
+    header = HEADER.pack(MAGIC, VERSION, code_width, len(codes), width, height,
+                         grid.dtype.itemsize, aspect, max_distance)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(np.array(codes, dtype=f'S{code_width}').tobytes())
+        f.write(np.asarray(points, dtype='<f4').tobytes())
+        f.write(order.astype('<u4').tobytes())
+        f.write(grid.astype(grid.dtype.newbyteorder('<')).tobytes())
+
+class SpatialIndex:
+    """Pointer picking over a memory-mapped centroid_index.bin"""
+
+    def __init__(self, path=INDEX_FILE):
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        (magic, version, code_width, code_count, self.grid_width, self.grid_height,
+         cell_bytes, self.aspect, self.max_distance) = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} spatial index")
+        codes_end = HEADER.size + code_count * code_width
+        points_end = codes_end + code_count * 8
+        tree_end = points_end + code_count * 4
+        grid_end = tree_end + self.grid_width * self.grid_height * cell_bytes
+        if grid_end > len(raw):
+            raise ValueError(f"{path} is truncated ({len(raw)} < {grid_end} bytes)")
+
+        self.codes = [c.decode('ascii') for c in raw[HEADER.size:codes_end].view(f'S{code_width}')]
+        self.points = raw[codes_end:points_end].view('<f4').reshape(-1, 2)
+        self.order = raw[points_end:tree_end].view('<u4')
+        cell_dtype = '<u1' if cell_bytes == 1 else '<u2'
+        self.grid = raw[tree_end:grid_end].view(cell_dtype).reshape(self.grid_height, self.grid_width)
+        self.no_code = np.iinfo(cell_dtype).max
+        # Scaled float64 copies for exact queries (code_count x 2, tiny)
+        self._scaled = scaled(self.points, self.aspect)
+        self._tree = self._scaled[self.order].tolist()
+        self._tree_codes = [self.codes[i] for i in self.order]
+
+    def cell(self, x, y):
+        col = min(max(int(x * self.grid_width), 0), self.grid_width - 1)
+        row = min(max(int(y * self.grid_height), 0), self.grid_height - 1)
+        return row, col
+
+    def lookup(self, x, y):
+        """O(1) pick: code for the grid cell under normalized (x, y), or None"""
+        value = int(self.grid[self.cell(x, y)])
+        return None if value == self.no_code else self.codes[value]
+
+    def lookup_many(self, xy):
+        """Vectorized lookup for an (n, 2) array; returns code indices (-1 = none)"""
+        xy = np.asarray(xy, dtype=np.float64)
+        cols = np.clip((xy[:, 0] * self.grid_width).astype(np.int64), 0, self.grid_width - 1)
+        rows = np.clip((xy[:, 1] * self.grid_height).astype(np.int64), 0, self.grid_height - 1)
+        values = self.grid[rows, cols].astype(np.int64)
+        values[values == self.no_code] = -1
+        return values
+
+    def nearest(self, x, y, max_distance=None):
+        """Exact nearest code via the KD-tree, or None beyond max_distance"""
+        if not self.codes:
+            return None
+        limit = self.max_distance if max_distance is None else max_distance
+        # Seeding the search with the pick radius prunes most of the tree
+        position, _ = kdtree_nearest(self._tree, x * self.aspect, y, np.nextafter(limit * limit, np.inf))
+        return self._tree_codes[position] if position >= 0 else None
+
+def verify_index(index, codes, points, samples=2000, seed=0):
+    """Check the asset against a brute-force scan; returns a list of errors"""
+    errors = []
+    if index.codes != codes:
+        errors.append("Code dictionary does not match centroids.json")
+    if not np.array_equal(index.points, points):
+        errors.append("Stored points do not match centroids.json")
+
+    rng = np.random.default_rng(seed)
+    queries = rng.random((samples, 2))
+    _, expected = nearest_indices(index._scaled, scaled(queries, index.aspect))
+    found = np.array([np.sqrt(kdtree_nearest(index._tree, x * index.aspect, y)[1])
+                      for x, y in queries])
+    # Compare distances, not codes, so equidistant ties do not count as errors
+    mismatches = np.count_nonzero(~np.isclose(found, expected))
+    if mismatches:
+        errors.append(f"KD-tree disagreed with brute force on {mismatches}/{samples} queries")
+
+    # Grid cells must hold the centroid nearest to their center
+    rows = rng.integers(0, index.grid_height, samples)
+    cols = rng.integers(0, index.grid_width, samples)
+    centers = np.column_stack([(cols + 0.5) / index.grid_width, (rows + 0.5) / index.grid_height])
+    _, expected = nearest_indices(index._scaled, scaled(centers, index.aspect))
+    values = index.grid[rows, cols].astype(np.int64)
+    picked = values != index.no_code
+    if np.any(expected[~picked] <= index.max_distance * (1 - 1e-6)):
+        errors.append("Grid has no country for cells within max_distance of a centroid")
+    got = np.hypot(*(scaled(index.points[values[picked]], index.aspect)
+                     - scaled(centers[picked], index.aspect)).T)
+    wrong = np.count_nonzero(~np.isclose(got, expected[picked], rtol=1e-4, atol=1e-6))
+    if wrong:
+        errors.append(f"Grid cells disagree with brute force for {wrong}/{samples} sampled cells")
+    return errors
+
+def build(centroids_file=CENTROIDS_FILE, path=INDEX_FILE, width=GRID_WIDTH, height=GRID_HEIGHT,
+          max_distance=MAX_DISTANCE):
+    with step('load') as s:
+        codes, points = load_centroids(centroids_file)
+        s.record_read(centroids_file)
+        s.rows_out = len(codes)
+    start = time.perf_counter()
+    with step('kdtree', rows_in=len(codes)):
+        order = build_kdtree(scaled(points))
+    with step('grid', rows_in=len(codes)) as s:
+        grid = build_grid(points, width, height, max_distance=max_distance)
+        s.rows_out = grid.size
+    with step('write') as s:
+        write_index(codes, points, order, grid, path, max_distance=max_distance)
+        s.record_write(path)
+    return codes, points, time.perf_counter() - start
+
+# MARK: - Benchmark
+
+def linear_nearest(codes, points, x, y, aspect=ASPECT):
+    """What picking costs without an index: scan every centroid"""
+    best, best_d2 = None, float('inf')
+    for code, (px, py) in zip(codes, points):
+        d2 = ((px - x) * aspect) ** 2 + (py - y) ** 2
+        if d2 < best_d2:
+            best, best_d2 = code, d2
+    return best
+
+def synthetic_points(count, seed=0):
+    """Admin-1 scale point cloud: clusters around land-like latitudes"""
+    rng = np.random.default_rng(seed)
+    centers = rng.random((max(1, count // 20), 2)) * [1.0, 0.6] + [0.0, 0.15]
+    points = centers[rng.integers(0, len(centers), count)] + rng.normal(0, 0.01, (count, 2))
+    points = np.clip(points, 0.0, 1.0).astype(np.float32)
+    codes = [f"P{i:06d}" for i in range(count)]
+    return codes, points
+
+def benchmark(queries=2000, sizes=(None, 5000), seed=1):
+    import tempfile
+    rng = np.random.default_rng(seed)
+    pointer = rng.random((queries, 2))
+    print(f"{'points':>8} {'build':>8} {'linear':>10} {'kdtree':>10} {'grid':>10} {'size':>9}")
+    for size in sizes:
+        codes, points = load_centroids() if size is None else synthetic_points(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "index.bin"
+            start = time.perf_counter()
+            write_index(codes, points, build_kdtree(scaled(points)), build_grid(points), path)
+            build_s = time.perf_counter() - start
+            index = SpatialIndex(path)
+            timings = {}
+            # Convert once outside the timed loop, so "linear" times only the scan
+            point_list = points.tolist()
+            for name, pick in (("linear", lambda x, y: linear_nearest(codes, point_list, x, y)),
+                               ("kdtree", index.nearest),
+                               ("grid", index.lookup)):
+                start = time.perf_counter()
+                for x, y in pointer:
+                    pick(x, y)
+                timings[name] = (time.perf_counter() - start) / queries * 1e6
+            size_kb = path.stat().st_size / 1024
+            del index
+        print(f"{len(codes):>8} {build_s:>7.2f}s {timings['linear']:>8.1f}µs {timings['kdtree']:>8.1f}µs "
+              f"{timings['grid']:>8.1f}µs {size_kb:>7.1f}KB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the centroid hit-test index")
+    parser.add_argument('--grid-width', type=int, default=GRID_WIDTH)
+    parser.add_argument('--grid-height', type=int, default=GRID_HEIGHT)
+    parser.add_argument('--max-distance', type=float, default=MAX_DISTANCE,
+                        help="Pick radius in map heights; farther cells map to no country")
+    parser.add_argument('--benchmark', action='store_true', help="Time picking strategies and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+
+    codes, points, elapsed = build(width=args.grid_width, height=args.grid_height,
+                                   max_distance=args.max_distance)
+    print(f"Indexed {len(codes)} centroids on a {args.grid_width}x{args.grid_height} grid in {elapsed:.2f}s")
+    print(f"File size: {INDEX_FILE.stat().st_size / 1024:.1f} KB")
+
+    with step('verify'):
+        errors = verify_index(SpatialIndex(), codes, points)
+    if errors:
+        print("\n❌ Spatial index verification failed:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Spatial index matches brute-force nearest-centroid picks")
+
+if __name__ == "__main__":
+    run_main(main)
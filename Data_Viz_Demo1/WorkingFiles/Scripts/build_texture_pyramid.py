@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Build a mip/tile pyramid for the map texture and size-capped panel images.
+
+MapScene decodes world_equirect.png (4089x2048) at full size however far away
+the map is, and the chart panels decode 1920x1080 backgrounds for a window a
+fraction of that size. This stage writes pre-filtered copies to Textures/ at
+the repository root, outside the synchronized Data_Viz_Demo1 group so they are
+not bundled into the app, and gitignored. It is offline tooling only: no Swift
+code reads Textures/, and run_pipeline.py runs it only when named (textures):
+
+  world_equirect_L{level}_r{row}_c{col}.png  TILE_SIZE tiles of each level
+  {image}_{cap}.png                         panel images, long edge <= cap
+  texture_manifest.json                     sizes, tile bounds, source hashes
+
+Level 0 is the map at its source size, tiled without resampling; every further
+level halves it (rounding up) until the whole map fits in one tile. A pixel of
+level L averages a 2^L x 2^L block of source pixels (fewer at the right and
+bottom edges), in linear light on premultiplied alpha: sRGB is decoded, the
+block averaged and the result re-encoded. Averaging sRGB values directly would
+darken thin bright features (coastlines, labels). Panel variants are
+Lanczos-resampled the same way.
+
+Tile bounds are given both as normalized map coordinates [x0, y0, x1, y1]
+(the centroids.json convention, (0, 0) = north-west corner) and as
+[west, south, east, north] degrees.
+
+Each worker process receives the decoded map once; every tile is then
+filtered and encoded by its own task, alongside the panel variants. The
+manifest records each source's SHA-256 and the settings it was built with;
+sources whose hash and settings match, and whose files all exist, are skipped.
+
+Usage:
+  python build_texture_pyramid.py              # build changed sources only
+  python build_texture_pyramid.py --force      # rebuild everything
+  python build_texture_pyramid.py --jobs 1     # no worker processes
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from metrics import run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+APP_DIR = SCRIPT_DIR.parent.parent
+ASSETS_DIR = APP_DIR / "Assets.xcassets"
+OUTPUT_DIR = APP_DIR.parent / "Textures"
+MANIFEST_FILE = OUTPUT_DIR / "texture_manifest.json"
+MAP_SOURCE = ASSETS_DIR / "world_equirect.imageset" / "world_equirect.png"
+PANEL_PATTERNS = ["polioimage*.imageset/*.png", "timelineimage*.imageset/*.png"]
+
+VERSION = 2
+TILE_SIZE = 512
+PANEL_CAPS = (1280, 640)
+
+# sRGB byte -> linear light, and linear light in 1/65535 steps -> sRGB byte
+# (fine enough that no byte is skipped even at the steep dark end of the curve)
+SRGB_TO_LINEAR = np.where(np.arange(256) <= 10, np.arange(256) / 255 / 12.92,
+                          ((np.arange(256) / 255 + 0.055) / 1.055) ** 2.4).astype(np.float32)
+_LINEAR = np.arange(65536) / 65535
+LINEAR_TO_SRGB = np.rint(255 * np.where(_LINEAR <= 0.0031308, _LINEAR * 12.92,
+                                        1.055 * _LINEAR ** (1 / 2.4) - 0.055)).astype(np.uint8)
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a source image"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# MARK: - Filtering
+
+def srgb_pixels(image):
+    """PIL image -> uint8 H x W x C: RGB for opaque images, RGBA when any pixel is transparent"""
+    pixels = np.asarray(image.convert('RGBA'))
+    return pixels[..., :3] if (pixels[..., 3] == 255).all() else pixels
+
+def linearize(pixels):
+    """srgb_pixels() output -> float32 linear light (RGBA premultiplied)"""
+    if pixels.shape[-1] == 3:
+        return SRGB_TO_LINEAR[pixels]
+    alpha = pixels[..., 3:].astype(np.float32) / 255
+    return np.concatenate([SRGB_TO_LINEAR[pixels[..., :3]] * alpha, alpha], axis=-1)
+
+def to_linear(image):
+    return linearize(srgb_pixels(image))
+
+def to_srgb(linear):
+    """to_linear() output -> uint8 sRGB RGB(A)"""
+    if linear.shape[-1] == 3:
+        return LINEAR_TO_SRGB[np.rint(np.clip(linear, 0, 1) * 65535).astype(np.uint16)]
+    alpha = linear[..., 3:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rgb = np.where(alpha > 0, linear[..., :3] / alpha, 0)
+    srgb = LINEAR_TO_SRGB[np.rint(np.clip(rgb, 0, 1) * 65535).astype(np.uint16)]
+    return np.concatenate([srgb, np.rint(alpha * 255).astype(np.uint8)], axis=-1)
+
+def resample(linear, size):
+    """Lanczos resample of every channel to size = (width, height)"""
+    if (linear.shape[1], linear.shape[0]) == tuple(size):
+        return linear
+    channels = [np.asarray(Image.fromarray(np.ascontiguousarray(linear[..., c]), 'F')
+                           .resize(size, Image.Resampling.LANCZOS)) for c in range(linear.shape[-1])]
+    return np.clip(np.stack(channels, axis=-1), 0, 1)
+
+def block_mean(linear, factor):
+    """Box filter over factor x factor blocks; partial blocks at the edges average the pixels they have"""
+    h, w, c = linear.shape
+    out_h, out_w = -(-h // factor), -(-w // factor)
+    padded = np.zeros((out_h * factor, out_w * factor, c), np.float32)
+    padded[:h, :w] = linear
+    sums = padded.reshape(out_h, factor, out_w, factor, c).sum(axis=(1, 3))
+    rows = np.minimum(factor, h - np.arange(out_h) * factor)
+    cols = np.minimum(factor, w - np.arange(out_w) * factor)
+    return sums / (rows[:, None] * cols[None, :])[..., None]
+
+def level_sizes(width, height, tile_size=TILE_SIZE):
+    """Level sizes from the source size, halving (rounding up) until the whole image fits in one tile"""
+    sizes = [(width, height)]
+    while max(sizes[-1]) > tile_size and min(sizes[-1]) > 1:
+        sizes.append((-(-sizes[-1][0] // 2), -(-sizes[-1][1] // 2)))
+    return sizes
+
+def capped_size(width, height, cap):
+    scale = cap / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def tile_bounds(x, y, w, h, level_w, level_h):
+    """Normalized [x0, y0, x1, y1] and [west, south, east, north] of a pixel rect"""
+    x0, y0, x1, y1 = x / level_w, y / level_h, (x + w) / level_w, (y + h) / level_h
+    return ([round(v, 6) for v in (x0, y0, x1, y1)],
+            [round(v, 6) for v in (x0 * 360 - 180, 90 - y1 * 180, x1 * 360 - 180, 90 - y0 * 180)])
+
+# MARK: - Workers
+
+# The decoded map (srgb_pixels), set once per worker by init_map
+_map_pixels = None
+
+def init_map(pixels):
+    global _map_pixels
+    _map_pixels = pixels
+
+def write_png(path, pixels):
+    """Encode one tile or panel variant"""
+    Image.fromarray(pixels).save(path)
+    return Path(path).name
+
+def build_tile(path, level, rect):
+    """Filter and encode one tile of a level from the source pixels; runs in a worker"""
+    x, y, w, h = rect
+    factor = 1 << level
+    source = _map_pixels[y * factor:(y + h) * factor, x * factor:(x + w) * factor]
+    # Level 0 is the source itself; a round trip through linear light would only add rounding
+    pixels = source if level == 0 else to_srgb(block_mean(linearize(source), factor))
+    return write_png(path, np.ascontiguousarray(pixels))
+
+def build_panel(source, caps, output_dir):
+    """Write every capped variant of one panel image; runs in a worker"""
+    with Image.open(source) as image:
+        linear = to_linear(image)
+    height, width = linear.shape[:2]
+    variants = []
+    for cap in caps:
+        if cap >= max(width, height):
+            continue
+        size = capped_size(width, height, cap)
+        path = Path(output_dir) / f"{Path(source).stem}_{cap}.png"
+        write_png(path, to_srgb(resample(linear, size)))
+        variants.append({'cap': cap, 'size': list(size), 'file': path.name})
+    return {'source': str(Path(source).relative_to(APP_DIR)), 'size': [width, height], 'variants': variants}
+
+# MARK: - Building
+
+def map_tasks(source, width, height, output_dir, tile_size=TILE_SIZE):
+    """(manifest entry, [(path, level, rect), ...]) for the map pyramid, one task per tile"""
+    name = Path(source).stem
+    entry = {'source': str(Path(source).relative_to(APP_DIR)), 'size': [width, height],
+             'tile_size': tile_size, 'levels': []}
+    tasks = []
+    for level, (level_w, level_h) in enumerate(level_sizes(width, height, tile_size)):
+        tiles = []
+        for row, y in enumerate(range(0, level_h, tile_size)):
+            for col, x in enumerate(range(0, level_w, tile_size)):
+                rect = [x, y, min(tile_size, level_w - x), min(tile_size, level_h - y)]
+                tile_file = output_dir / f"{name}_L{level}_r{row}_c{col}.png"
+                tasks.append((tile_file, level, rect))
+                uv, degrees = tile_bounds(*rect, level_w, level_h)
+                tiles.append({'file': tile_file.name, 'row': row, 'col': col,
+                              'rect': rect, 'uv': uv, 'bounds': degrees})
+        entry['levels'].append({'level': level, 'size': [level_w, level_h], 'tiles': tiles})
+    return entry, tasks
+
+def entry_files(entry):
+    """Every output file a manifest entry refers to"""
+    files = [tile['file'] for level in entry.get('levels', []) for tile in level['tiles']]
+    files += [variant['file'] for variant in entry.get('variants', [])]
+    return files
+
+def is_current(recorded, digest, settings, output_dir):
+    return (recorded is not None and recorded.get('sha256') == digest and recorded.get('settings') == settings
+            and all((output_dir / f).exists() for f in entry_files(recorded)))
+
+def load_manifest(path=MANIFEST_FILE):
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest if manifest.get('version') == VERSION else {}
+
+def build(map_source=MAP_SOURCE, panel_sources=None, output_dir=OUTPUT_DIR, tile_size=TILE_SIZE,
+          caps=PANEL_CAPS, jobs=None, force=False):
+    """Rebuild changed sources; returns (manifest, names of rebuilt sources, files written)"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = output_dir / MANIFEST_FILE.name
+    previous = load_manifest(manifest_file)
+    if panel_sources is None:
+        panel_sources = sorted(p for pattern in PANEL_PATTERNS for p in ASSETS_DIR.glob(pattern))
+
+    map_settings, panel_settings = {'tile_size': tile_size}, {'caps': list(caps)}
+    map_hash = file_hash(map_source)
+    panel_hashes = {Path(p).stem: (Path(p), file_hash(p)) for p in panel_sources}
+    previous_panels = previous.get('panels', {})
+    map_stale = force or not is_current(previous.get('map'), map_hash, map_settings, output_dir)
+    stale_panels = [name for name, (_, digest) in panel_hashes.items()
+                    if force or not is_current(previous_panels.get(name), digest, panel_settings, output_dir)]
+
+    # Decoded once here and handed to each worker, which filters whole tiles
+    map_pixels = None
+    if map_stale:
+        with Image.open(map_source) as image:
+            map_pixels = srgb_pixels(image)
+
+    workers = jobs or os.cpu_count() or 1
+    pool_type = ProcessPoolExecutor if workers > 1 else ThreadPoolExecutor
+    written = []
+    with pool_type(max_workers=workers, initializer=init_map, initargs=(map_pixels,)) as pool:
+        panel_futures = {name: pool.submit(build_panel, panel_hashes[name][0], caps, output_dir)
+                         for name in stale_panels}
+        map_entry, writes = previous.get('map'), []
+        if map_stale:
+            height, width = map_pixels.shape[:2]
+            entry, tasks = map_tasks(map_source, width, height, output_dir, tile_size)
+            map_entry = {'sha256': map_hash, 'settings': map_settings, **entry}
+            writes = [pool.submit(build_tile, path, level, rect) for path, level, rect in tasks]
+            written.extend(path for path, _, _ in tasks)
+        panels = {}
+        for name, (_, digest) in panel_hashes.items():
+            if name in panel_futures:
+                panels[name] = {'sha256': digest, 'settings': panel_settings, **panel_futures[name].result()}
+                written.extend(output_dir / variant['file'] for variant in panels[name]['variants'])
+            else:
+                panels[name] = previous_panels[name]
+        for write in writes:
+            write.result()
+
+    # Files an older build produced that no current entry refers to
+    manifest = {'version': VERSION, 'map': map_entry, 'panels': panels}
+    current = {f for entry in [map_entry, *panels.values()] for f in entry_files(entry)}
+    for old in [previous.get('map') or {}, *previous_panels.values()]:
+        for f in entry_files(old):
+            if f not in current and (output_dir / f).exists():
+                (output_dir / f).unlink()
+
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    rebuilt = ([Path(map_source).stem] if map_stale else []) + stale_panels
+    return manifest, rebuilt, written
+
+# MARK: - Validation
+
+def validate(output_dir=OUTPUT_DIR):
+    """Check every manifest file exists with the recorded size and tiles cover each level exactly"""
+    errors = []
+    output_dir = Path(output_dir)
+    manifest = load_manifest(output_dir / MANIFEST_FILE.name)
+    if not manifest:
+        return [f"No version {VERSION} manifest in {output_dir}"]
+
+    def check_size(file, size):
+        path = output_dir / file
+        if not path.exists():
+            errors.append(f"{file}: missing")
+            return
+        with Image.open(path) as image:
+            if list(image.size) != list(size):
+                errors.append(f"{file}: {image.size[0]}x{image.size[1]}, manifest says {size[0]}x{size[1]}")
+
+    for level in (manifest.get('map') or {}).get('levels', []):
+        covered = 0
+        for tile in level['tiles']:
+            check_size(tile['file'], tile['rect'][2:])
+            covered += tile['rect'][2] * tile['rect'][3]
+        if covered != level['size'][0] * level['size'][1]:
+            errors.append(f"Level {level['level']}: tiles cover {covered} of "
+                          f"{level['size'][0] * level['size'][1]} pixels")
+    for name, panel in manifest.get('panels', {}).items():
+        for variant in panel['variants']:
+            check_size(variant['file'], variant['size'])
+            if max(variant['size']) > variant['cap']:
+                errors.append(f"{variant['file']}: larger than its {variant['cap']}px cap")
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the map texture pyramid and capped panel images")
+    parser.add_argument('--force', action='store_true', help="Rebuild sources even if their hash is unchanged")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (1 = no worker processes)")
+    parser.add_argument('--tile-size', type=int, default=TILE_SIZE, help=f"Tile edge in pixels (default {TILE_SIZE})")
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help="Directory for the textures")
+    args = parser.parse_args()
+    if args.tile_size < 1 or args.tile_size & (args.tile_size - 1):
+        parser.error("--tile-size must be a power of two")
+
+    with step('build') as s:
+        manifest, rebuilt, written = build(output_dir=args.output_dir, tile_size=args.tile_size,
+                                           jobs=args.jobs, force=args.force)
+        s.record_read(MAP_SOURCE, *(APP_DIR / p['source'] for p in manifest['panels'].values()))
+        s.record_write(*written)
+        s.rows_out = len(written)
+
+    map_entry = manifest['map']
+    for level in map_entry['levels']:
+        w, h = level['size']
+        print(f"Level {level['level']}: {w}x{h}, {len(level['tiles'])} tiles ({w * h * 4 / 2**20:.1f} MB as RGBA)")
+    for name, panel in manifest['panels'].items():
+        sizes = ', '.join(f"{v['size'][0]}x{v['size'][1]}" for v in panel['variants']) or "already within caps"
+        print(f"{name}: {panel['size'][0]}x{panel['size'][1]} -> {sizes}")
+    skipped = len(manifest['panels']) + 1 - len(rebuilt)
+    print(f"Rebuilt {len(rebuilt)} sources ({len(written)} files), {skipped} unchanged")
+
+    with step('validate'):
+        errors = validate(args.output_dir)
+    if errors:
+        print("\n❌ Texture validation failed:")
+        for error in errors:
+            print(f"  {error}")
+        raise SystemExit(1)
+    print("✅ Textures match the manifest")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -1,56 +1,291 @@
+#!/usr/bin/env python3
+"""
+Check integrity of everything in DataFiles before publishing.
 
-import json, sys
-from pathlib import Path
+Builds one index of countries.csv, centroids.json, case_counts.json and
+bins.csv, then validates every year_YYYY.csv against it in a process pool:
+
+  - countries.csv codes == centroids.json codes
+  - every country has a region mapping and every alias a known code (warnings;
+    reference files are loaded through country_registry.py)
+  - bins.csv defines bin 0 and strictly increasing edges
+  - each year file has a Code,Bin header, no duplicate codes, and bins in range
+  - each year file only lists codes present in countries.csv and centroids.json
+    (OWID_ pseudo-codes are summarized as a warning: the app has no centroid for them)
+  - each year's bins agree with binning that year's case_counts.json values,
+    and every country with cases >= 1 appears in the year file
+  - year_bins.bin (if present) matches the year files
+  - country_years.bin (if present) matches the year files and case_counts.bin
 
-USAGE = """
 Usage:
-  python check_integrity.py <countries.json> <centroids.json> <years_dir>
+  python check_integrity.py [--data-dir DIR] [--jobs N] [--json report.json]
 
-Checks:
-  - countries.json codes == centroids.json codes (exact match)
-  - each year file contains ONLY codes that exist in both
-  - reports any discrepancies
+Exits with status 1 if any errors were found.
 """
 
-def load_json(p):
-    with open(p) as f: return json.load(f)
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
 
-def main():
-    if len(sys.argv) < 4:
-        print(USAGE)
-        sys.exit(1)
-    countries = load_json(sys.argv[1])
-    centroids = load_json(sys.argv[2])
-    years_dir = Path(sys.argv[3])
+from binning import load_bin_table, assign_bins
+from country_registry import is_pseudo_code, registry
+from metrics import max_rss_bytes, run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+
+# Shared by worker processes (set once per worker by init_worker)
+_INDEX = None
+
+def load_json(filename):
+    """Load JSON file"""
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+def build_index(data_dir):
+    """Load the reference files once; this dict is what every year check uses"""
+    reference = registry(data_dir)
+    index = {
+        'countries': frozenset(reference.countries),
+        'centroids': reference.centroid_codes,
+        'unregioned': sorted(code for code in reference.countries if code not in reference.regions),
+        'stale_aliases': [f"{name} ({code})" for name, code in reference.stale_aliases],
+        'bins': load_bin_table(data_dir / "bins.csv"),
+        'case_counts': {},
+    }
+    case_counts_file = data_dir / "case_counts.json"
+    if case_counts_file.exists():
+        index['case_counts'] = {int(year): codes for year, codes in load_json(case_counts_file).items()}
+    return index
+
+def init_worker(index):
+    global _INDEX
+    _INDEX = index
+
+def issue(errors_or_warnings, source, message):
+    errors_or_warnings.append({'file': source, 'message': message})
+
+def check_reference(index):
+    """Checks that do not depend on any year file"""
+    errors, warnings = [], []
+    codes_c, codes_t = index['countries'], index['centroids']
+    missing_in_centroids = sorted(codes_c - codes_t)
+    extra_in_centroids = sorted(codes_t - codes_c)
+    if missing_in_centroids:
+        issue(errors, "centroids.json", f"Missing centroids for {len(missing_in_centroids)} countries: {missing_in_centroids}")
+    if extra_in_centroids:
+        issue(warnings, "centroids.json", f"{len(extra_in_centroids)} centroids not in countries.csv: "
+                                          f"{extra_in_centroids[:10]}{'...' if len(extra_in_centroids) > 10 else ''}")
+    if index['unregioned']:
+        issue(warnings, "country_regions.csv", f"No region mapping for {len(index['unregioned'])} countries: "
+                                               f"{index['unregioned'][:10]}{'...' if len(index['unregioned']) > 10 else ''}")
+    if index['stale_aliases']:
+        issue(warnings, "country_aliases.csv", f"Aliases for codes not in countries.csv: {index['stale_aliases'][:10]}")
+    if not index['case_counts']:
+        issue(warnings, "case_counts.json", "Not found; skipping year/case count agreement")
+    return errors, warnings
+
+def bin_range_for_truncated(cases, table):
+    """
+    case_counts.json stores int(value); the year files were binned from the
+    raw value in [cases, cases + 1), so accept any bin in that interval.
+    """
+    low = assign_bins(cases, table)
+    high = assign_bins(np.nextafter(cases + 1.0, 0), table)
+    return low, high
+
+def check_year_file(path):
+    """Validate one year file against the shared index; runs in a worker"""
+    index = _INDEX
+    name = Path(path).name
+    errors, warnings = [], []
+    try:
+        year = int(Path(path).stem.split('_')[1])
+    except (IndexError, ValueError):
+        issue(errors, name, "File name is not year_YYYY.csv")
+        return {'file': name, 'year': None, 'rows': 0, 'errors': errors, 'warnings': warnings}
+
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        rows = [row for row in reader if row]
+    if header != ['Code', 'Bin']:
+        issue(errors, name, f"Expected header Code,Bin but found {header}")
+        return {'file': name, 'year': year, 'rows': len(rows), 'errors': errors, 'warnings': warnings}
 
-    codes_c = set(countries.keys())
-    codes_t = set(centroids.keys())
+    table = index['bins']
+    max_bin = int(table.bins.max())
+    year_bins = {}
+    for line, row in enumerate(rows, start=2):
+        if len(row) != 2:
+            issue(errors, name, f"Line {line}: expected 2 columns, found {len(row)}")
+            continue
+        code, value = row
+        try:
+            bin_id = int(value)
+        except ValueError:
+            issue(errors, name, f"Line {line}: bin {value!r} is not an integer")
+            continue
+        if code in year_bins:
+            issue(errors, name, f"Duplicate code {code}")
+        if not 1 <= bin_id <= max_bin:
+            issue(errors, name, f"{code}: bin {bin_id} outside 1..{max_bin}")
+        year_bins[code] = bin_id
 
-    missing_in_centroids = sorted(list(codes_c - codes_t))
-    extra_in_centroids   = sorted(list(codes_t - codes_c))
+    codes = set(year_bins)
+    pseudo_codes = sorted(c for c in codes if is_pseudo_code(c))
+    for label, reference in (("countries.csv", index['countries']), ("centroids.json", index['centroids'])):
+        unknown = sorted(c for c in codes if c not in reference and not is_pseudo_code(c))
+        if unknown:
+            issue(errors, name, f"Codes not in {label}: {unknown[:20]}{'...' if len(unknown) > 20 else ''}")
 
+    case_counts = index['case_counts']
+    if case_counts:
+        year_cases = case_counts.get(year)
+        if year_cases is None:
+            issue(errors, name, f"No case counts for {year} in case_counts.json")
+        else:
+            # Every listed country must have a case count whose bin matches
+            listed = sorted(year_bins)
+            no_cases = [c for c in listed if c not in year_cases]
+            if no_cases:
+                issue(errors, name, f"Codes without case counts: {no_cases}")
+            with_cases = [c for c in listed if c in year_cases]
+            if with_cases:
+                cases = np.array([year_cases[c] for c in with_cases], dtype=np.float64)
+                actual = np.array([year_bins[c] for c in with_cases])
+                low, high = bin_range_for_truncated(cases, table)
+                for i in np.flatnonzero((actual < low) | (actual > high)):
+                    issue(errors, name, f"{with_cases[i]}: bin {actual[i]} does not match "
+                                        f"{int(cases[i])} cases (expected bin {low[i]})")
+            # Every country with at least one case must be listed
+            unlisted = sorted(c for c, n in year_cases.items() if n >= 1 and c not in year_bins)
+            if unlisted:
+                issue(errors, name, f"Countries with cases but missing from the year file: {unlisted}")
+
+    return {'file': name, 'year': year, 'rows': len(rows), 'errors': errors, 'warnings': warnings,
+            'pseudo_codes': pseudo_codes, 'max_rss_bytes': max_rss_bytes()}
+
+def check_bundle(data_dir):
+    bundle_file = data_dir / "year_bins.bin"
+    if not bundle_file.exists():
+        return []
+    from export_year_bundle import validate_bundle
+    return [{'file': bundle_file.name, 'message': m} for m in validate_bundle(bundle_file, data_dir)]
+
+def check_country_years(data_dir):
+    country_years_file = data_dir / "country_years.bin"
+    if not country_years_file.exists():
+        return []
+    from export_country_years import validate_country_years
+    return [{'file': country_years_file.name, 'message': m}
+            for m in validate_country_years(country_years_file, data_dir, data_dir / "case_counts.bin")]
+
+def run_checks(data_dir=DATA_DIR, jobs=None):
+    """Run every check and return a machine-readable report dict"""
+    start = time.perf_counter()
+    try:
+        index = build_index(data_dir)
+    except (OSError, ValueError, KeyError) as e:
+        return {'data_dir': str(data_dir), 'ok': False, 'countries': 0, 'centroids': 0,
+                'ready_for_visualization': 0, 'year_files': 0, 'years': None,
+                'errors': [{'file': str(data_dir), 'message': f"Could not load reference files: {e}"}],
+                'warnings': [], 'files': [], 'worker_max_rss_bytes': None,
+                'elapsed_s': round(time.perf_counter() - start, 3)}
+    errors, warnings = check_reference(index)
+
+    year_files = sorted(data_dir.glob("year_*.csv"))
+    if not year_files:
+        issue(errors, str(data_dir), "No year_YYYY.csv files found")
+
+    if jobs == 1:
+        init_worker(index)
+        results = [check_year_file(path) for path in year_files]
+    else:
+        # The index is sent once per worker, not once per file
+        workers = jobs or os.cpu_count() or 1
+        chunksize = max(1, len(year_files) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(index,)) as pool:
+            results = list(pool.map(check_year_file, year_files, chunksize=chunksize))
+
+    pseudo_years = {}
+    for result in results:
+        errors.extend(result['errors'])
+        warnings.extend(result['warnings'])
+        for code in result.get('pseudo_codes', []):
+            pseudo_years.setdefault(code, []).append(result['year'])
+    for code, years_listed in sorted(pseudo_years.items()):
+        issue(warnings, "year files", f"Aggregate pseudo-code {code} (no centroid, skipped by the app) "
+                                      f"listed in {len(years_listed)} year files")
+    errors.extend(check_bundle(data_dir))
+    errors.extend(check_country_years(data_dir))
+
+    years = [r['year'] for r in results if r['year'] is not None]
+    # Peak RSS of the processes that checked the year files (the workers, or this one with --jobs 1)
+    worker_rss = [r['max_rss_bytes'] for r in results if r.get('max_rss_bytes') is not None]
+    return {
+        'data_dir': str(data_dir),
+        'ok': not errors,
+        'countries': len(index['countries']),
+        'centroids': len(index['centroids']),
+        'ready_for_visualization': len(index['countries'] & index['centroids']),
+        'year_files': len(year_files),
+        'years': [min(years), max(years)] if years else None,
+        'errors': errors,
+        'warnings': warnings,
+        'files': [{k: r[k] for k in ('file', 'year', 'rows')} | {'errors': len(r['errors'])} for r in results],
+        'worker_max_rss_bytes': max(worker_rss) if worker_rss else None,
+        'elapsed_s': round(time.perf_counter() - start, 3),
+    }
+
+def print_report(report):
     print("== Code Parity: countries vs centroids ==")
-    print(f"countries: {len(codes_c)} codes, centroids: {len(codes_t)} codes")
-    if missing_in_centroids: print(f"  Missing in centroids: {missing_in_centroids}")
-    if extra_in_centroids:   print(f"  Extra in centroids: {extra_in_centroids}")
-    if not missing_in_centroids and not extra_in_centroids:
-        print("  ✅ Exact match")
+    print(f"countries.csv: {report['countries']} codes")
+    print(f"centroids.json: {report['centroids']} codes")
 
     print("\n== Year Files ==")
-    for yp in sorted(years_dir.glob("*.json")):
-        y = yp.stem
-        ydata = load_json(yp)
-        keys = set(ydata.keys())
-        bad = sorted(list(keys - codes_c))
-        missing = sorted(list(keys - codes_t))
-        if bad or missing:
-            print(f"  {y}:")
-            if bad:     print(f"    Codes not in countries.json: {bad[:20]}{'...' if len(bad)>20 else ''}")
-            if missing: print(f"    Codes not in centroids.json: {missing[:20]}{'...' if len(missing)>20 else ''}")
-        else:
-            print(f"  {y}: ✅ all codes valid")
+    for entry in report['files']:
+        status = "✅ all codes valid" if entry['errors'] == 0 else f"❌ {entry['errors']} errors"
+        print(f"{entry['year'] or entry['file']}: {status}")
+
+    if report['warnings']:
+        print(f"\n⚠️  {len(report['warnings'])} warnings:")
+        for warning in report['warnings']:
+            print(f"  {warning['file']}: {warning['message']}")
+    if report['errors']:
+        print(f"\n❌ {len(report['errors'])} errors:")
+        for error in report['errors']:
+            print(f"  {error['file']}: {error['message']}")
+
+    print("\n== Summary ==")
+    print(f"Checked {report['year_files']} year files in {report['elapsed_s']:.2f}s")
+    print(f"Total countries ready for visualization: {report['ready_for_visualization']}")
+    print("✅ All checks passed" if report['ok'] else "❌ Integrity check failed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate DataFiles before publishing")
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR, help="Directory with the app data files")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (1 = run inline)")
+    parser.add_argument('--json', type=Path, default=None, help="Write the full report as JSON to this path")
+    args = parser.parse_args()
 
-    print("\nDone.")
+    with step('checks') as s:
+        report = run_checks(args.data_dir, args.jobs)
+        s.record_read(*(p for p in args.data_dir.iterdir() if p.is_file()))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+    sys.exit(0 if report['ok'] else 1)
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
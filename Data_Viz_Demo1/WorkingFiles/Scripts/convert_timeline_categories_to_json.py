@@ -7,29 +7,41 @@ import csv
 import json
 import os
 
+from metrics import run_main, step
+
 # Input and output paths
 input_file = '../RawData/polio_timeline_categories.csv'
 output_file = '../../DataFiles/polio_timeline_categories.json'
 
-# Read CSV and convert to JSON
-timeline_data = {}
-
-with open(input_file, 'r', encoding='utf-8') as csvfile:
-    reader = csv.DictReader(csvfile)
-    row_number = 0
-    for row in reader:
-        if row['category']:  # Skip empty rows
-            # Using row number + 1980 as the year (since we have 47 entries for years 1980-2026)
-            year = 1980 + row_number
-            timeline_data[year] = {
-                'category': row['category'],
-                'headline': row['headline'],
-                'subtext': row['subtext']
-            }
-            row_number += 1
-
-# Write to JSON file
-with open(output_file, 'w', encoding='utf-8') as jsonfile:
-    json.dump(timeline_data, jsonfile, indent=2, ensure_ascii=False)
-
-print(f"Successfully converted {len(timeline_data)} entries to {output_file}")
+def main():
+    # Read CSV and convert to JSON
+    timeline_data = {}
+
+    with step('read') as s, open(input_file, 'r', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        s.rows_in = 0
+        row_number = 0
+        for row in reader:
+            s.rows_in += 1
+            if row['category']:  # Skip empty rows
+                # Using row number + 1980 as the year (since we have 47 entries for years 1980-2026)
+                year = 1980 + row_number
+                timeline_data[year] = {
+                    'category': row['category'],
+                    'headline': row['headline'],
+                    'subtext': row['subtext']
+                }
+                row_number += 1
+        s.record_read(input_file)
+        s.rows_out = len(timeline_data)
+
+    # Write to JSON file
+    with step('write', rows_in=len(timeline_data)) as s:
+        with open(output_file, 'w', encoding='utf-8') as jsonfile:
+            json.dump(timeline_data, jsonfile, indent=2, ensure_ascii=False)
+        s.record_write(output_file)
+
+    print(f"Successfully converted {len(timeline_data)} entries to {output_file}")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -7,31 +7,43 @@ import csv
 import json
 import os
 
+from metrics import run_main, step
+
 # Input and output paths
 input_file = '../RawData/polio_timeline.csv'
 output_file = '../../DataFiles/polio_timeline.json'
 
-# Read CSV and convert to JSON
-timeline_data = {}
-
-with open(input_file, 'r', encoding='utf-8') as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        if row['year']:  # Skip empty rows
-            year = int(row['year'])
-            # Remove "Defining Moment: " prefix from headline
-            headline = row['headline']
-            if headline.startswith("Defining Moment: "):
-                headline = headline[17:]  # Remove the prefix
-            
-            timeline_data[year] = {
-                'headline': headline,
-                'stat': row['stat'],
-                'photo': row['photo']  # Keep photo field for potential future use
-            }
-
-# Write to JSON file
-with open(output_file, 'w', encoding='utf-8') as jsonfile:
-    json.dump(timeline_data, jsonfile, indent=2, ensure_ascii=False)
-
-print(f"Successfully converted {len(timeline_data)} entries to {output_file}")
+def main():
+    # Read CSV and convert to JSON
+    timeline_data = {}
+
+    with step('read') as s, open(input_file, 'r', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        s.rows_in = 0
+        for row in reader:
+            s.rows_in += 1
+            if row['year']:  # Skip empty rows
+                year = int(row['year'])
+                # Remove "Defining Moment: " prefix from headline
+                headline = row['headline']
+                if headline.startswith("Defining Moment: "):
+                    headline = headline[17:]  # Remove the prefix
+                
+                timeline_data[year] = {
+                    'headline': headline,
+                    'stat': row['stat'],
+                    'photo': row['photo']  # Keep photo field for potential future use
+                }
+        s.record_read(input_file)
+        s.rows_out = len(timeline_data)
+
+    # Write to JSON file
+    with step('write', rows_in=len(timeline_data)) as s:
+        with open(output_file, 'w', encoding='utf-8') as jsonfile:
+            json.dump(timeline_data, jsonfile, indent=2, ensure_ascii=False)
+        s.record_write(output_file)
+
+    print(f"Successfully converted {len(timeline_data)} entries to {output_file}")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Canonical country-code registry shared by the pipeline stages.
+
+Loaded once per process (registry() is cached) into hash indexes:
+
+  countries   ISO3 code -> canonical name, from DataFiles/countries.csv,
+              plus the set of codes with a centroid in centroids.json
+  pseudo      OWID_ pseudo-codes OWID uses for aggregates and former states
+              (OWID_WRL World, OWID_SRM Serbia and Montenegro, ...)
+  aliases     normalized entity name -> code, from the canonical names, the
+              pseudo-code names and RawData/country_aliases.csv (Alias,Code)
+  regions     code -> {grouping: region} and (grouping, region) -> member codes,
+              from RawData/country_regions.csv (see regional_aggregation.py)
+
+Code-less aggregate rows (regions, continents, income groups) get their Code
+column from CountryRegistry.region_code(): the name is matched to the mapping table's spelling
+of the region, then slugged ('High income: OECD' -> 'HIGH_INCOME_OECD'), so
+prepare_regional_data.py and regional_aggregation.py agree on every code.
+
+Names are normalized before lookup (case, accents, punctuation and a leading
+"the" are ignored), so "Côte d'Ivoire", "Cote d'Ivoire" and "COTE D IVOIRE"
+all resolve to CIV. reconcile() checks every distinct (code, entity) pair of a
+source at once and returns its problems as a few bulk warnings instead of one
+message per row.
+
+Standard library only, so the csv_core fast path can use it without pandas.
+
+Usage:
+  python country_registry.py                    # summary + reconcile the source exports
+  python country_registry.py Turkiye "Ivory Coast" OWID_WRL   # resolve names or codes
+"""
+
+import csv
+import json
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+RAW_DATA_DIR = SCRIPT_DIR.parent / "RawData"
+FINAL_DATA_DIR = SCRIPT_DIR.parent / "FinalDataRaw"
+DATA_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+ALIASES_FILE = RAW_DATA_DIR / "country_aliases.csv"
+REGIONS_FILE = RAW_DATA_DIR / "country_regions.csv"
+SOURCE_FILES = [
+    FINAL_DATA_DIR / "number-of-estimated-paralytic-polio-cases-by-world-region.csv",
+    FINAL_DATA_DIR / "polio-vaccine-coverage-of-one-year-olds.csv",
+]
+
+PSEUDO_CODE_PREFIX = 'OWID_'
+WORLD_CODE = 'OWID_WRL'
+PSEUDO_NAMES = {
+    WORLD_CODE: 'World',
+    'OWID_CZS': 'Czechoslovakia',
+    'OWID_KOS': 'Kosovo',
+    'OWID_SRM': 'Serbia and Montenegro',
+    'OWID_USS': 'USSR',
+    'OWID_YGS': 'Yugoslavia',
+}
+WORLD_NAME = PSEUDO_NAMES[WORLD_CODE]
+
+# Columns of the region table that are not groupings
+REGION_META_COLUMNS = ('Code', 'Population')
+MAX_LISTED = 20
+
+def is_pseudo_code(code):
+    """True for OWID_ pseudo-codes (aggregates and former states, no centroid)"""
+    return isinstance(code, str) and code.startswith(PSEUDO_CODE_PREFIX)
+
+def normalize_name(name):
+    """Lookup key for an entity name: "The Côte d'Ivoire" -> 'cote d ivoire'"""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'[^a-z0-9]+', ' ', text.casefold().replace('&', ' and ')).strip()
+    return text[4:] if text.startswith('the ') else text
+
+@lru_cache(maxsize=None)
+def region_slug(name):
+    """'North America' -> 'NORTH_AMERICA', 'High income: OECD' -> 'HIGH_INCOME_OECD'"""
+    return re.sub(r'[^A-Z0-9]+', '_', str(name).upper()).strip('_')
+
+def listed(items):
+    """Bounded list for messages: ['A', 'B', ...]"""
+    items = list(items)
+    return f"{items[:MAX_LISTED]}{'...' if len(items) > MAX_LISTED else ''}"
+
+class CountryRegistry:
+    """Hash indexes over country codes, pseudo-codes, entity-name aliases and region membership"""
+
+    def __init__(self, countries, centroid_codes=(), aliases=(), regions=None, pseudo_names=PSEUDO_NAMES):
+        self.countries = dict(countries)
+        self.centroid_codes = frozenset(centroid_codes)
+        self.pseudo_names = dict(pseudo_names)
+
+        # Canonical names first, so an alias can never shadow one
+        self.alias_index = {}
+        self.stale_aliases = []
+        conflicts = []
+        names = [(name, code) for code, name in [*self.countries.items(), *self.pseudo_names.items()]]
+        for name, code in names + list(aliases):
+            if not self.is_known(code):
+                self.stale_aliases.append((name, code))
+                continue
+            key = normalize_name(name)
+            if self.alias_index.setdefault(key, code) != code:
+                conflicts.append(f"{name!r} -> {code} (already {self.alias_index[key]})")
+        if conflicts:
+            raise ValueError(f"Ambiguous country names: {'; '.join(conflicts)}")
+
+        self.regions = {code: dict(groups) for code, groups in (regions or {}).items()}
+        self.groupings = list(dict.fromkeys(g for groups in self.regions.values() for g in groups))
+        self.members = {}
+        self.region_index = {}
+        for code, groups in self.regions.items():
+            for grouping, region in groups.items():
+                if region:
+                    self.members.setdefault((grouping, region), []).append(code)
+        # Normalized once per distinct region rather than once per member
+        for grouping, region in self.members:
+            self.region_index.setdefault(normalize_name(region), {})[grouping] = region
+        self.region_codes = {}
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR, aliases_file=ALIASES_FILE, regions_file=REGIONS_FILE):
+        """Registry for a DataFiles directory; the alias and region tables are optional"""
+        data_dir = Path(data_dir)
+        with open(data_dir / "countries.csv", newline='', encoding='utf-8') as f:
+            countries = {row['Code']: row['Entity'] for row in csv.DictReader(f)}
+        with open(data_dir / "centroids.json") as f:
+            centroid_codes = json.load(f).keys()
+
+        aliases = []
+        if Path(aliases_file).exists():
+            with open(aliases_file, newline='', encoding='utf-8') as f:
+                aliases = [(row['Alias'], row['Code']) for row in csv.DictReader(f)]
+        regions = {}
+        if Path(regions_file).exists():
+            with open(regions_file, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    regions[row['Code']] = {k: v for k, v in row.items() if k not in REGION_META_COLUMNS}
+        return cls(countries, centroid_codes, aliases, regions)
+
+    # MARK: - Lookups
+
+    def is_country(self, code):
+        return code in self.countries
+
+    def is_known(self, code):
+        return code in self.countries or is_pseudo_code(code)
+
+    def name(self, code):
+        """Canonical name of a country or pseudo-code, or None"""
+        return self.countries.get(code) or self.pseudo_names.get(code)
+
+    def resolve(self, name):
+        """Code for an entity name or alias (any case/accents), or None"""
+        return self.alias_index.get(normalize_name(name))
+
+    def region_of(self, code, grouping):
+        return self.regions.get(code, {}).get(grouping)
+
+    def region_members(self, grouping, region):
+        return self.members.get((grouping, region), [])
+
+    def region_groupings(self, name):
+        """{grouping: region} for region names in the mapping table matching a code-less entity"""
+        return self.region_index.get(normalize_name(name), {})
+
+    def region_code(self, name):
+        """Code of an aggregate row: the slug of the mapping table's spelling of the region, else of name"""
+        code = self.region_codes.get(name)
+        if code is None:
+            spellings = self.region_groupings(name)
+            code = self.region_codes[name] = region_slug(next(iter(spellings.values()), name))
+        return code
+
+    # MARK: - Bulk checks
+
+    def unknown_codes(self, codes):
+        """Sorted codes that are neither countries nor pseudo-codes"""
+        return sorted(code for code in set(codes) if not self.is_known(code))
+
+    def reconcile(self, pairs):
+        """
+        Check a source's (code, entity) pairs against the registry, each distinct
+        pair once. Returns warning messages: unknown codes, names that resolve
+        to a different code, and names the registry cannot map at all.
+        """
+        unknown, conflicts, unmapped = set(), [], []
+        for code, entity in sorted(set(pairs)):
+            if not self.is_known(code):
+                unknown.add(code)
+                continue
+            resolved = self.resolve(entity)
+            if resolved is None:
+                unmapped.append(f"{entity} ({code})")
+            elif resolved != code:
+                conflicts.append(f"{entity} ({code}, registry: {resolved})")
+
+        warnings = []
+        if unknown:
+            warnings.append(f"{len(unknown)} codes not in countries.csv: {listed(sorted(unknown))}")
+        if conflicts:
+            warnings.append(f"{len(conflicts)} names registered under another code: {listed(conflicts)}")
+        if unmapped:
+            warnings.append(f"{len(unmapped)} names without a registry entry "
+                            f"(add them to {ALIASES_FILE.name}): {listed(unmapped)}")
+        return warnings
+
+@lru_cache(maxsize=None)
+def registry(data_dir=DATA_DIR):
+    """The shared registry for data_dir, loaded on first use"""
+    return CountryRegistry.load(data_dir)
+
+def source_pairs(path):
+    """(distinct (code, entity) pairs, code-less entity names) of an OWID export"""
+    pairs, aggregates = set(), {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['Code']:
+                pairs.add((row['Code'], row['Entity']))
+            else:
+                aggregates[row['Entity']] = None
+    return pairs, list(aggregates)
+
+def main():
+    reg = registry()
+    if len(sys.argv) > 1:
+        for query in sys.argv[1:]:
+            code = query if reg.is_known(query) else reg.resolve(query)
+            if code is None:
+                groupings = reg.region_groupings(query)
+                found = f"region in {', '.join(groupings)}" if groupings else "not found"
+                print(f"❌ {query}: {found}")
+            else:
+                regions = ', '.join(filter(None, (reg.region_of(code, g) for g in reg.groupings)))
+                print(f"✅ {query} -> {code} ({reg.name(code) or 'unnamed pseudo-code'}){f'  [{regions}]' if regions else ''}")
+        return
+
+    print(f"Countries:    {len(reg.countries)} ({len(reg.centroid_codes & reg.countries.keys())} with centroids)")
+    print(f"Pseudo-codes: {len(reg.pseudo_names)}")
+    print(f"Aliases:      {len(reg.alias_index)} names")
+    print(f"Regions:      {len(reg.members)} in {len(reg.groupings)} groupings")
+    unregioned = sorted(code for code in reg.countries if code not in reg.regions)
+    if unregioned:
+        print(f"  Countries without regions: {listed(unregioned)}")
+    if reg.stale_aliases:
+        print(f"  Aliases for unknown codes: {listed(f'{name} ({code})' for name, code in reg.stale_aliases)}")
+
+    ok = True
+    for path in SOURCE_FILES:
+        if not path.exists():
+            continue
+        pairs, aggregates = source_pairs(path)
+        warnings = reg.reconcile(pairs)
+        other = [name for name in aggregates if not reg.region_groupings(name) and name != WORLD_NAME]
+        print(f"\n{path.name}: {len(pairs)} coded entities, {len(aggregates)} aggregates "
+              f"({len(aggregates) - len(other)} match a region)")
+        for warning in warnings:
+            print(f"  ❌ {warning}")
+        ok = ok and not warnings
+    if ok:
+        print("\n✅ Every coded entity in the source exports maps to the registry")
+
+if __name__ == "__main__":
+    main()
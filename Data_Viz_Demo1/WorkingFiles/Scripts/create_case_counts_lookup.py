@@ -2,83 +2,306 @@
 """
 Create a consolidated case counts lookup file for efficient real-time access.
 This preserves actual case counts while keeping the binned data for visualization.
+
+The source rows are pivoted into a dense year x country int32 matrix in one
+vectorized pass and written as:
+
+  case_counts.bin   compact binary (code index + row-major int32 block)
+  case_counts.json  minified {year: {code: cases}} read by the app
+
+case_counts.bin layout (little-endian):
+
+  Header (32 bytes)
+    magic       4s   b'PCAS'
+    version     u16  2 (version 1 had fixed 8-byte codes and no code_width)
+    reserved    u16
+    code_count  u32
+    year_count  u32
+    code_width  u16  bytes per code (at least 8)
+    (14 bytes padding)
+  Codes:  code_count x code_width ASCII codes, NUL-padded, sorted
+  Years:  year_count x i32, ascending
+  Matrix: year_count x code_count i32, row-major; -1 = no data
+
+Small inputs are pivoted with the standard library (csv_core) instead, so
+pandas and NumPy are not imported at all; both paths write identical files.
+
+Usage:
+  python create_case_counts_lookup.py            # write .bin and .json
+  python create_case_counts_lookup.py --no-json  # skip the JSON fallback
+  python create_case_counts_lookup.py --engine pandas --output-dir /tmp/out
 """
 
-import pandas as pd
+import argparse
 import json
-import os
+import math
+import struct
+from array import array
 from pathlib import Path
 
-# Change to project directory
-os.chdir('/Users/amir/Documents/Amir AVP 2025 Projects/Data_Viz_Demo1')
+from csv_core import ENGINES, int32_bytes, lazy_import, pause_gc, read_columns, use_csv_core
+from metrics import run_main, step
 
-# Output file
-OUTPUT_FILE = Path('Data_Viz_Demo1/DataFiles/case_counts.json')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+source_data = lazy_import('source_data')
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+FINAL_DATA_DIR = SCRIPT_DIR.parent / "FinalDataRaw"
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+
+INPUT_FILE = FINAL_DATA_DIR / "number-of-estimated-paralytic-polio-cases-by-world-region.csv"
+OUTPUT_FILE = OUTPUT_DIR / "case_counts.json"
+BINARY_FILE = OUTPUT_DIR / "case_counts.bin"
+
+CASES_COLUMN = 'Estimated polio cases'
+# Case counts are never negative, so -1 cannot collide with a real value
+MISSING = -1
+
+MAGIC = b'PCAS'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIH14x')
+MIN_CODE_WIDTH = 8
+INT32_MAX = 2**31 - 1
 
 # Load all available raw data sources
-def load_raw_data():
-    all_data = {}
-    
-    # 1. Load new estimated case data (1980-2023)
-    new_data_file = Path('Data_Viz_Demo1/WorkingFiles/FinalDataRaw/number-of-estimated-paralytic-polio-cases-by-world-region.csv')
-    if new_data_file.exists():
-        print(f"Loading estimated case data from {new_data_file}")
-        df = pd.read_csv(new_data_file)
-        
-        # Filter out regional aggregates (only keep rows with country codes)
-        df = df[df['Code'].notna()]
-        
-        # The new data has columns: Entity, Code, Year, Estimated polio cases
-        if 'Estimated polio cases' in df.columns:
-            for _, row in df.iterrows():
-                if pd.notna(row['Code']) and pd.notna(row['Estimated polio cases']):
-                    year = int(row['Year'])
-                    code = row['Code']
-                    # Handle float values in the data
-                    cases = int(float(row['Estimated polio cases']))
-                    
-                    if year not in all_data:
-                        all_data[year] = {}
-                    all_data[year][code] = cases
+def load_raw_data(input_file=INPUT_FILE):
+    """Load country rows with a case value: DataFrame[Year, Code, cases]"""
+    print(f"Loading estimated case data from {input_file}")
+    return extract_case_rows(source_data.read_source(input_file))
+
+def extract_case_rows(df):
+    """Country rows with a case value from a source frame: DataFrame[Year, Code, cases]"""
+    if CASES_COLUMN not in df.columns:
+        raise KeyError(f"'{CASES_COLUMN}' column not found in source data")
+
+    # Filter out regional aggregates (only keep rows with country codes)
+    df = df[df['Code'].notna() & df[CASES_COLUMN].notna()]
+
+    # Handle float values in the data (truncate like int(float(x)))
+    return pd.DataFrame({
+        'Year': df['Year'].astype(np.int32),
+        'Code': df['Code'],
+        'cases': np.trunc(df[CASES_COLUMN]).astype(np.int64),
+    })
+
+def check_case_range(low, high):
+    """Reject counts that would collide with MISSING or overflow int32"""
+    if low < 0:
+        raise ValueError(f"Negative case count {low} (negative values are reserved for MISSING)")
+    if high > INT32_MAX:
+        raise ValueError("Case counts exceed int32 range")
+
+def build_matrix(df):
+    """
+    Pivot rows into a dense year x code int32 matrix.
+    Returns (years, codes, matrix) with MISSING where a country has no row.
+    """
+    if len(df):
+        check_case_range(df['cases'].min(), df['cases'].max())
+
+    # Later duplicates win, matching dict assignment in the original lookup
+    df = df.drop_duplicates(subset=['Year', 'Code'], keep='last')
+    years, year_idx = np.unique(df['Year'].to_numpy(), return_inverse=True)
+    codes, code_idx = np.unique(df['Code'].to_numpy(dtype=str), return_inverse=True)
+
+    matrix = np.full((len(years), len(codes)), MISSING, dtype=np.int32)
+    matrix[year_idx, code_idx] = df['cases'].to_numpy()
+    return years.astype(np.int32), codes.tolist(), matrix
+
+class CaseCountAccumulator:
+    """
+    Builds the same matrix as build_matrix one year at a time, holding only
+    int32 column indices and values per year (for streaming inputs).
+    """
+
+    def __init__(self):
+        self.code_index = {}
+        self.rows = {}
+
+    def add_year(self, year, codes, cases):
+        """Add one year's rows; codes must already be unique within the year"""
+        cases = np.asarray(cases, dtype=np.int64)
+        if len(cases):
+            check_case_range(cases.min(), cases.max())
+        columns = np.fromiter((self.code_index.setdefault(code, len(self.code_index)) for code in codes),
+                              dtype=np.int32, count=len(cases))
+        self.rows[int(year)] = (columns, cases.astype(np.int32))
+
+    def build(self):
+        years = np.array(sorted(self.rows), dtype=np.int32)
+        codes = sorted(self.code_index)
+        # Remap first-seen column order to sorted code order
+        remap = np.empty(len(codes), dtype=np.int64)
+        remap[[self.code_index[code] for code in codes]] = np.arange(len(codes))
+        matrix = np.full((len(years), len(codes)), MISSING, dtype=np.int32)
+        for row, year in enumerate(years):
+            columns, values = self.rows[int(year)]
+            matrix[row, remap[columns]] = values
+        return years, codes, matrix
+
+# MARK: - Lightweight path
+
+def build_matrix_lite(columns):
+    """
+    build_matrix over csv_core.Columns without NumPy: years is an array('i')
+    and the matrix a list of per-year array('i') rows.
+    """
+    cases = {}
+    for year, code, value in zip(columns.year, columns.code, columns.values[CASES_COLUMN]):
+        if code is not None and value == value:
+            # Later duplicates win, as in build_matrix
+            cases[year, code] = math.trunc(value)
+    if cases:
+        check_case_range(min(cases.values()), max(cases.values()))
+
+    years = array('i', sorted({year for year, _ in cases}))
+    codes = sorted({code for _, code in cases})
+    column = {code: i for i, code in enumerate(codes)}
+    matrix = {year: array('i', [MISSING]) * len(codes) for year in years}
+    for (year, code), value in cases.items():
+        matrix[year][column[code]] = value
+    return years, codes, [matrix[year] for year in years]
+
+def count_present(matrix):
+    """Number of country-year cells with data"""
+    if isinstance(matrix, list):
+        return sum(len(row) - row.count(MISSING) for row in matrix)
+    return int(np.count_nonzero(matrix != MISSING))
+
+def present_cases(codes, row):
+    """{code: cases} for one matrix row, skipping MISSING"""
+    if isinstance(row, array):
+        return {code: value for code, value in zip(codes, row) if value != MISSING}
+    present = np.flatnonzero(row != MISSING)
+    return dict(zip([codes[i] for i in present.tolist()], row[present].tolist()))
+
+# MARK: - Output
+
+def write_binary(years, codes, matrix, path=BINARY_FILE):
+    # Wider codes (e.g. sub-national ids) widen every slot
+    code_width = max([MIN_CODE_WIDTH] + [len(code.encode('ascii')) for code in codes])
+    header = HEADER.pack(MAGIC, VERSION, 0, len(codes), len(years), code_width)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(b''.join(code.encode('ascii').ljust(code_width, b'\0') for code in codes))
+        if isinstance(years, array):
+            f.write(int32_bytes(years))
+            for row in matrix:
+                f.write(int32_bytes(row))
         else:
-            print("Warning: 'Estimated polio cases' column not found in data")
-    
-    # No need for additional data sources - the new file has complete data
-    
-    return all_data
+            f.write(years.astype('<i4').tobytes())
+            f.write(matrix.astype('<i4').tobytes())
+
+def write_json(years, codes, matrix, path=OUTPUT_FILE):
+    """Minified {year: {code: cases}} for the app (no whitespace)"""
+    # Written one year at a time so only a single row is ever held as dicts
+    with open(path, 'w') as f:
+        f.write('{')
+        for i, (year, row) in enumerate(zip(years, matrix)):
+            year_data = present_cases(codes, row)
+            f.write(',' if i else '')
+            f.write(f'"{year}":{json.dumps(year_data, separators=(",", ":"))}')
+        f.write('}')
+
+class CaseCounts:
+    """O(1) case lookups over a memory-mapped case_counts.bin"""
+
+    def __init__(self, path=BINARY_FILE):
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, _, code_count, year_count, code_width = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} case counts file")
+        if code_width < 1:
+            raise ValueError(f"{path} has an invalid code width of {code_width}")
+        codes_end = HEADER.size + code_count * code_width
+        years_end = codes_end + year_count * 4
+        matrix_end = years_end + year_count * code_count * 4
+        if matrix_end > len(raw):
+            raise ValueError(f"{path} is truncated ({len(raw)} < {matrix_end} bytes)")
+
+        self.codes = [c.decode('ascii') for c in raw[HEADER.size:codes_end].view(f'S{code_width}')]
+        self.years = raw[codes_end:years_end].view('<i4')
+        self.matrix = raw[years_end:matrix_end].view('<i4').reshape(year_count, code_count)
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+
+    def cases(self, code, year):
+        """Case count for a country-year, or None if there is no data"""
+        row = self.year_index.get(year)
+        col = self.code_index.get(code)
+        if row is None or col is None:
+            return None
+        value = int(self.matrix[row, col])
+        return None if value == MISSING else value
+
+    def year(self, year):
+        """{code: cases} for every country with data in a year"""
+        row = self.matrix[self.year_index[year]]
+        return {self.codes[i]: int(row[i]) for i in np.flatnonzero(row != MISSING)}
+
+    def series(self, code):
+        """{year: cases} for one country across all years with data"""
+        column = self.matrix[:, self.code_index[code]]
+        return {int(self.years[i]): int(column[i]) for i in np.flatnonzero(column != MISSING)}
 
 def main():
+    parser = argparse.ArgumentParser(description="Build case_counts.bin/.json from the OWID case export")
+    parser.add_argument('--no-json', action='store_true', help="Skip the JSON fallback")
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help="csv = standard library only, pandas = DataFrame path, auto = by input size")
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help="Directory for the output files")
+    args = parser.parse_args()
+    binary_file = args.output_dir / BINARY_FILE.name
+    json_file = args.output_dir / OUTPUT_FILE.name
+
     print("Creating consolidated case counts lookup file...")
-    
+    lite = use_csv_core([INPUT_FILE], args.engine)
+    if lite:
+        pause_gc()
+
     # Load all raw data
-    case_data = load_raw_data()
-    
+    with step('load') as s:
+        if lite:
+            print(f"Loading estimated case data from {INPUT_FILE}")
+            rows = read_columns(INPUT_FILE, [CASES_COLUMN])
+        else:
+            rows = load_raw_data()
+        s.record_read(INPUT_FILE)
+        s.rows_out = len(rows)
+    with step('build_matrix', rows_in=len(rows)) as s:
+        years, codes, matrix = (build_matrix_lite if lite else build_matrix)(rows)
+        s.rows_out = cells = len(years) * len(codes)
+
     # Statistics
-    total_entries = sum(len(year_data) for year_data in case_data.values())
-    years = sorted(case_data.keys())
-    
     print(f"\nLoaded data for {len(years)} years: {min(years)} to {max(years)}")
-    print(f"Total country-year entries: {total_entries}")
-    
-    # Show sample data
-    if 2023 in case_data:
-        sample_countries = list(case_data[2023].items())[:5]
-        print(f"\nSample data for 2023:")
-        for code, cases in sample_countries:
-            print(f"  {code}: {cases} cases")
-    
-    # Save as JSON for efficient lookup
-    print(f"\nSaving to {OUTPUT_FILE}...")
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Convert to string keys for JSON
-    case_data_str = {str(year): data for year, data in case_data.items()}
-    
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(case_data_str, f, indent=2)
-    
-    print(f"Successfully created {OUTPUT_FILE}")
-    print(f"File size: {OUTPUT_FILE.stat().st_size / 1024:.1f} KB")
+    print(f"Total country-year entries: {count_present(matrix)}")
+    print(f"Matrix: {len(years)} years x {len(codes)} countries")
+
+    # Save compact binary for O(1) lookup
+    print(f"\nSaving to {binary_file}...")
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    with step('write_binary', rows_in=cells) as s:
+        write_binary(years, codes, matrix, binary_file)
+        s.record_write(binary_file)
+    print(f"File size: {binary_file.stat().st_size / 1024:.1f} KB")
+
+    # Minified JSON fallback (read by DataLoader.swift)
+    if not args.no_json:
+        print(f"\nSaving to {json_file}...")
+        with step('write_json', rows_in=cells) as s:
+            write_json(years, codes, matrix, json_file)
+            s.record_write(json_file)
+        print(f"File size: {json_file.stat().st_size / 1024:.1f} KB")
+
+    # Show sample data (years are ascending, so the last row is the latest year)
+    sample_countries = list(present_cases(codes, matrix[-1]).items())[:5]
+    print(f"\nSample data for {years[-1]}:")
+    for code, cases in sample_countries:
+        print(f"  {code}: {cases} cases")
+
+    print(f"\nSuccessfully created {binary_file.name}")
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
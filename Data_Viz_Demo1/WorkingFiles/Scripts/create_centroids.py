@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Regenerate DataFiles/centroids.json from Natural Earth admin-0 countries.
+
+Positions are normalized equirectangular coordinates, [x, y] per ISO3 code:
+  x = (longitude + 180) / 360
+  y = (90 - latitude) / 180
+
+Two sources (see COORDINATE_SYSTEM_NOTES.md):
+  label    LABEL_X/LABEL_Y from the .dbf (default; what the app was built with)
+  polygon  area-weighted centroid of each country's largest ring, from the .shp
+
+Natural Earth has no usable ISO_A3 for a few countries; those keep the
+hand-placed positions in MANUAL_CENTROIDS.
+
+Usage:
+  python create_centroids.py                    # label points
+  python create_centroids.py --method polygon   # needs ne_10m_admin_0_countries.shp
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from metrics import run_main, step
+from shapefile_reader import DbfTable, ShapeFile, largest_part_centroid
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+RAW_DATA_DIR = SCRIPT_DIR.parent / "RawData"
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+
+COUNTRIES_FILE = RAW_DATA_DIR / "ne_10m_admin_0_countries"
+OUTPUT_FILE = OUTPUT_DIR / "centroids.json"
+
+CODE_FIELD = 'ISO_A3'
+MISSING_CODE = '-99'
+PRECISION = 6
+
+# ISO_A3 is -99 for France and Norway, and Réunion is part of France's polygon
+MANUAL_CENTROIDS = {
+    'FRA': [0.514, 0.252],
+    'NOR': [0.525, 0.168],
+    'REU': [0.654, 0.616],
+}
+
+def normalize(lon, lat):
+    """Longitude/latitude arrays -> (x, y) in 0..1, (0, 0) = north-west corner"""
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (90.0 - np.asarray(lat, dtype=np.float64)) / 180.0
+    return np.clip(x, 0.0, 1.0), np.clip(y, 0.0, 1.0)
+
+def label_points(table):
+    return table.column('LABEL_X'), table.column('LABEL_Y')
+
+def polygon_centroids(table, shapes):
+    """Largest-ring centroid per record, aligned with the .dbf rows"""
+    if len(shapes) != len(table):
+        raise ValueError(f"{shapes.path.name} has {len(shapes)} records but "
+                         f"{table.path.name} has {len(table)}")
+    lon = np.full(len(shapes), np.nan)
+    lat = np.full(len(shapes), np.nan)
+    for i in range(len(shapes)):
+        geometry = shapes.parts(i)
+        if geometry is None:
+            continue
+        centroid = largest_part_centroid(*geometry)
+        if centroid is not None:
+            lon[i], lat[i] = centroid
+    return lon, lat
+
+def build_centroids(table, lon, lat, manual=MANUAL_CENTROIDS):
+    """{code: [x, y]} for every record with a usable code and position"""
+    codes = table.column(CODE_FIELD)
+    x, y = normalize(lon, lat)
+    keep = ~table.deleted & np.isfinite(x) & np.isfinite(y)
+
+    centroids = {}
+    for i in np.flatnonzero(keep):
+        code = codes[i]
+        if not code or code == MISSING_CODE or code in centroids:
+            continue
+        centroids[code] = [round(float(x[i]), PRECISION), round(float(y[i]), PRECISION)]
+    centroids.update(manual)
+    return dict(sorted(centroids.items()))
+
+def write_centroids(centroids, path=OUTPUT_FILE):
+    with open(path, 'w') as f:
+        json.dump(centroids, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate centroids.json from Natural Earth")
+    parser.add_argument('--method', choices=('label', 'polygon'), default='label',
+                        help="label = Natural Earth label points, polygon = largest-ring centroid")
+    parser.add_argument('--source', type=Path, default=COUNTRIES_FILE,
+                        help="Shapefile path without extension")
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with step('load') as s:
+        table = DbfTable(args.source)
+        s.record_read(table.path)
+        s.rows_out = len(table)
+    print(f"Loaded {len(table)} records from {table.path.name}")
+
+    if args.method == 'polygon':
+        shp = args.source.with_suffix('.shp')
+        if not shp.exists():
+            print(f"❌ {shp} not found; polygon centroids need the .shp geometry")
+            sys.exit(1)
+        with step('polygon_centroids', rows_in=len(table)) as s:
+            lon, lat = polygon_centroids(table, ShapeFile(shp))
+            s.record_read(shp)
+    else:
+        lon, lat = label_points(table)
+
+    with step('build', rows_in=len(table)) as s:
+        centroids = build_centroids(table, lon, lat)
+        s.rows_out = len(centroids)
+    with step('write', rows_in=len(centroids)) as s:
+        write_centroids(centroids, args.output)
+        s.record_write(args.output)
+    print(f"Saved {len(centroids)} centroids ({args.method}) to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Standard-library building blocks for the scripts' pandas-free fast path.
+
+Importing pandas and NumPy costs several hundred milliseconds, far more than
+processing the current ~8k-row OWID exports. Scripts that support the fast
+path read inputs with read_columns() when use_csv_core() says they are small
+enough, and only touch pandas/NumPy through lazy_import() proxies, so neither
+library is imported unless the pandas path actually runs.
+
+The helpers reproduce the pandas path's rules exactly:
+  - bins:      same compilation and lookup as binning.compile_bins/assign_bins
+  - sums:      compensated (Kahan) summation in row order, as pandas groupby sums
+  - rounding:  NumPy's round(x, n) (scale, round half to even, unscale)
+  - CSV text:  floats as repr(), missing values as empty fields
+
+Runtime on the current data (1 CPU, best of 20 runs, interpreter start and
+imports included; about 45 ms of each is Python itself plus argparse/pathlib):
+  - create_case_counts_lookup.py     ~70 ms
+  - prepare_regional_data.py         ~95 ms with its grouping files up to date,
+                                     ~145 ms when they are rebuilt (--force)
+  - process_complete_polio_dataset   ~105-110 ms (pandas path: ~620 ms)
+The sub-100 ms target therefore holds for the case-counts lookup and for
+regional re-runs, which is what repeated CI and pre-commit regeneration
+does; a full regional rebuild and the 44 year files stay just above it.
+
+Usage:
+  python csv_core.py        # compare fast-path and pandas outputs for the real data
+"""
+
+import csv
+import gc
+import importlib
+import math
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+
+from metrics import run_main
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+
+# Combined input size up to which the csv path is used. End to end, the csv
+# path beats pandas (import included) up to ~1.8 MB; current inputs are ~0.4 MB.
+FAST_PATH_MAX_BYTES = 3 << 19  # 1.5 MB
+ENGINES = ('auto', 'csv', 'pandas')
+NAN = float('nan')
+# Integer-valued floats below this add up exactly in any order
+EXACT_SUM_LIMIT = float(2**52)
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+def lazy_import(name):
+    """np = lazy_import('numpy') instead of import numpy as np"""
+    return LazyModule(name)
+
+def pause_gc():
+    """
+    Turn off cyclic garbage collection for the rest of a csv-path run. The
+    path only runs below FAST_PATH_MAX_BYTES and its rows hold no reference
+    cycles, so the collector's repeated passes over them free nothing; they
+    took over a tenth of a regional run. Reference counting still frees
+    everything as usual.
+    """
+    gc.disable()
+
+def file_digest(paths):
+    """SHA-256 over the names and contents of paths (missing files count as empty)"""
+    import hashlib  # only the callers that check freshness pay for the import
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        digest.update(path.name.encode('utf-8') + b'\0')
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def input_size(paths):
+    return sum(Path(p).stat().st_size for p in paths if Path(p).exists())
+
+def use_csv_core(paths, engine='auto'):
+    """True when the inputs should go through the csv path"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    if engine != 'auto':
+        return engine == 'csv'
+    return input_size(paths) <= FAST_PATH_MAX_BYTES
+
+# MARK: - Reading
+
+# Plain classes rather than dataclasses: importing dataclasses costs more
+# than reading the current inputs
+class Columns:
+    """OWID source columns: Entity/Code lists (missing Code = None), Year and float value arrays"""
+    __slots__ = ('entity', 'code', 'year', 'values')
+
+    def __init__(self, entity, code, year, values):
+        self.entity = entity
+        self.code = code
+        self.year = year
+        self.values = values
+
+    def __len__(self):
+        return len(self.year)
+
+def parse_float(text):
+    return float(text) if text else NAN
+
+def read_columns(path, value_columns=None):
+    """
+    Parse an Entity,Code,Year,<values...> CSV into Columns. value_columns
+    limits which value columns are kept (default: all of them).
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        entity_i, code_i, year_i = header.index('Entity'), header.index('Code'), header.index('Year')
+        wanted = [c for c in header if c not in ('Entity', 'Code', 'Year')]
+        if value_columns is not None:
+            missing = [c for c in value_columns if c not in header]
+            if missing:
+                raise KeyError(f"{path} has no column(s) {missing}")
+            wanted = list(value_columns)
+        rows = [row for row in reader if row]
+
+    # One comprehension per column is several times faster than appending per row
+    entity = [row[entity_i] for row in rows]
+    code = [row[code_i] or None for row in rows]
+    year = array('i', [int(row[year_i]) for row in rows])
+    values = {c: array('d', [float(row[i]) if row[i] else NAN for row in rows])
+              for c, i in ((c, header.index(c)) for c in wanted)}
+    return Columns(entity, code, year, values)
+
+# MARK: - Bins
+
+BinEdges = namedtuple('BinEdges', ['edges', 'edge_bins'])
+BinEdges.__doc__ = """bins.csv compiled like binning.BinTable, as plain lists"""
+
+def load_bin_edges(path):
+    """Same validation and edge layout as binning.compile_bins"""
+    with open(path, newline='', encoding='utf-8') as f:
+        lines = (line for line in f if not line.startswith('#'))
+        rows = sorted(csv.DictReader(lines), key=lambda row: int(row['bin']))
+    bins = [int(row['bin']) for row in rows]
+    if not bins or bins[0] != 0:
+        raise ValueError("bins.csv must define bin 0 for empty/zero values")
+
+    positive = [row for row in rows if int(row['bin']) > 0]
+    edge_max = [parse_float(row['edge_max']) for row in positive]
+    open_ended = [i for i, edge in enumerate(edge_max) if math.isnan(edge)]
+    cut = open_ended[0] if open_ended else len(edge_max)
+
+    edges = edge_max[:cut]
+    if any(b <= a for a, b in zip(edges, edges[1:])):
+        raise ValueError(f"bins.csv edge_max values must be strictly increasing: {edges}")
+    positive_bins = [int(row['bin']) for row in positive]
+    if not positive_bins:
+        raise ValueError("bins.csv must define at least one bin above 0")
+    overflow_bin = positive_bins[cut] if open_ended else bins[-1]
+    return BinEdges(edges=edges, edge_bins=positive_bins[:cut] + [overflow_bin])
+
+def assign_bin(value, table):
+    """Bin id for one value (NaN and 0 -> bin 0)"""
+    if value != value or value == 0:
+        return 0
+    return table.edge_bins[bisect_left(table.edges, value)]
+
+# MARK: - Arithmetic
+
+def sums_exactly(values):
+    """
+    True if every value is a whole number and their absolute total is small
+    enough that any sum of them is exact: Kahan's compensation then stays 0,
+    and plain addition in any order gives kahan_sum's result.
+    """
+    try:
+        return all(map(float.is_integer, values)) and sum(map(abs, values), 0.0) < EXACT_SUM_LIMIT
+    except TypeError:  # ints mixed in
+        return False
+
+def kahan_sum(values):
+    """
+    Compensated sum skipping NaN, in the same order and with the same
+    arithmetic as pandas' groupby sum. Returns (sum, non-NaN count).
+    """
+    values = values if isinstance(values, (list, tuple, array)) else list(values)
+    if sums_exactly(values):
+        return sum(values, 0.0), len(values)
+    # The same with NaN skipped (only NaN and inf are not finite; inf takes the loop)
+    finite = list(filter(math.isfinite, values))
+    if len(finite) < len(values) and not any(map(math.isinf, values)) and sums_exactly(finite):
+        return sum(finite, 0.0), len(finite)
+
+    total = compensation = 0.0
+    count = 0
+    for value in values:
+        if value != value:
+            continue
+        count += 1
+        y = value - compensation
+        t = total + y
+        compensation = t - total - y
+        total = t
+    return total, count
+
+def round_half_even(value, decimals=0):
+    """np.round(value, decimals) for a Python float"""
+    if value != value or math.isinf(value):
+        return value
+    scale = 10.0 ** decimals
+    return round(value * scale) / scale
+
+# MARK: - Writing
+
+def write_csv(path, header, rows):
+    """Write rows with the same quoting and line endings as DataFrame.to_csv(index=False)"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(header)
+        # csv writes floats via repr() like to_csv; only NaN (the one value
+        # unequal to itself) needs replacing, by an empty field
+        writer.writerows([('' if v != v else v) for v in row] for row in rows)
+
+def int32_bytes(values):
+    """Little-endian int32 bytes of an array('i') (what ndarray.astype('<i4').tobytes() gives)"""
+    if values.itemsize != 4:
+        raise ValueError("array('i') is not 32-bit on this platform")
+    if sys.byteorder == 'big':
+        values = array('i', values)
+        values.byteswap()
+    return values.tobytes()
+
+# MARK: - Self-check
+
+def compare_outputs():
+    """Run the three fast-path scripts both ways into temp dirs and diff the files"""
+    import filecmp
+    import subprocess
+    import tempfile
+
+    scripts = {
+        'process_complete_polio_dataset.py': ['--deltas'],
+        'create_case_counts_lookup.py': [],
+        'prepare_regional_data.py': ['--force'],
+    }
+    mismatches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for engine in ('csv', 'pandas'):
+            out = Path(tmp) / engine
+            out.mkdir()
+            for script, args in scripts.items():
+                subprocess.run([sys.executable, script, *args, '--engine', engine, '--output-dir', str(out)],
+                               cwd=SCRIPT_DIR, check=True, capture_output=True)
+        names = sorted(p.name for p in (Path(tmp) / 'pandas').iterdir())
+        for name in names:
+            if not filecmp.cmp(Path(tmp) / 'csv' / name, Path(tmp) / 'pandas' / name, shallow=False):
+                mismatches.append(name)
+    return names, mismatches
+
+def main():
+    names, mismatches = compare_outputs()
+    if mismatches:
+        print(f"❌ {len(mismatches)} of {len(names)} files differ between engines: {', '.join(mismatches)}")
+        sys.exit(1)
+    print(f"✅ {len(names)} output files identical on the csv and pandas paths")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service for the processed polio data (asyncio, standard library only).
+
+Everything in DataFiles is loaded once into in-memory indexes and served as
+JSON range queries, so dashboards do not have to ship and re-parse the files:
+
+  GET /years                         available years
+  GET /year/<year>[?codes=AFG,PAK]   {code: {bin, cases}} for one year
+  GET /country/<code>[?from=&to=]    one country's bins and cases by year
+  GET /regions                       region codes per grouping
+  GET /region/<code>[?from=&to=&grouping=]
+                                     regional cases and immunization by year
+  GET /timeline[?from=&to=]          polio_timeline.json entries
+  GET /health, /stats                liveness, cache statistics
+
+Responses are kept in an LRU cache keyed by the normalized query (?codes=
+is upper-cased, deduplicated and sorted, so "pak,AFG" and "AFG,PAK" share an
+entry), with a strong ETag per body (If-None-Match -> 304) and gzip when
+the client accepts it (compressed once per cached entry). Unexpected handler
+errors are logged and answered with a 500 JSON error.
+
+Usage:
+  python data_service.py [--host 127.0.0.1] [--port 8765] [--cache-size 512]
+"""
+
+import argparse
+import asyncio
+import bisect
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from metrics import run_main
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+CACHE_SIZE = 512
+GZIP_MIN_BYTES = 512
+MAX_HEADERS = 100
+PRIMARY_GROUPING = 'owid'
+
+log = logging.getLogger('data_service')
+
+class ServiceError(Exception):
+    """An error that maps directly to an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# MARK: - Data indexes
+
+class DataIndex:
+    """Immutable in-memory indexes over the DataFiles outputs"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        start = time.perf_counter()
+        self.data_dir = Path(data_dir)
+        self.names = self._load_countries()
+        bins = self._load_year_bins()
+        cases = self._load_case_counts()
+
+        self.years = sorted(set(bins) | set(cases))
+        self.by_year = {}
+        self.by_country = {}
+        for year in self.years:
+            year_bins, year_cases = bins.get(year, {}), cases.get(year, {})
+            entries = {}
+            for code in sorted(set(year_bins) | set(year_cases)):
+                entry = {'bin': year_bins.get(code, 0), 'cases': year_cases.get(code)}
+                entries[code] = entry
+                self.by_country.setdefault(code, {})[year] = entry
+            self.by_year[year] = entries
+
+        self.regions = self._load_regions()
+        self.timeline = self._load_timeline()
+        self.load_seconds = time.perf_counter() - start
+
+    def _load_countries(self):
+        path = self.data_dir / "countries.csv"
+        if not path.exists():
+            return {}
+        with open(path, newline='') as f:
+            return {row['Code']: row['Entity'] for row in csv.DictReader(f)}
+
+    def _load_year_bins(self):
+        """{year: {code: bin}} from year_bins.bin, or the year CSVs if it is missing"""
+        from export_year_bundle import BUNDLE_FILE, YearBundle, load_year_files
+        bundle_file = self.data_dir / BUNDLE_FILE.name
+        if bundle_file.exists():
+            bundle = YearBundle(bundle_file)
+            return {year: bundle.year_dict(year) for year in bundle.years}
+        return load_year_files(self.data_dir)
+
+    def _load_case_counts(self):
+        path = self.data_dir / "case_counts.json"
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return {int(year): codes for year, codes in json.load(f).items()}
+
+    def _load_regions(self):
+        """{grouping: {code: [rows sorted by year]}} from every regional_*.csv"""
+        regions = {}
+        for path in sorted(self.data_dir.glob("regional_*.csv")):
+            stem = path.stem[len("regional_"):]
+            grouping = PRIMARY_GROUPING if stem == "polio_data" else stem
+            by_code = regions.setdefault(grouping, {})
+            with open(path, newline='') as f:
+                for row in csv.DictReader(f):
+                    by_code.setdefault(row['Code'], []).append({
+                        'year': int(row['Year']),
+                        'entity': row['Entity'],
+                        'cases': float(row['cases']) if row['cases'] else None,
+                        'immunization_rate_pct': (float(row['immunization_rate_pct'])
+                                                  if row['immunization_rate_pct'] else None),
+                    })
+            for rows in by_code.values():
+                rows.sort(key=lambda r: r['year'])
+        return regions
+
+    def _load_timeline(self):
+        path = self.data_dir / "polio_timeline.json"
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return {int(year): entry for year, entry in json.load(f).items()}
+
+def parse_year(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"Invalid {name}: {value!r} is not a year")
+
+def year_range(query, years):
+    """Slice of sorted years selected by ?from=&to= (inclusive)"""
+    first = parse_year(query['from'], 'from') if 'from' in query else None
+    last = parse_year(query['to'], 'to') if 'to' in query else None
+    lo = 0 if first is None else bisect.bisect_left(years, first)
+    hi = len(years) if last is None else bisect.bisect_right(years, last)
+    return years[lo:hi]
+
+def normalize_query(query):
+    """Query with ?codes= upper-cased, stripped, deduplicated and sorted"""
+    if 'codes' in query:
+        codes = {code.strip().upper() for code in query['codes'].split(',')}
+        query = {**query, 'codes': ','.join(sorted(codes - {''}))}
+    return query
+
+# MARK: - Routes
+
+class DataService:
+    """Routes queries to the index and caches encoded responses"""
+
+    def __init__(self, index, cache_size=CACHE_SIZE):
+        self.index = index
+        self.cache = ResponseCache(cache_size)
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.routes = {
+            'health': self.health,
+            'stats': self.stats,
+            'years': self.years,
+            'year': self.year,
+            'country': self.country,
+            'regions': self.region_list,
+            'region': self.region,
+            'timeline': self.timeline,
+        }
+        # These change on every call and must never be cached
+        self.uncached = {'health', 'stats'}
+
+    def health(self, args, query):
+        return {'status': 'ok'}
+
+    def stats(self, args, query):
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'errors': self.errors,
+            'load_s': round(self.index.load_seconds, 3),
+            'cache': self.cache.stats(),
+        }
+
+    def years(self, args, query):
+        return {'years': self.index.years}
+
+    def year(self, args, query):
+        year = parse_year(args[0] if args else None, 'year')
+        entries = self.index.by_year.get(year)
+        if entries is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No data for {year}")
+        if 'codes' in query:
+            codes = query['codes'].split(',') if query['codes'] else []
+            entries = {code: entries[code] for code in codes if code in entries}
+        return {'year': year, 'countries': entries}
+
+    def country(self, args, query):
+        code = (args[0] if args else '').upper()
+        series = self.index.by_country.get(code)
+        if series is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown country {code!r}")
+        years = year_range(query, sorted(series))
+        return {'code': code, 'name': self.index.names.get(code),
+                'series': {str(year): series[year] for year in years}}
+
+    def region_list(self, args, query):
+        return {grouping: sorted(codes) for grouping, codes in self.index.regions.items()}
+
+    def region(self, args, query):
+        code = (args[0] if args else '').upper()
+        grouping = query.get('grouping')
+        if grouping is not None and grouping not in self.index.regions:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown grouping {grouping!r}")
+        groupings = [grouping] if grouping else [PRIMARY_GROUPING] + sorted(
+            g for g in self.index.regions if g != PRIMARY_GROUPING)
+        for name in groupings:
+            rows = self.index.regions.get(name, {}).get(code)
+            if rows is not None:
+                break
+        else:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown region {code!r}")
+        years = [row['year'] for row in rows]
+        selected = set(year_range(query, years))
+        return {'code': code, 'grouping': name, 'entity': rows[0]['entity'],
+                'series': [row for row in rows if row['year'] in selected]}
+
+    def timeline(self, args, query):
+        years = year_range(query, sorted(self.index.timeline))
+        return {str(year): self.index.timeline[year] for year in years}
+
+    def respond(self, method, target, headers):
+        """(status, headers, body) for one request"""
+        self.requests += 1
+        if method not in ('GET', 'HEAD'):
+            return error_response(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported")
+
+        parts = urlsplit(target)
+        segments = [unquote(s) for s in parts.path.split('/') if s]
+        query = normalize_query({k: v[-1] for k, v in parse_qs(parts.query).items()})
+        route = segments[0] if segments else 'health'
+        handler = self.routes.get(route)
+        if handler is None:
+            return error_response(HTTPStatus.NOT_FOUND, f"Unknown endpoint /{route}")
+
+        key = (tuple(segments), tuple(sorted(query.items())))
+        entry = None if route in self.uncached else self.cache.get(key)
+        if entry is None:
+            try:
+                entry = CachedResponse(json.dumps(handler(segments[1:], query), separators=(',', ':')))
+            except ServiceError as e:
+                return error_response(e.status, str(e))
+            except Exception:
+                # A bug in one handler must not drop the connection or stop the server
+                self.errors += 1
+                log.exception("Unhandled error for %s %s", method, target)
+                return error_response(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal server error")
+            if route not in self.uncached:
+                self.cache.put(key, entry)
+        return entry.render(headers, head=method == 'HEAD')
+
+# MARK: - Response cache
+
+def accepts_gzip(accept_encoding):
+    """True if Accept-Encoding allows gzip (q=0 disables it)"""
+    for token in accept_encoding.lower().split(','):
+        name, _, params = token.strip().partition(';')
+        if name.strip() in ('gzip', '*'):
+            q = params.strip()
+            if not q.startswith('q='):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+class CachedResponse:
+    """An encoded JSON body with its ETag; the gzip variant is built on first use"""
+
+    def __init__(self, text):
+        self.body = text.encode('utf-8')
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self._gzip = None
+
+    @property
+    def gzip_body(self):
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip
+
+    def render(self, request_headers, head=False):
+        use_gzip = len(self.body) >= GZIP_MIN_BYTES and accepts_gzip(request_headers.get('accept-encoding', ''))
+        # The gzip variant is a different representation, so it gets its own tag
+        etag = self.etag[:-1] + '-gz"' if use_gzip else self.etag
+        headers = {
+            'Content-Type': 'application/json',
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+        }
+        match = request_headers.get('if-none-match', '')
+        if match.strip() == '*' or etag in [m.strip() for m in match.split(',')]:
+            return HTTPStatus.NOT_MODIFIED, headers, b''
+        body = self.gzip_body if use_gzip else self.body
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        headers['Content-Length'] = str(len(body))
+        return HTTPStatus.OK, headers, b'' if head else body
+
+class ResponseCache:
+    """Least-recently-used map of normalized query -> CachedResponse"""
+
+    def __init__(self, capacity=CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        if self.capacity <= 0:
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self.entries), 'capacity': self.capacity, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None}
+
+def error_response(status, message):
+    body = json.dumps({'error': message, 'status': int(status)}).encode('utf-8')
+    return status, {'Content-Type': 'application/json', 'Content-Length': str(len(body))}, body
+
+# MARK: - HTTP server
+
+async def read_request(reader):
+    """(method, target, version, headers) or None when the client closed the connection"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ServiceError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+    return method.upper(), target, version, headers
+
+def keep_alive(version, headers):
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+def write_response(writer, status, headers, body, alive):
+    lines = [f"HTTP/1.1 {int(status)} {status.phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    if 'Content-Length' not in headers:
+        lines.append(f"Content-Length: {len(body)}")
+    lines.append(f"Connection: {'keep-alive' if alive else 'close'}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ServiceError as e:
+                write_response(writer, *error_response(e.status, str(e)), alive=False)
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            alive = keep_alive(version, headers)
+            write_response(writer, *service.respond(method, target, headers), alive=alive)
+            await writer.drain()
+            if not alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, data_dir=DATA_DIR, cache_size=CACHE_SIZE):
+    index = DataIndex(data_dir)
+    service = DataService(index, cache_size)
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(service, r, w), host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Loaded {len(index.years)} years, {len(index.by_country)} countries, "
+          f"{sum(len(c) for c in index.regions.values())} regions in {index.load_seconds:.2f}s")
+    print(f"Serving {data_dir} on http://{address[0]}:{address[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the processed polio data over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="Max cached responses")
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        asyncio.run(serve(args.host, args.port, args.data_dir, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    run_main(main)
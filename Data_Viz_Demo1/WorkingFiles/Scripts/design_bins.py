@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Design bins.csv edges from the distribution of country-year case values.
+
+Strategies (all work on log10 of the non-zero values, so the heavy tail
+does not swallow every small country):
+
+  log-quantile  edges at equal-count quantiles
+  jenks         approximate natural breaks minimizing within-class
+                variance: values are grouped into JENKS_RESOLUTION-decade
+                buckets, and an exact dynamic program with the
+                divide-and-conquer optimization (O(k * u log u) for u
+                buckets, instead of the naive O(k * n^2) table) places the
+                breaks between buckets, so an edge can be off by one bucket
+  fixed-log     geometrically spaced edges from the smallest to the
+                largest value
+
+Edges are rounded up to SIG_FIGS significant figures, and the top edge always
+covers the largest value. Heights and colors are linear ramps
+(HEIGHT_MIN..HEIGHT_MAX, COLOR_LOW..COLOR_HIGH), and bin 0 stays
+transparent for empty/zero values. A written bins.csv starts with a '#'
+comment naming the strategy (binning.py and csv_core.py skip comment lines);
+after writing, the file is read back through every bins.csv reader in the
+pipeline and must compile to the same edges.
+
+Usage:
+  python design_bins.py                           # compare strategies, write nothing
+  python design_bins.py --strategy jenks --bins 10 --output ../../DataFiles/bins.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics import run_main, step
+from country_registry import PSEUDO_CODE_PREFIX
+from binning import BINS_FILE, assign_bins, compile_bins, load_bin_table
+from csv_core import load_bin_edges
+from export_year_bundle import max_bin_from_csv
+from source_data import CASES_FILE, read_source
+
+CASES_COLUMN = 'Estimated polio cases'
+
+STRATEGIES = ('log-quantile', 'jenks', 'fixed-log')
+DEFAULT_BINS = 10
+SIG_FIGS = 2
+JENKS_RESOLUTION = 1e-3     # decades per weighted point in the Jenks DP
+HEIGHT_MIN = 0.05
+HEIGHT_MAX = 0.275
+COLOR_LOW = (0xFF, 0xFF, 0x00)
+COLOR_HIGH = (0xFF, 0x00, 0x00)
+# Printed with the design and written into the bins.csv comment
+STRATEGY_NOTES = {
+    'jenks': f"approximate natural breaks, log10 values grouped into {JENKS_RESOLUTION:g}-decade buckets",
+}
+ZERO_BIN = {'bin': 0, 'edge_max': np.nan, 'height_m': 0.0, 'color_hex': '#00000000'}
+
+def case_values(df):
+    """Every non-zero country-year case value (aggregates and pseudo-codes excluded)"""
+    codes = df['Code'].astype(str)
+    countries = df[df['Code'].notna() & ~codes.str.startswith(PSEUDO_CODE_PREFIX)]
+    values = countries[CASES_COLUMN].to_numpy(dtype=np.float64)
+    return values[np.isfinite(values) & (values > 0)]
+
+def round_up(values, sig_figs=SIG_FIGS):
+    """Round up to sig_figs significant figures (4321 -> 4400)"""
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** (np.floor(np.log10(values)) - (sig_figs - 1))
+    rounded = np.ceil(np.round(values / scale, 9)) * scale
+    # Strip float noise (2.3000000000000003 -> 2.3)
+    return np.array([float(f"{v:.{sig_figs}g}") for v in rounded])
+
+def finalize_edges(edges, max_value, sig_figs=SIG_FIGS, integer=False):
+    """Nice, strictly increasing edges whose last edge covers max_value"""
+    edges = round_up(np.append(np.asarray(edges, dtype=np.float64)[:-1], max_value), sig_figs)
+    if integer:
+        # Whole case counts: an edge of 2.3 bins exactly like 2
+        edges = np.floor(edges)
+    return np.unique(edges)
+
+# MARK: - Strategies
+
+def log_quantile_edges(values, k):
+    """Upper edges at the 1/k, 2/k, ... quantiles of log10(values)"""
+    logs = np.log10(values)
+    return 10.0 ** np.quantile(logs, np.arange(1, k + 1) / k)
+
+def fixed_log_edges(values, k):
+    """k geometrically spaced upper edges ending at the largest value"""
+    low, high = max(values.min(), 1.0), values.max()
+    return np.geomspace(low * (high / low) ** (1.0 / k), high, k)
+
+def jenks_breaks(x, k, weights=None):
+    """
+    Optimal k-class partition of sorted x minimizing weighted within-class
+    squared deviation. Returns the index one past the end of each class.
+
+    cost(i, j) comes from prefix sums in O(1). For a fixed class count the
+    optimal split point is monotone in j, so each DP layer is filled by
+    divide and conquer with one vectorized argmin per midpoint.
+    """
+    n = len(x)
+    if k >= n:
+        return np.arange(1, n + 1)
+    w = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    cw = np.concatenate([[0.0], np.cumsum(w)])
+    cx = np.concatenate([[0.0], np.cumsum(w * x)])
+    cxx = np.concatenate([[0.0], np.cumsum(w * x * x)])
+
+    def cost(i, j):
+        """Within-class squared deviation of x[i:j] (i may be an array)"""
+        sw = cw[j] - cw[i]
+        sx = cx[j] - cx[i]
+        return (cxx[j] - cxx[i]) - sx * sx / sw
+
+    previous = np.full(n + 1, np.inf)
+    previous[1:] = cost(0, np.arange(1, n + 1))
+    splits = np.zeros((k, n + 1), dtype=np.int64)
+
+    for m in range(1, k):
+        current = np.full(n + 1, np.inf)
+        # (j range, candidate range) pairs; j needs at least m + 1 points
+        stack = [(m + 1, n, m, n - 1)]
+        while stack:
+            j_lo, j_hi, opt_lo, opt_hi = stack.pop()
+            if j_lo > j_hi:
+                continue
+            j = (j_lo + j_hi) // 2
+            candidates = np.arange(max(opt_lo, m), min(opt_hi, j - 1) + 1)
+            totals = previous[candidates] + cost(candidates, j)
+            best = int(np.argmin(totals))
+            current[j] = totals[best]
+            split = int(candidates[best])
+            splits[m, j] = split
+            stack.append((j_lo, j - 1, opt_lo, split))
+            stack.append((j + 1, j_hi, split, opt_hi))
+        previous = current
+
+    ends = [n]
+    for m in range(k - 1, 0, -1):
+        ends.append(splits[m, ends[-1]])
+    return np.array(ends[::-1])
+
+def jenks_edges(values, k, resolution=JENKS_RESOLUTION):
+    """
+    Natural breaks on log10 values; each edge is the largest value in its class.
+    Values are first collapsed into weighted points resolution decades apart,
+    which bounds the DP size by the value range rather than the row count.
+    """
+    ordered = np.sort(values)
+    logs = np.log10(ordered)
+    keys = np.floor(logs / resolution).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(logs)])
+    means = np.add.reduceat(logs, starts) / counts
+    ends = jenks_breaks(means, k, counts)
+    return ordered[starts[ends - 1] + counts[ends - 1] - 1]
+
+def design_edges(values, strategy, k):
+    if strategy == 'log-quantile':
+        edges = log_quantile_edges(values, k)
+    elif strategy == 'jenks':
+        edges = jenks_edges(values, k)
+    elif strategy == 'fixed-log':
+        edges = fixed_log_edges(values, k)
+    else:
+        raise ValueError(f"Unknown strategy {strategy!r}; expected one of {STRATEGIES}")
+    return finalize_edges(edges, values.max(), integer=bool(np.all(values == np.rint(values))))
+
+# MARK: - Output
+
+def color_ramp(k, low=COLOR_LOW, high=COLOR_HIGH):
+    t = np.linspace(0.0, 1.0, k)[:, None] if k > 1 else np.zeros((1, 1))
+    rgb = np.rint((1 - t) * np.array(low) + t * np.array(high)).astype(int)
+    return [f"#{r:02X}{g:02X}{b:02X}" for r, g, b in rgb]
+
+def build_bins_frame(edges):
+    """bins.csv rows: bin 0 plus one row per edge with height/color ramps"""
+    k = len(edges)
+    rows = pd.DataFrame({
+        'bin': np.arange(1, k + 1),
+        'edge_max': edges,
+        'height_m': np.round(np.linspace(HEIGHT_MIN, HEIGHT_MAX, k), 4),
+        'color_hex': color_ramp(k),
+    })
+    return pd.concat([pd.DataFrame([ZERO_BIN]), rows], ignore_index=True)
+
+def strategy_label(strategy):
+    note = STRATEGY_NOTES.get(strategy)
+    return f"{strategy} [{note}]" if note else strategy
+
+def write_bins(bins_df, path, comment=None):
+    out = bins_df.copy()
+    # Integers where possible so edges read like the hand-written file (10, 100, ...)
+    out['edge_max'] = [('' if np.isnan(e) else (str(int(e)) if float(e).is_integer() else repr(float(e))))
+                       for e in out['edge_max']]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if comment:
+            f.write(f"# {comment}\n")
+        out.to_csv(f, index=False, lineterminator='\n')
+
+def check_readers(path, bins_df):
+    """Errors if a written bins.csv does not read back as bins_df through every pipeline reader"""
+    expected = compile_bins(bins_df)
+    errors = []
+    table = load_bin_table(path)
+    if not (np.array_equal(table.bins, expected.bins) and np.array_equal(table.edges, expected.edges)
+            and np.array_equal(table.edge_bins, expected.edge_bins)):
+        errors.append(f"binning.load_bin_table: edges {table.edges.tolist()}, expected {expected.edges.tolist()}")
+    edges = load_bin_edges(path)
+    if edges.edges != expected.edges.tolist() or edges.edge_bins != expected.edge_bins.tolist():
+        errors.append(f"csv_core.load_bin_edges: edges {edges.edges}, expected {expected.edges.tolist()}")
+    max_bin = max_bin_from_csv(path)
+    if max_bin != int(expected.bins.max()):
+        errors.append(f"export_year_bundle.max_bin_from_csv: {max_bin}, expected {int(expected.bins.max())}")
+    return errors
+
+def bin_counts(values, table):
+    """Country-years per bin id (bins 1..max)"""
+    return np.bincount(assign_bins(values, table), minlength=int(table.bins.max()) + 1)[1:]
+
+def print_design(name, table, values, elapsed=None):
+    counts = bin_counts(values, table)
+    timing = f" ({elapsed * 1000:.1f} ms)" if elapsed is not None else ""
+    print(f"\n{name}{timing}")
+    print(f"  {'bin':>3} {'edge_max':>10} {'height_m':>8} {'color':>8} {'country-years':>14}")
+    for position, bin_id in enumerate(table.bins):
+        if bin_id == 0:
+            continue
+        edge = table.edges[position - 1] if position - 1 < len(table.edges) else np.nan
+        count = counts[bin_id - 1]
+        print(f"  {bin_id:>3} {edge:>10,.0f} {table.heights[position]:>8.3f} {table.colors[position]:>8} "
+              f"{count:>8,} {'#' * int(round(40 * count / max(counts.max(), 1)))}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute bins.csv edges from the case distribution")
+    parser.add_argument('--strategy', choices=STRATEGIES, default=None,
+                        help="Strategy to write (default: compare all, write nothing)")
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS, help="Number of bins above 0")
+    parser.add_argument('--input', type=Path, default=CASES_FILE)
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Where to write bins.csv (e.g. ../../DataFiles/bins.csv)")
+    args = parser.parse_args()
+    if args.bins < 1:
+        parser.error("--bins must be at least 1")
+
+    with step('load') as s:
+        values = case_values(read_source(args.input))
+        s.record_read(args.input)
+        s.rows_out = len(values)
+    print(f"{len(values):,} non-zero country-year values "
+          f"({len(np.unique(values)):,} unique, max {values.max():,.0f})")
+
+    if BINS_FILE.exists():
+        print_design(f"current {BINS_FILE.name}", load_bin_table(), values)
+
+    strategies = [args.strategy] if args.strategy else list(STRATEGIES)
+    designs = {}
+    for strategy in strategies:
+        with step(strategy, rows_in=len(values)) as s:
+            edges = design_edges(values, strategy, args.bins)
+            s.rows_out = len(edges)
+        elapsed = s.wall_s
+        designs[strategy] = build_bins_frame(edges)
+        print_design(strategy_label(strategy), compile_bins(designs[strategy]), values, elapsed)
+        if len(edges) < args.bins:
+            print(f"  note: {args.bins - len(edges)} edges merged after rounding")
+
+    if args.output:
+        if not args.strategy:
+            parser.error("--output needs --strategy")
+        with step('write') as s:
+            write_bins(designs[args.strategy], args.output,
+                       comment=f"Generated by design_bins.py --strategy {args.strategy} --bins {args.bins}"
+                               + (f"; {STRATEGY_NOTES[args.strategy]}" if args.strategy in STRATEGY_NOTES else ""))
+            s.record_write(args.output)
+        print(f"\nSaved {args.strategy} bins to {args.output}")
+
+        with step('check'):
+            errors = check_readers(args.output, designs[args.strategy])
+        if errors:
+            print("❌ Written bins.csv does not read back the same:")
+            for error in errors:
+                print(f"  {error}")
+            raise SystemExit(1)
+        print("✅ Reads back identically through binning, csv_core and export_year_bundle")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Precompute per-country derived case statistics for the ornaments and panels.
+
+All statistics are computed in one vectorized pass over the year x country
+case matrix of case_counts.bin:
+
+  yoy         cases minus the previous year's cases (both years reported)
+  mean3/mean5 trailing 3- and 5-year mean of the reported years in the window
+  cumulative  reported cases summed from 1980 (-1 before the first report)
+  rank        1 = most cases that year; ties share the lower rank; 0 = no data
+  first_zero  first year a country reported zero cases (0 = never)
+
+Aggregate pseudo-codes (OWID_WRL, ...) get yoy/means/cumulative but are not
+ranked. Per-year orderings are stored too, so "top N" and "biggest movers"
+are slices instead of scans over every country.
+
+case_stats.bin layout (little-endian):
+
+  Header (32 bytes)
+    magic       4s   b'PSTA'
+    version     u16
+    reserved    u16
+    code_count  u32
+    year_count  u32
+    code_width  u16  bytes per code (at least 8)
+    short       u8   short rolling window (3)
+    long        u8   long rolling window (5)
+    (12 bytes padding)
+  Codes:      code_count x code_width ASCII codes, NUL-padded (case_counts.bin order)
+  Years:      year_count x i32, ascending
+  Records:    year_count x code_count x 24 bytes, row-major by year
+    cases i32 (-1), yoy i32 (NO_CHANGE), cumulative i32 (-1), mean3 f32, mean5 f32 (NaN),
+    rank u16 (0), 2 bytes padding
+  By rank:    year_count x code_count u16 code positions, rank order, NO_INDEX-padded
+  By change:  year_count x code_count u16 code positions, yoy ascending
+              (biggest drop first), NO_INDEX-padded
+  First zero: code_count x i32
+
+Usage:
+  python export_case_stats.py               # write and verify
+  python export_case_stats.py --verify      # only verify an existing file
+  python export_case_stats.py --show 2016   # print top countries and movers for a year
+"""
+
+import argparse
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from country_registry import is_pseudo_code
+from create_case_counts_lookup import BINARY_FILE as CASE_COUNTS_FILE, MISSING, CaseCounts
+from metrics import run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+STATS_FILE = OUTPUT_DIR / "case_stats.bin"
+
+MAGIC = b'PSTA'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIHBB12x')
+MIN_CODE_WIDTH = 8
+SHORT_WINDOW = 3
+LONG_WINDOW = 5
+
+NO_CHANGE = np.iinfo(np.int32).min
+NO_INDEX = np.iinfo(np.uint16).max
+RECORD = np.dtype({'names': ['cases', 'yoy', 'cumulative', 'mean3', 'mean5', 'rank'],
+                   'formats': ['<i4', '<i4', '<i4', '<f4', '<f4', '<u2'],
+                   'offsets': [0, 4, 8, 12, 16, 20],
+                   'itemsize': 24})
+
+def order_table(keys, valid):
+    """Per-year code positions sorted by key (stable), invalid entries replaced by a NO_INDEX tail"""
+    order = np.argsort(np.where(valid, keys, np.inf), axis=1, kind='stable')
+    counts = valid.sum(axis=1)
+    tail = np.arange(keys.shape[1]) >= counts[:, None]
+    return np.where(tail, NO_INDEX, order).astype(np.uint16)
+
+def compute_stats(codes, matrix):
+    """
+    Derived statistics for a year x code matrix of case counts (MISSING = no data).
+    Returns (records, by_rank, by_change, first_zero_index) where
+    first_zero_index is the row of each country's first zero (-1 = never).
+    """
+    if len(codes) >= NO_INDEX:
+        raise ValueError(f"At most {NO_INDEX - 1} countries fit the u16 order tables")
+    reported = matrix != MISSING
+    cases = np.where(reported, matrix, 0).astype(np.int64)
+    values = pd.DataFrame(np.where(reported, matrix, np.nan))
+
+    records = np.zeros(matrix.shape, dtype=RECORD)
+    records['cases'] = matrix
+
+    yoy = np.full(matrix.shape, NO_CHANGE, dtype=np.int64)
+    both = reported[1:] & reported[:-1]
+    yoy[1:] = np.where(both, cases[1:] - cases[:-1], NO_CHANGE)
+    records['yoy'] = yoy
+
+    cumulative = np.cumsum(cases, axis=0)
+    if cumulative.size and cumulative.max() > np.iinfo(np.int32).max:
+        raise ValueError("Cumulative cases exceed int32 range")
+    started = np.cumsum(reported, axis=0) > 0
+    records['cumulative'] = np.where(started, cumulative, MISSING)
+
+    records['mean3'] = values.rolling(SHORT_WINDOW, min_periods=1).mean().to_numpy(dtype=np.float32)
+    records['mean5'] = values.rolling(LONG_WINDOW, min_periods=1).mean().to_numpy(dtype=np.float32)
+
+    # Rank among real countries only; method='min' gives tied countries the same rank
+    rankable = reported & ~np.array([is_pseudo_code(code) for code in codes])
+    ranks = pd.DataFrame(np.where(rankable, matrix, np.nan)).rank(axis=1, method='min', ascending=False)
+    records['rank'] = ranks.fillna(0).to_numpy(dtype=np.uint16)
+
+    by_rank = order_table(np.where(rankable, records['rank'], 0), rankable)
+    by_change = order_table(yoy, rankable & (yoy != NO_CHANGE))
+
+    zero = reported & (matrix == 0)
+    first_zero_index = np.where(zero.any(axis=0), zero.argmax(axis=0), -1)
+    return records, by_rank, by_change, first_zero_index
+
+def build_payload(codes, years, records, by_rank, by_change, first_zero):
+    code_width = max([MIN_CODE_WIDTH] + [len(code.encode('ascii')) for code in codes])
+    header = HEADER.pack(MAGIC, VERSION, 0, len(codes), len(years), code_width, SHORT_WINDOW, LONG_WINDOW)
+    return b''.join([
+        header,
+        np.array(codes, dtype=f'S{code_width}').tobytes(),
+        np.asarray(years, dtype='<i4').tobytes(),
+        records.tobytes(),
+        by_rank.astype('<u2').tobytes(),
+        by_change.astype('<u2').tobytes(),
+        np.asarray(first_zero, dtype='<i4').tobytes(),
+    ])
+
+def write_stats(codes, years, matrix, path=STATS_FILE):
+    records, by_rank, by_change, first_zero_index = compute_stats(codes, matrix)
+    first_zero = np.where(first_zero_index >= 0, np.asarray(years)[first_zero_index], 0)
+    payload = build_payload(codes, years, records, by_rank, by_change, first_zero)
+    with open(path, 'wb') as f:
+        f.write(payload)
+    return len(payload)
+
+class CaseStats:
+    """Lookups over a memory-mapped case_stats.bin"""
+
+    def __init__(self, path=STATS_FILE):
+        self.path = Path(path)
+        raw = np.memmap(self.path, dtype=np.uint8, mode='r')
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{self.path} is too small to be a case stats file")
+        (magic, version, _, code_count, year_count,
+         code_width, self.short_window, self.long_window) = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} case stats file")
+
+        codes_end = HEADER.size + code_count * code_width
+        years_end = codes_end + year_count * 4
+        records_end = years_end + year_count * code_count * RECORD.itemsize
+        by_rank_end = records_end + year_count * code_count * 2
+        by_change_end = by_rank_end + year_count * code_count * 2
+        first_zero_end = by_change_end + code_count * 4
+        if first_zero_end > len(raw):
+            raise ValueError(f"{self.path} is truncated ({len(raw)} < {first_zero_end} bytes)")
+
+        self.codes = [c.decode('ascii') for c in raw[HEADER.size:codes_end].view(f'S{code_width}')]
+        self.years = raw[codes_end:years_end].view('<i4')
+        self.records = raw[years_end:records_end].view(RECORD).reshape(year_count, code_count)
+        self.by_rank = raw[records_end:by_rank_end].view('<u2').reshape(year_count, code_count)
+        self.by_change = raw[by_rank_end:by_change_end].view('<u2').reshape(year_count, code_count)
+        self.first_zero_years = raw[by_change_end:first_zero_end].view('<i4')
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+
+    def stats(self, code, year):
+        """All statistics for a country-year, or None if either is unknown"""
+        row = self.year_index.get(year)
+        col = self.code_index.get(code)
+        if row is None or col is None:
+            return None
+        r = self.records[row, col]
+        return {
+            'cases': None if r['cases'] == MISSING else int(r['cases']),
+            'yoy': None if r['yoy'] == NO_CHANGE else int(r['yoy']),
+            'cumulative': None if r['cumulative'] == MISSING else int(r['cumulative']),
+            'mean3': None if np.isnan(r['mean3']) else float(r['mean3']),
+            'mean5': None if np.isnan(r['mean5']) else float(r['mean5']),
+            'rank': int(r['rank']) or None,
+        }
+
+    def first_zero_year(self, code):
+        """First year the country reported zero cases, or None"""
+        year = int(self.first_zero_years[self.code_index[code]])
+        return year or None
+
+    def _ordered(self, table, year):
+        order = table[self.year_index[year]]
+        return order[order != NO_INDEX]
+
+    def top(self, year, n=10):
+        """[(code, cases, rank)] for the n highest-ranked countries in a year"""
+        row = self.year_index[year]
+        return [(self.codes[i], int(self.records[row, i]['cases']), int(self.records[row, i]['rank']))
+                for i in self._ordered(self.by_rank, year)[:n]]
+
+    def movers(self, year, n=5, increases=False):
+        """[(code, yoy)] for the n biggest drops (or, with increases=True, rises) into a year"""
+        row = self.year_index[year]
+        order = self._ordered(self.by_change, year)
+        order = order[::-1] if increases else order
+        return [(self.codes[i], int(self.records[row, i]['yoy'])) for i in order[:n]]
+
+def reference_series(cases):
+    """Scalar recomputation of one country's column (for verification)"""
+    yoy, cumulative, mean3, mean5 = [], [], [], []
+    total, started = 0, False
+    for i, value in enumerate(cases):
+        previous = cases[i - 1] if i else MISSING
+        yoy.append(value - previous if value != MISSING and previous != MISSING else NO_CHANGE)
+        if value != MISSING:
+            total += value
+            started = True
+        cumulative.append(total if started else MISSING)
+        for window, means in ((SHORT_WINDOW, mean3), (LONG_WINDOW, mean5)):
+            present = [v for v in cases[max(0, i - window + 1):i + 1] if v != MISSING]
+            means.append(np.float32(sum(present) / len(present)) if present else np.float32(np.nan))
+    return yoy, cumulative, mean3, mean5
+
+def verify_stats(stats, lookup):
+    """Compare against case_counts.bin and a scalar recomputation; returns a list of errors"""
+    errors = []
+    if stats.codes != lookup.codes or not np.array_equal(stats.years, lookup.years):
+        return ["Codes or years differ from case_counts.bin"]
+    if not np.array_equal(stats.records['cases'], lookup.matrix):
+        errors.append("Cases differ from case_counts.bin")
+
+    for col, code in enumerate(stats.codes):
+        column = [int(v) for v in lookup.matrix[:, col]]
+        yoy, cumulative, mean3, mean5 = reference_series(column)
+        records = stats.records[:, col]
+        if records['yoy'].tolist() != yoy or records['cumulative'].tolist() != cumulative:
+            errors.append(f"{code}: yoy or cumulative differs from recomputation")
+        if not (np.allclose(records['mean3'], mean3, equal_nan=True, rtol=1e-6) and
+                np.allclose(records['mean5'], mean5, equal_nan=True, rtol=1e-6)):
+            errors.append(f"{code}: rolling means differ from recomputation")
+        zeros = [int(stats.years[i]) for i, v in enumerate(column) if v == 0]
+        if (zeros[0] if zeros else 0) != int(stats.first_zero_years[col]):
+            errors.append(f"{code}: first zero year {int(stats.first_zero_years[col])}, expected {zeros[:1]}")
+
+    for row, year in enumerate(stats.years):
+        ranked = stats._ordered(stats.by_rank, int(year))
+        cases = stats.records['cases'][row, ranked]
+        ranks = stats.records['rank'][row, ranked]
+        if np.any(np.diff(cases) > 0) or (len(ranks) and (ranks[0] != 1 or np.any(np.diff(ranks.astype(int)) < 0))):
+            errors.append(f"{year}: rank order is not by descending cases")
+        # rank = 1 + number of countries with strictly more cases
+        if np.any(ranks != 1 + np.searchsorted(-cases, -cases, side='left')):
+            errors.append(f"{year}: ranks do not match case order")
+        changes = stats.records['yoy'][row, stats._ordered(stats.by_change, int(year))]
+        if np.any(np.diff(changes.astype(np.int64)) < 0):
+            errors.append(f"{year}: change order is not ascending")
+    return errors
+
+def print_year(stats, year, n=5):
+    print(f"\n{year} top {n}:")
+    for code, cases, rank in stats.top(year, n):
+        print(f"  {rank:>3}. {code}: {cases:,} cases (cumulative {stats.stats(code, year)['cumulative']:,})")
+    for label, increases in (("drops", False), ("rises", True)):
+        movers = [f"{code} {change:+,}" for code, change in stats.movers(year, n, increases)]
+        print(f"  Biggest {label}: {', '.join(movers) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute derived per-country case statistics")
+    parser.add_argument('--verify', action='store_true', help="Only verify an existing file")
+    parser.add_argument('--show', type=int, default=None, help="Print top countries and movers for a year")
+    args = parser.parse_args()
+
+    lookup = CaseCounts(CASE_COUNTS_FILE)
+    if not args.verify and args.show is None:
+        with step('compute', rows_in=lookup.matrix.size) as s:
+            size = write_stats(lookup.codes, lookup.years, np.asarray(lookup.matrix))
+            s.record_read(CASE_COUNTS_FILE)
+            s.record_write(STATS_FILE)
+            s.rows_out = lookup.matrix.size
+        print(f"Computed stats for {len(lookup.years)} years x {len(lookup.codes)} countries")
+        print(f"File size: {size / 1024:.1f} KB")
+
+    stats = CaseStats(STATS_FILE)
+    if args.show is not None:
+        if args.show not in stats.year_index:
+            parser.error(f"No data for {args.show}")
+        print_year(stats, args.show)
+        return
+
+    with step('verify'):
+        errors = verify_stats(stats, lookup)
+    if errors:
+        print("\n❌ Case stats verification failed:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Case stats match case_counts.bin")
+    print_year(stats, int(stats.years[-1]))
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Join country case counts, bins and vaccination coverage into one per-year asset.
+
+The app otherwise answers a country-year from three structures (year bins,
+case_counts.json and the raw coverage CSV). Here the case and coverage sources
+are joined once, vectorized over all years, into a dense year x country grid
+of fixed-size records, so any country-year is a single offset computation.
+
+Join rules:
+  cases     same rows as case_counts.bin (country codes, later duplicates win);
+            -1 where the source has no value (not the same as 0 cases)
+  bin       same rows as year_YYYY.csv (first duplicate wins, cases > 0);
+            0 where the country is not listed that year
+  coverage  country rows of the coverage export (OWID_ aggregates skipped, as
+            DataLoader.swift does). Coverage starts in 1981 while cases start
+            in 1980, so the year axis spans both sources. A missing year is
+            carried forward from the country's last reported value for at most
+            FILL_LIMIT years and flagged FLAG_FILLED; nothing is filled
+            backwards, so years before a country's first report stay NaN.
+
+country_years.bin layout (little-endian):
+
+  Header (32 bytes)
+    magic        4s   b'PCYR'
+    version      u16
+    fill_limit   u16  max years coverage was carried forward
+    code_count   u32
+    year_count   u32
+    first_year   i32  years are contiguous: first_year .. first_year + year_count - 1
+    code_width   u16  bytes per code (at least 8)
+    (10 bytes padding)
+  Codes:   code_count x code_width ASCII codes, NUL-padded, sorted
+  Records: year_count x code_count x 12 bytes, row-major by year
+    cases     i32  -1 = no data
+    coverage  f32  % of one-year-olds with three doses, NaN = no data
+    bin       u8
+    flags     u8   bit 0 = coverage carried forward
+    (2 bytes padding)
+
+Record (year, code) starts at byte
+  32 + code_count * code_width + ((year - first_year) * code_count + code_position) * 12.
+
+Usage:
+  python export_country_years.py              # write and validate
+  python export_country_years.py --validate   # only validate an existing file
+"""
+
+import argparse
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from binning import load_bin_table
+from create_case_counts_lookup import (BINARY_FILE as CASE_COUNTS_FILE, MISSING, CaseCounts, build_matrix,
+                                       extract_case_rows)
+from export_year_bundle import load_year_files
+from metrics import run_main, step
+from prepare_regional_data import INPUT_FILE, VACCINATION_COLUMN, VACCINATION_FILE
+from process_complete_polio_dataset import build_year_frames
+from regional_aggregation import country_rows
+from source_data import read_source
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+COUNTRY_YEARS_FILE = OUTPUT_DIR / "country_years.bin"
+
+MAGIC = b'PCYR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIiH10x')
+MIN_CODE_WIDTH = 8
+RECORD = np.dtype({'names': ['cases', 'coverage', 'bin', 'flags'],
+                   'formats': ['<i4', '<f4', 'u1', 'u1'],
+                   'offsets': [0, 4, 8, 9],
+                   'itemsize': 12})
+
+FILL_LIMIT = 3
+FLAG_FILLED = 1
+
+def build_country_years(cases_df, vacc_df, bin_table, fill_limit=FILL_LIMIT):
+    """
+    Join both sources into (first_year, codes, records) where records is a
+    year x code RECORD array covering every year of either source.
+    """
+    # Cases and bins use exactly the rules of their own assets
+    case_years, case_codes, case_matrix = build_matrix(extract_case_rows(cases_df))
+    frames = [frame.assign(Year=year) for year, frame in
+              build_year_frames(cases_df[cases_df['Code'].notna()], bin_table).items() if len(frame)]
+    bins = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Code', 'Bin', 'Year'])
+
+    coverage = country_rows(vacc_df, VACCINATION_COLUMN, 'coverage')
+    coverage = coverage[coverage['coverage'].notna()].drop_duplicates(['Code', 'Year'], keep='last')
+
+    codes = pd.Index(sorted(set(case_codes) | set(bins['Code'].astype(str)) | set(coverage['Code'])))
+    all_years = np.concatenate([case_years, bins['Year'].to_numpy(dtype=np.int64), coverage['Year'].to_numpy()])
+    first_year, last_year = int(all_years.min()), int(all_years.max())
+
+    records = np.zeros((last_year - first_year + 1, len(codes)), dtype=RECORD)
+    records['cases'] = MISSING
+    records['cases'][np.ix_(case_years - first_year, codes.get_indexer(case_codes))] = case_matrix
+    records['bin'][bins['Year'].to_numpy(dtype=np.int64) - first_year,
+                   codes.get_indexer(bins['Code'].astype(str))] = bins['Bin'].to_numpy()
+
+    # Coverage grid on the contiguous year axis, so ffill's limit counts years
+    reported = np.full(records.shape, np.nan, dtype=np.float32)
+    reported[coverage['Year'].to_numpy() - first_year, codes.get_indexer(coverage['Code'])] = coverage['coverage']
+    filled = pd.DataFrame(reported).ffill(limit=fill_limit).to_numpy(dtype=np.float32) if fill_limit else reported
+    records['coverage'] = filled
+    records['flags'] = np.where(np.isnan(reported) & ~np.isnan(filled), FLAG_FILLED, 0)
+    return first_year, codes.tolist(), records
+
+def build_payload(first_year, codes, records, fill_limit=FILL_LIMIT):
+    code_width = max([MIN_CODE_WIDTH] + [len(code.encode('ascii')) for code in codes])
+    header = HEADER.pack(MAGIC, VERSION, fill_limit, len(codes), len(records), first_year, code_width)
+    return header + np.array(codes, dtype=f'S{code_width}').tobytes() + records.tobytes()
+
+def write_country_years(first_year, codes, records, path=COUNTRY_YEARS_FILE, fill_limit=FILL_LIMIT):
+    payload = build_payload(first_year, codes, records, fill_limit)
+    with open(path, 'wb') as f:
+        f.write(payload)
+    return len(payload)
+
+class CountryYears:
+    """O(1) country-year lookups over a memory-mapped country_years.bin"""
+
+    def __init__(self, path=COUNTRY_YEARS_FILE):
+        self.path = Path(path)
+        raw = np.memmap(self.path, dtype=np.uint8, mode='r')
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{self.path} is too small to be a country-years file")
+        (magic, version, self.fill_limit, code_count, year_count,
+         self.first_year, code_width) = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} country-years file")
+        codes_end = HEADER.size + code_count * code_width
+        records_end = codes_end + year_count * code_count * RECORD.itemsize
+        if records_end > len(raw):
+            raise ValueError(f"{self.path} is truncated ({len(raw)} < {records_end} bytes)")
+
+        self.codes = [c.decode('ascii') for c in raw[HEADER.size:codes_end].view(f'S{code_width}')]
+        self.records = raw[codes_end:records_end].view(RECORD).reshape(year_count, code_count)
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+
+    @property
+    def years(self):
+        return list(range(self.first_year, self.first_year + len(self.records)))
+
+    def record(self, code, year):
+        """{'cases', 'coverage', 'bin', 'filled'} for a country-year, or None if unknown"""
+        row = year - self.first_year
+        col = self.code_index.get(code)
+        if col is None or not 0 <= row < len(self.records):
+            return None
+        r = self.records[row, col]
+        cases, coverage = int(r['cases']), float(r['coverage'])
+        return {
+            'cases': None if cases == MISSING else cases,
+            'coverage': None if np.isnan(coverage) else coverage,
+            'bin': int(r['bin']),
+            'filled': bool(r['flags'] & FLAG_FILLED),
+        }
+
+    def year(self, year):
+        """RECORD view of one year, indexed like self.codes"""
+        return self.records[year - self.first_year]
+
+def validate_country_years(path=COUNTRY_YEARS_FILE, years_dir=OUTPUT_DIR, case_counts_file=CASE_COUNTS_FILE):
+    """Check structure, then bins against the year CSVs and cases against case_counts.bin"""
+    errors = []
+    try:
+        data = CountryYears(path)
+    except (OSError, ValueError) as e:
+        return [str(e)]
+    if data.codes != sorted(data.codes):
+        errors.append("Code dictionary is not sorted")
+
+    flags = data.records['flags']
+    coverage = data.records['coverage']
+    if np.any(flags > FLAG_FILLED):
+        errors.append("Unknown flag bits set")
+    if np.any((flags & FLAG_FILLED).astype(bool) & np.isnan(coverage)):
+        errors.append("Records flagged as filled have no coverage")
+    if np.nanmin(coverage, initial=0) < 0 or np.nanmax(coverage, initial=0) > 100:
+        errors.append("Coverage outside 0-100%")
+
+    for year, year_bins in load_year_files(years_dir).items():
+        if not data.first_year <= year < data.first_year + len(data.records):
+            errors.append(f"{year}: year file outside the record range")
+            continue
+        bins = data.year(year)['bin']
+        listed = {data.codes[i]: int(bins[i]) for i in np.flatnonzero(bins)}
+        if listed != {code: b for code, b in year_bins.items() if b}:
+            errors.append(f"{year}: bins differ from year_{year}.csv")
+
+    if Path(case_counts_file).exists():
+        lookup = CaseCounts(case_counts_file)
+        for year in data.years:
+            cases = data.year(year)['cases']
+            present = {data.codes[i]: int(cases[i]) for i in np.flatnonzero(cases != MISSING)}
+            expected = lookup.year(year) if year in lookup.year_index else {}
+            if present != expected:
+                errors.append(f"{year}: cases differ from {Path(case_counts_file).name}")
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Join cases, bins and coverage into country_years.bin")
+    parser.add_argument('--validate', action='store_true', help="Only validate an existing file")
+    parser.add_argument('--fill-limit', type=int, default=FILL_LIMIT,
+                        help=f"Max years to carry coverage forward (default {FILL_LIMIT}, 0 = never)")
+    args = parser.parse_args()
+    if not 0 <= args.fill_limit <= np.iinfo(np.uint16).max:
+        parser.error("--fill-limit must be between 0 and 65535")
+
+    if not args.validate:
+        with step('load') as s:
+            cases_df = read_source(INPUT_FILE)
+            vacc_df = read_source(VACCINATION_FILE)
+            table = load_bin_table()
+            s.record_read(INPUT_FILE, VACCINATION_FILE)
+            s.rows_out = len(cases_df) + len(vacc_df)
+        with step('join', rows_in=s.rows_out) as s:
+            first_year, codes, records = build_country_years(cases_df, vacc_df, table, args.fill_limit)
+            s.rows_out = records.size
+        with step('write', rows_in=records.size) as s:
+            size = write_country_years(first_year, codes, records, fill_limit=args.fill_limit)
+            s.record_write(COUNTRY_YEARS_FILE)
+
+        has_cases = records['cases'] != MISSING
+        has_coverage = ~np.isnan(records['coverage'])
+        filled = (records['flags'] & FLAG_FILLED).astype(bool)
+        print(f"Joined {len(records)} years ({first_year}-{first_year + len(records) - 1}) x {len(codes)} countries")
+        print(f"  with cases:    {int(has_cases.sum())}")
+        print(f"  with coverage: {int(has_coverage.sum())} ({int(filled.sum())} carried forward)")
+        print(f"  with both:     {int((has_cases & has_coverage).sum())}")
+        print(f"File size: {size / 1024:.1f} KB")
+
+    with step('validate'):
+        errors = validate_country_years()
+    if errors:
+        print("\n❌ Country-years validation failed:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Country-years match year files and case counts")
+
+if __name__ == "__main__":
+    run_main(main)
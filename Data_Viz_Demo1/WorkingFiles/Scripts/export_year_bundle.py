@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Pack every year_YYYY.csv into one memory-mappable binary bundle.
+
+The app can map DataFiles/year_bins.bin once and slice any year without
+opening or parsing another file. Layout (all integers little-endian):
+
+  Header (32 bytes)
+    magic          4s   b'PBIN'
+    version        u16
+    code_width     u16  bytes per code (at least 8)
+    code_count     u32
+    year_count     u32
+    codes_offset   u32  start of the code dictionary
+    years_offset   u32  start of the year offset table
+    data_offset    u32  start of the packed bin arrays
+    (4 bytes padding)
+
+  Code dictionary: code_count x code_width ASCII codes, NUL-padded, sorted
+
+  Year table: year_count x (year i32, offset u32, nonzero u32)
+    offset is absolute; nonzero is how many countries have a bin > 0
+
+  Data: one uint8 array of code_count bins per year, indexed by code
+    position. Bin 0 means the country is not listed in that year's CSV.
+
+Usage:
+  python export_year_bundle.py             # write and validate the bundle
+  python export_year_bundle.py --validate  # only validate an existing bundle
+"""
+
+import csv
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from binning import load_bin_table
+from metrics import run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent.parent
+OUTPUT_DIR = DATA_DIR / "DataFiles"
+BUNDLE_FILE = OUTPUT_DIR / "year_bins.bin"
+
+MAGIC = b'PBIN'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIIII4x')
+MIN_CODE_WIDTH = 8
+YEAR_ENTRY = np.dtype([('year', '<i4'), ('offset', '<u4'), ('nonzero', '<u4')])
+
+def load_year_files(years_dir=OUTPUT_DIR):
+    """Read year_YYYY.csv files into {year: {code: bin}}"""
+    years = {}
+    for path in sorted(years_dir.glob("year_*.csv")):
+        year = int(path.stem.split('_')[1])
+        with open(path, newline='') as f:
+            years[year] = {row['Code']: int(row['Bin']) for row in csv.DictReader(f)}
+    return years
+
+def code_width(codes):
+    """Bytes per code in a code dictionary: the longest code, at least MIN_CODE_WIDTH"""
+    return max([MIN_CODE_WIDTH] + [len(code.encode('ascii')) for code in codes])
+
+def build_bundle(years):
+    """Encode {year: {code: bin}} into bundle bytes"""
+    codes = sorted({code for year_bins in years.values() for code in year_bins})
+    width = code_width(codes)
+    code_index = {code: i for i, code in enumerate(codes)}
+
+    year_list = sorted(years)
+    codes_offset = HEADER.size
+    years_offset = codes_offset + len(codes) * width
+    data_offset = years_offset + len(year_list) * YEAR_ENTRY.itemsize
+
+    data = np.zeros((len(year_list), len(codes)), dtype=np.uint8)
+    table = np.zeros(len(year_list), dtype=YEAR_ENTRY)
+    for row, year in enumerate(year_list):
+        year_bins = years[year]
+        if year_bins:
+            values = np.fromiter(year_bins.values(), dtype=np.int64, count=len(year_bins))
+            if values.min() < 0 or values.max() > 255:
+                raise ValueError(f"Bins for {year} do not fit in uint8")
+            idx = np.fromiter((code_index[c] for c in year_bins), dtype=np.int64, count=len(year_bins))
+            data[row, idx] = values
+        table[row] = (year, data_offset + row * len(codes), np.count_nonzero(data[row]))
+
+    code_block = np.array(codes, dtype=f'S{width}')
+    header = HEADER.pack(MAGIC, VERSION, width, len(codes), len(year_list),
+                         codes_offset, years_offset, data_offset)
+    return header + code_block.tobytes() + table.tobytes() + data.tobytes()
+
+def write_bundle(years, path=BUNDLE_FILE):
+    payload = build_bundle(years)
+    with open(path, 'wb') as f:
+        f.write(payload)
+    return len(payload)
+
+class YearBundle:
+    """Zero-copy reader over a memory-mapped year_bins.bin"""
+
+    def __init__(self, path=BUNDLE_FILE):
+        self.path = Path(path)
+        raw = np.memmap(self.path, dtype=np.uint8, mode='r')
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{self.path} is too small to be a year bundle")
+        (magic, self.version, self.code_width, code_count, year_count,
+         codes_offset, years_offset, data_offset) = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} has bad magic {magic!r}")
+        if self.version != VERSION:
+            raise ValueError(f"{self.path} has unsupported version {self.version}")
+
+        # Views into the mapped file; nothing is copied until a year is read
+        codes_end = codes_offset + code_count * self.code_width
+        years_end = years_offset + year_count * YEAR_ENTRY.itemsize
+        data_end = data_offset + year_count * code_count
+        if data_end > len(raw):
+            raise ValueError(f"{self.path} is truncated ({len(raw)} < {data_end} bytes)")
+        self.table = raw[years_offset:years_end].view(YEAR_ENTRY)
+        self.data = raw[data_offset:data_end].reshape(year_count, code_count)
+        self.codes = [c.decode('ascii') for c in raw[codes_offset:codes_end].view(f'S{self.code_width}')]
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self._year_row = {int(year): row for row, year in enumerate(self.table['year'])}
+
+    @property
+    def years(self):
+        return sorted(self._year_row)
+
+    def year_bins(self, year):
+        """uint8 view of bins for one year, indexed like self.codes"""
+        return self.data[self._year_row[year]]
+
+    def year_dict(self, year):
+        """{code: bin} for countries with a bin > 0 (the year CSV contents)"""
+        bins = self.year_bins(year)
+        return {self.codes[i]: int(bins[i]) for i in np.flatnonzero(bins)}
+
+    def bin(self, code, year):
+        return int(self.data[self._year_row[year], self.code_index[code]])
+
+def validate_bundle(path=BUNDLE_FILE, years_dir=OUTPUT_DIR, max_bin=None):
+    """Check bundle structure and compare it with the year CSVs; returns a list of errors"""
+    errors = []
+    try:
+        bundle = YearBundle(path)
+    except (OSError, ValueError) as e:
+        return [str(e)]
+
+    n_codes = len(bundle.codes)
+    expected_offsets = bundle.table['offset'][0] + np.arange(len(bundle.table)) * n_codes if len(bundle.table) else []
+    if not np.array_equal(bundle.table['offset'], expected_offsets):
+        errors.append("Year offsets are not contiguous")
+    if bundle.codes != sorted(bundle.codes):
+        errors.append("Code dictionary is not sorted")
+    if max_bin is not None and bundle.data.size and bundle.data.max() > max_bin:
+        errors.append(f"Bin {int(bundle.data.max())} exceeds max bin {max_bin}")
+
+    years = load_year_files(years_dir)
+    if sorted(years) != bundle.years:
+        errors.append(f"Year mismatch: CSVs {sorted(years)} vs bundle {bundle.years}")
+    for row, entry in enumerate(bundle.table):
+        year = int(entry['year'])
+        if int(entry['nonzero']) != np.count_nonzero(bundle.data[row]):
+            errors.append(f"{year}: nonzero count {int(entry['nonzero'])} does not match data")
+        if year in years and bundle.year_dict(year) != {c: b for c, b in years[year].items() if b}:
+            errors.append(f"{year}: bins differ from year_{year}.csv")
+    return errors
+
+def max_bin_from_csv(bins_path=OUTPUT_DIR / "bins.csv"):
+    """Highest bin id in bins.csv (read through binning, which skips '#' comment lines)"""
+    return int(load_bin_table(bins_path).bins.max())
+
+def main():
+    if '--validate' not in sys.argv:
+        with step('load') as s:
+            years = load_year_files()
+            s.record_read(*OUTPUT_DIR.glob("year_*.csv"))
+            s.rows_out = sum(len(codes) for codes in years.values())
+        with step('write', rows_in=s.rows_out) as s:
+            size = write_bundle(years)
+            s.record_write(BUNDLE_FILE)
+        print(f"Packed {len(years)} year files into {BUNDLE_FILE.name}")
+        print(f"File size: {size / 1024:.1f} KB")
+
+    with step('validate'):
+        errors = validate_bundle(max_bin=max_bin_from_csv())
+    if errors:
+        print("\n❌ Bundle validation failed:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Bundle matches year CSV files")
+
+if __name__ == "__main__":
+    run_main(main)
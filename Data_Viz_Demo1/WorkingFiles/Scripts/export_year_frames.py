@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Pre-bake sub-year animation frames of every country's bar height and color.
+
+Between each pair of consecutive years, frames_per_year frames are computed in
+one vectorized pass:
+
+  cases(t)  = expm1((1 - t) * log1p(a) + t * log1p(b))   log-space interpolation
+  height(t) = curve(cases(t)) + endpoint correction
+
+curve() is piecewise linear in log1p(cases) through each bin's (edge_max,
+height_m) and (edge_max, color_hex) anchors, so bars grow smoothly across bin
+boundaries. The correction term blends out the difference between the curve
+and the discrete bin at each end, so frame 0 of every year is exactly that
+year's bin height and color from bins.csv.
+
+year_frames.bin layout (little-endian):
+
+  Header (32 bytes)
+    magic            4s   b'PFRM'
+    version          u16
+    frames_per_year  u16
+    code_count       u32
+    year_count       u32
+    frame_count      u32
+    frame_stride     u32  bytes per frame (16-byte aligned)
+    index_offset     u32
+    data_offset      u32
+  Codes: code_count x code_width ASCII codes (same order as year_bins.bin),
+    code_width = (index_offset - 32) / code_count, at least 8
+  Frame index: frame_count x (time f32 fractional year, offset u32)
+  Frames: frame_count x [heights f16 x code_count | RGBA u8 x code_count x 4 | padding]
+
+Playback copies one frame block per tick; no per-country math at runtime.
+
+Usage:
+  python export_year_frames.py                  # 8 frames per year
+  python export_year_frames.py --frames 30
+"""
+
+import argparse
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from binning import load_bin_table
+from create_case_counts_lookup import BINARY_FILE as CASE_COUNTS_FILE, CaseCounts
+from export_year_bundle import BUNDLE_FILE, MIN_CODE_WIDTH, YearBundle, code_width
+from metrics import run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+FRAMES_FILE = OUTPUT_DIR / "year_frames.bin"
+
+MAGIC = b'PFRM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIIII')
+FRAME_ENTRY = np.dtype([('time', '<f4'), ('offset', '<u4')])
+FRAME_ALIGN = 16
+FRAMES_PER_YEAR = 8
+
+def parse_colors(hex_colors):
+    """'#RRGGBB' / '#RRGGBBAA' -> (n, 4) float RGBA in 0..255"""
+    rgba = np.empty((len(hex_colors), 4))
+    for i, value in enumerate(hex_colors):
+        value = value.lstrip('#')
+        if len(value) == 6:
+            value += 'FF'
+        if len(value) != 8:
+            raise ValueError(f"Unsupported color {value!r} in bins.csv")
+        rgba[i] = [int(value[j:j + 2], 16) for j in range(0, 8, 2)]
+    return rgba
+
+def bin_curve(table):
+    """
+    Anchors of the continuous curve: x = log1p(edge_max), y = height / RGBA.
+    Bin 0 sits at zero cases; the open-ended top bin shares the last edge.
+    """
+    positions = np.searchsorted(table.bins, table.edge_bins[:len(table.edges)])
+    x = np.concatenate([[0.0], np.log1p(table.edges)])
+    rows = np.concatenate([[np.searchsorted(table.bins, 0)], positions])
+    return x, table.heights[rows], parse_colors(table.colors[rows])
+
+def load_keyframes(bundle, case_counts):
+    """(years, bins, cases) with bins/cases as year x code arrays in bundle code order"""
+    years = np.array(bundle.years, dtype=np.int32)
+    bins = np.stack([bundle.year_bins(int(year)) for year in years]).astype(np.int64)
+    cases = np.zeros(bins.shape, dtype=np.float64)
+    code_columns = np.array([case_counts.code_index.get(code, -1) for code in bundle.codes])
+    present = code_columns >= 0
+    for row, year in enumerate(years):
+        year_row = case_counts.year_index.get(int(year))
+        if year_row is None:
+            continue
+        values = np.asarray(case_counts.matrix[year_row], dtype=np.float64)[code_columns[present]]
+        cases[row, present] = np.maximum(values, 0.0)
+    # Listed countries always have at least one case, even if the count is missing
+    cases[(bins > 0) & (cases < 1)] = 1.0
+    return years, bins, cases
+
+def bake_frames(bins, cases, table, frames_per_year=FRAMES_PER_YEAR):
+    """
+    Heights (frames x codes) and RGBA (frames x codes x 4) for every frame.
+    Frame k * frames_per_year is exactly year k's keyframe.
+    """
+    curve_x, curve_heights, curve_colors = bin_curve(table)
+    positions = np.searchsorted(table.bins, bins)
+    key_heights = table.heights[positions]
+    key_colors = parse_colors(table.colors)[positions]
+
+    logs = np.log1p(cases)
+    key_curve_heights = np.interp(logs, curve_x, curve_heights)
+    key_curve_colors = np.stack([np.interp(logs, curve_x, curve_colors[:, c]) for c in range(4)], axis=-1)
+
+    # t has shape (steps, 1); keyframe pairs broadcast to (pairs, steps, codes)
+    t = (np.arange(frames_per_year) / frames_per_year)[None, :, None]
+    a, b = logs[:-1, None, :], logs[1:, None, :]
+    frame_logs = (1 - t) * a + t * b
+
+    heights = np.interp(frame_logs, curve_x, curve_heights)
+    heights += ((1 - t) * (key_heights - key_curve_heights)[:-1, None, :]
+                + t * (key_heights - key_curve_heights)[1:, None, :])
+    colors = np.stack([np.interp(frame_logs, curve_x, curve_colors[:, c]) for c in range(4)], axis=-1)
+    color_offsets = key_colors - key_curve_colors
+    colors += (1 - t)[..., None] * color_offsets[:-1, None] + t[..., None] * color_offsets[1:, None]
+
+    n_codes = bins.shape[1]
+    heights = np.concatenate([heights.reshape(-1, n_codes), key_heights[-1:]])
+    colors = np.concatenate([colors.reshape(-1, n_codes, 4), key_colors[-1:]])
+    return np.maximum(heights, 0.0), np.clip(np.rint(colors), 0, 255).astype(np.uint8)
+
+def frame_times(years, frames_per_year=FRAMES_PER_YEAR):
+    """Fractional year of every frame (gaps between listed years are spanned evenly)"""
+    t = np.arange(frames_per_year) / frames_per_year
+    times = years[:-1, None] + t[None, :] * np.diff(years)[:, None]
+    return np.append(times.ravel(), years[-1]).astype(np.float32)
+
+def build_frames(years, codes, heights, colors, frames_per_year=FRAMES_PER_YEAR):
+    n_frames, n_codes = heights.shape
+    body = n_codes * 2 + n_codes * 4
+    stride = -(-body // FRAME_ALIGN) * FRAME_ALIGN
+    width = code_width(codes)
+    codes_offset = HEADER.size
+    index_offset = codes_offset + n_codes * width
+    data_offset = -(-(index_offset + n_frames * FRAME_ENTRY.itemsize) // FRAME_ALIGN) * FRAME_ALIGN
+
+    index = np.zeros(n_frames, dtype=FRAME_ENTRY)
+    index['time'] = frame_times(years, frames_per_year)
+    index['offset'] = data_offset + np.arange(n_frames) * stride
+
+    # Each frame is one contiguous block: heights then RGBA, padded to the stride
+    data = np.zeros((n_frames, stride), dtype=np.uint8)
+    data[:, :n_codes * 2] = heights.astype('<f2').view(np.uint8).reshape(n_frames, -1)
+    data[:, n_codes * 2:body] = colors.reshape(n_frames, -1)
+
+    header = HEADER.pack(MAGIC, VERSION, frames_per_year, n_codes, len(years), n_frames,
+                         stride, index_offset, data_offset)
+    padding = bytes(data_offset - index_offset - index.nbytes)
+    code_block = np.array(codes, dtype=f'S{width}')
+    return header + code_block.tobytes() + index.tobytes() + padding + data.tobytes()
+
+class YearFrames:
+    """Zero-copy reader over a memory-mapped year_frames.bin"""
+
+    def __init__(self, path=FRAMES_FILE):
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        (magic, version, self.frames_per_year, code_count, year_count, frame_count,
+         self.stride, index_offset, data_offset) = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} frames file")
+        data_end = data_offset + frame_count * self.stride
+        if data_end > len(raw):
+            raise ValueError(f"{path} is truncated ({len(raw)} < {data_end} bytes)")
+        width = (index_offset - HEADER.size) // code_count if code_count else MIN_CODE_WIDTH
+        self.codes = [c.decode('ascii') for c in raw[HEADER.size:HEADER.size + code_count * width].view(f'S{width}')]
+        self.index = raw[index_offset:index_offset + frame_count * FRAME_ENTRY.itemsize].view(FRAME_ENTRY)
+        self.data = raw[data_offset:data_end].reshape(frame_count, self.stride)
+        self.code_count = code_count
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame(self, i):
+        """(heights f16 view, RGBA uint8 view) of frame i"""
+        block = self.data[i]
+        heights = block[:self.code_count * 2].view('<f2')
+        colors = block[self.code_count * 2:self.code_count * 6].reshape(self.code_count, 4)
+        return heights, colors
+
+    def frame_at(self, time):
+        """Frame index at or just before a fractional year"""
+        return max(int(np.searchsorted(self.index['time'], np.float32(time), side='right')) - 1, 0)
+
+def verify_frames(frames, bundle, table):
+    """Keyframes must equal the discrete bins; returns a list of errors"""
+    errors = []
+    if frames.codes != bundle.codes:
+        errors.append("Code order does not match year_bins.bin")
+    colors = parse_colors(table.colors).astype(np.uint8)
+    for row, year in enumerate(bundle.years):
+        i = row * frames.frames_per_year
+        if frames.index['time'][i] != year:
+            errors.append(f"Frame {i} is at {frames.index['time'][i]}, expected {year}")
+            continue
+        positions = np.searchsorted(table.bins, bundle.year_bins(year))
+        heights, rgba = frames.frame(i)
+        if not np.array_equal(heights, table.heights[positions].astype(np.float16)):
+            errors.append(f"{year}: keyframe heights differ from bins.csv")
+        if not np.array_equal(rgba, colors[positions]):
+            errors.append(f"{year}: keyframe colors differ from bins.csv")
+    heights = frames.data[:, :frames.code_count * 2].view('<f2')
+    if not np.all(np.isfinite(heights)) or heights.min() < 0:
+        errors.append("Frames contain negative or non-finite heights")
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake sub-year animation frames")
+    parser.add_argument('--frames', type=int, default=FRAMES_PER_YEAR, help="Frames per year (>= 1)")
+    args = parser.parse_args()
+    if not 1 <= args.frames <= np.iinfo(np.uint16).max:
+        parser.error("--frames must be between 1 and 65535")
+
+    with step('load') as s:
+        table = load_bin_table()
+        bundle = YearBundle(BUNDLE_FILE)
+        years, bins, cases = load_keyframes(bundle, CaseCounts(CASE_COUNTS_FILE))
+        s.record_read(BUNDLE_FILE, CASE_COUNTS_FILE)
+        s.rows_out = bins.size
+    with step('bake', rows_in=bins.size) as s:
+        heights, colors = bake_frames(bins, cases, table, args.frames)
+        s.rows_out = len(heights)
+    with step('write', rows_in=len(heights)) as s:
+        payload = build_frames(years, bundle.codes, heights, colors, args.frames)
+        with open(FRAMES_FILE, 'wb') as f:
+            f.write(payload)
+        s.record_write(FRAMES_FILE)
+    print(f"Baked {len(heights)} frames ({args.frames} per year, {len(bundle.codes)} countries)")
+    print(f"File size: {len(payload) / 1024:.1f} KB")
+
+    with step('verify'):
+        errors = verify_frames(YearFrames(FRAMES_FILE), bundle, table)
+    if errors:
+        print("\n❌ Frame verification failed:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Keyframes match year bins")
+
+if __name__ == "__main__":
+    run_main(main)
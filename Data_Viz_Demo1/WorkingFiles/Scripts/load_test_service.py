@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Load test for data_service.py.
+
+Opens --concurrency keep-alive connections and sends --requests GET requests
+drawn from a mix of year slices, country series, region series and timeline
+ranges. Reports requests per second and p50/p90/p99 latency.
+
+Without --url a service is started on a free local port for the duration of
+the test.
+
+Usage:
+  python load_test_service.py                              # start a local service
+  python load_test_service.py --url http://127.0.0.1:8765 --requests 20000
+  python load_test_service.py --no-gzip --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from metrics import run_main
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+
+DEFAULT_REQUESTS = 5000
+DEFAULT_CONCURRENCY = 16
+STARTUP_TIMEOUT_S = 30
+
+async def fetch(reader, writer, host, path, gzip=True):
+    """Send one GET on an open connection; returns (status, body bytes)"""
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"]
+    if gzip:
+        lines.append("Accept-Encoding: gzip")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    body = await reader.readexactly(length) if length else b''
+    return status, body
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await fetch(reader, writer, host, path, gzip=False)
+        return json.loads(body)
+    finally:
+        writer.close()
+
+def build_paths(years, countries, regions, count, seed=0):
+    """A reproducible query mix weighted towards the app's common requests"""
+    rng = random.Random(seed)
+    first, last = years[0], years[-1]
+    region_paths = [(grouping, code) for grouping, codes in regions.items() for code in codes]
+    paths = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            paths.append(f"/year/{rng.choice(years)}")
+        elif kind < 0.7:
+            start = rng.randint(first, last)
+            paths.append(f"/country/{rng.choice(countries)}?from={start}&to={rng.randint(start, last)}")
+        elif kind < 0.9:
+            grouping, code = rng.choice(region_paths)
+            paths.append(f"/region/{code}?grouping={grouping}&from={rng.randint(first, last)}")
+        else:
+            start = rng.randint(first, last)
+            paths.append(f"/timeline?from={start}&to={min(start + 5, last)}")
+    return paths
+
+async def worker(host, port, queue, latencies, statuses, gzip):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                status, _ = await fetch(reader, writer, host, path, gzip)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                statuses['error'] = statuses.get('error', 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def run_load_test(host, port, requests, concurrency, gzip=True, seed=0):
+    years = (await get_json(host, port, "/years"))['years']
+    regions = await get_json(host, port, "/regions")
+    year_data = await get_json(host, port, f"/year/{years[-1]}")
+    countries = sorted(year_data['countries']) or ['AFG']
+
+    queue = asyncio.Queue()
+    for path in build_paths(years, countries, regions, requests, seed):
+        queue.put_nowait(path)
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, queue, latencies, statuses, gzip)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = await get_json(host, port, "/stats")
+    return latencies, statuses, elapsed, stats
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_service(port):
+    process = subprocess.Popen([sys.executable, "data_service.py", "--port", str(port)],
+                               cwd=SCRIPT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    deadline = time.time() + STARTUP_TIMEOUT_S
+    while time.time() < deadline:
+        line = process.stdout.readline()
+        if line.startswith("Serving"):
+            return process
+        if process.poll() is not None:
+            break
+    process.kill()
+    raise RuntimeError("data_service.py did not start")
+
+def print_report(latencies, statuses, elapsed, stats, concurrency):
+    ms = np.array(latencies) * 1000
+    print(f"\nRequests:     {len(latencies):,} in {elapsed:.2f}s with {concurrency} connections")
+    print(f"Throughput:   {len(latencies) / elapsed:,.0f} requests/s")
+    if len(ms):
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        print(f"Latency:      p50 {p50:.2f}ms  p90 {p90:.2f}ms  p99 {p99:.2f}ms  max {ms.max():.2f}ms")
+    print(f"Status codes: {dict(sorted(statuses.items(), key=str))}")
+    cache = stats['cache']
+    print(f"Cache:        {cache['hits']:,} hits / {cache['misses']:,} misses "
+          f"(hit ratio {cache['hit_ratio']}), {cache['entries']} entries")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the polio data service")
+    parser.add_argument('--url', default=None, help="Service base URL (default: start a local one)")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--no-gzip', action='store_true', help="Do not send Accept-Encoding: gzip")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        process = start_service(port)
+    try:
+        print(f"Load testing http://{host}:{port} ...")
+        result = asyncio.run(run_load_test(host, port, args.requests, args.concurrency,
+                                           gzip=not args.no_gzip, seed=args.seed))
+        print_report(*result, args.concurrency)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Lightweight instrumentation shared by the pipeline scripts.
+
+Scripts wrap their entry point with run_main() and mark interesting
+sub-steps with step():
+
+  with step('binning', rows_in=len(df)) as s:
+      bins = assign_bins(...)
+      s.rows_out = len(bins)
+  with step('write') as s:
+      df.to_csv(path)
+      s.record_write(path)
+
+Every step records wall and CPU time, input/output row counts, bytes read and
+written and the peak traced Python memory (tracemalloc) while it ran. Steps
+nest; a parent's bytes and peak include its children's.
+
+Instrumentation is off unless POLIO_METRICS_DIR is set; then each run writes
+<script>.json to that directory (run_pipeline.py --metrics sets it per run).
+With POLIO_PROFILE=1 the whole script also runs under cProfile and the stats
+are dumped to <script>.prof next to the metrics. When off, step() only costs
+two clock reads, and tracemalloc, json and platform are never even imported
+(they would add ~30 ms to every script's startup).
+
+Usage:
+  POLIO_METRICS_DIR=/tmp/metrics python process_complete_polio_dataset.py
+  python metrics.py /tmp/metrics/process_complete_polio_dataset.json
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+METRICS_ROOT = SCRIPT_DIR.parent / "Metrics"
+
+METRICS_DIR_ENV = 'POLIO_METRICS_DIR'
+PROFILE_ENV = 'POLIO_PROFILE'
+VERSION = 1
+
+class Step:
+    """Measurements for one named (sub-)step"""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_traced_bytes = None
+        self.wall_s = self.cpu_s = 0.0
+        self.children = []
+
+    def record_read(self, *paths):
+        """Add the size of each input file to bytes_read"""
+        self.bytes_read += sum(file_size(p) for p in paths)
+
+    def record_write(self, *paths):
+        """Add the size of each output file to bytes_written"""
+        self.bytes_written += sum(file_size(p) for p in paths)
+
+    def to_dict(self):
+        result = {
+            'name': self.name,
+            'wall_s': round(self.wall_s, 6),
+            'cpu_s': round(self.cpu_s, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'peak_traced_bytes': self.peak_traced_bytes,
+        }
+        if self.children:
+            result['steps'] = [child.to_dict() for child in self.children]
+        return result
+
+def file_size(path):
+    path = Path(path)
+    return path.stat().st_size if path.is_file() else 0
+
+# Innermost open step last; only the main thread opens steps
+_stack = []
+
+# Imported by run_main() only when metrics are on
+tracemalloc = None
+
+def enabled():
+    return bool(os.environ.get(METRICS_DIR_ENV))
+
+def current():
+    """The innermost open step, or None outside run_main()"""
+    return _stack[-1] if _stack else None
+
+@contextmanager
+def step(name, rows_in=None):
+    """Time a block as a child of the current step"""
+    record = Step(name, rows_in)
+    parent = current()
+    tracing = tracemalloc is not None and tracemalloc.is_tracing()
+    if tracing:
+        # Fold the parent's peak so far in before resetting it for this step
+        parent_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    _stack.append(record)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record.wall_s = time.perf_counter() - wall
+        record.cpu_s = time.process_time() - cpu
+        _stack.pop()
+        if tracing:
+            # Children already folded their peaks (and ours before them) into the record
+            record.peak_traced_bytes = max(tracemalloc.get_traced_memory()[1],
+                                           record.peak_traced_bytes or 0)
+            if parent is not None:
+                # The parent's peak covers both its time before this step and this step
+                parent.peak_traced_bytes = max(parent.peak_traced_bytes or 0, parent_peak,
+                                               record.peak_traced_bytes)
+        if parent is not None:
+            parent.children.append(record)
+            parent.bytes_read += record.bytes_read
+            parent.bytes_written += record.bytes_written
+
+def max_rss_bytes():
+    """Peak resident set size of this process (None where unsupported)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def write_metrics(root, path, exit_code, started):
+    import json
+    import platform
+
+    report = {
+        'version': VERSION,
+        'script': root.name,
+        'argv': sys.argv[1:],
+        'started': started,
+        'exit_code': exit_code,
+        'python': platform.python_version(),
+        'max_rss_bytes': max_rss_bytes(),
+        **root.to_dict(),
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def run_main(main):
+    """Run a script's main(), recording metrics if POLIO_METRICS_DIR is set"""
+    global tracemalloc
+    if not enabled():
+        return main()
+
+    import tracemalloc
+    from datetime import datetime, timezone
+
+    script = Path(sys.argv[0]).stem or 'script'
+    out_dir = Path(os.environ[METRICS_DIR_ENV])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    profiler = None
+    if os.environ.get(PROFILE_ENV):
+        import cProfile
+        profiler = cProfile.Profile()
+
+    tracemalloc.start()
+    exit_code = 0
+    try:
+        with step(script) as root:
+            if profiler:
+                profiler.enable()
+            try:
+                return main()
+            finally:
+                if profiler:
+                    profiler.disable()
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else 1
+        raise
+    except BaseException:
+        exit_code = 1
+        raise
+    finally:
+        tracemalloc.stop()
+        write_metrics(root, out_dir / f"{script}.json", exit_code, started)
+        if profiler:
+            profiler.dump_stats(out_dir / f"{script}.prof")
+
+# MARK: - Reporting
+
+def flatten(report, depth=0):
+    """(depth, step dict) pairs in tree order"""
+    yield depth, report
+    for child in report.get('steps', []):
+        yield from flatten(child, depth + 1)
+
+def format_bytes(n):
+    if n is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+def print_metrics(report):
+    print(f"{'step':36s} {'wall':>8s} {'cpu':>8s} {'rows in':>9s} {'rows out':>9s} "
+          f"{'read':>8s} {'written':>8s} {'peak':>8s}")
+    for depth, s in flatten(report):
+        rows_in = '-' if s['rows_in'] is None else f"{s['rows_in']:,}"
+        rows_out = '-' if s['rows_out'] is None else f"{s['rows_out']:,}"
+        print(f"{'  ' * depth + s['name']:36s} {s['wall_s']:7.3f}s {s['cpu_s']:7.3f}s {rows_in:>9s} {rows_out:>9s} "
+              f"{format_bytes(s['bytes_read']):>8s} {format_bytes(s['bytes_written']):>8s} "
+              f"{format_bytes(s['peak_traced_bytes']):>8s}")
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    import json
+
+    for path in sys.argv[1:]:
+        with open(path) as f:
+            report = json.load(f)
+        print(f"\n{path} (exit {report['exit_code']}, max RSS {format_bytes(report['max_rss_bytes'])})")
+        print_metrics(report)
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,239 @@
 #!/usr/bin/env python3
 """
 Prepare regional polio data for the visualization
+
+Small inputs are processed with the standard library (csv_core) and never
+import pandas; both paths write identical files.
+
+The grouping files (regional_<grouping>.csv) are only rebuilt when their
+inputs, the code that builds them or the files themselves changed: a stamp in
+WorkingFiles/.cache records the input digest and each file's digest.
 """
 
-import pandas as pd
+import argparse
+import json
 from pathlib import Path
 
+import country_registry
+import csv_core
+import regional_aggregation
+from country_registry import WORLD_CODE, WORLD_NAME, registry
+from csv_core import (ENGINES, NAN, file_digest, kahan_sum, lazy_import, pause_gc, read_columns,
+                      use_csv_core, write_csv)
+from regional_aggregation import (REGIONS_FILE, OUTPUT_COLUMNS, aggregate_regions, aggregate_regions_lite,
+                                  load_region_mappings, load_region_mappings_lite)
+from metrics import run_main, step
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+source_data = lazy_import('source_data')
+
 # Define paths
 SCRIPT_DIR = Path(__file__).parent
 RAW_DATA_DIR = SCRIPT_DIR.parent / "RawData"
 FINAL_DATA_DIR = SCRIPT_DIR.parent / "FinalDataRaw"
 OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+CACHE_DIR = SCRIPT_DIR.parent / ".cache"
+GROUPINGS_STAMP = CACHE_DIR / "regional_groupings.json"
 
 # Input files
 INPUT_FILE = FINAL_DATA_DIR / "number-of-estimated-paralytic-polio-cases-by-world-region.csv"
 VACCINATION_FILE = FINAL_DATA_DIR / "polio-vaccine-coverage-of-one-year-olds.csv"
 GLOBAL_TOTALS_FILE = RAW_DATA_DIR / "Global_Polio_Totals_Simplified__1980_2023_.csv"
 
+CASES_COLUMN = 'Estimated polio cases'
+VACCINATION_COLUMN = 'Share of one-year-olds who have had three doses of the polio vaccine'
+
+def build_regional_data(df, vacc_df):
+    """
+    Build the regional summary (Year,cases,Entity,Code,immunization_rate_pct)
+    from the OWID-published aggregate rows. Returns (regional_df, regions).
+    """
+    # Get unique regions (entries without country codes)
+    regions = df[df['Code'].isna()]['Entity'].unique().tolist()
+
+    # World totals come from the existing OWID_WRL rows (not recalculated),
+    # followed by every region, all selected in one pass
+    published = df[(df['Entity'] == WORLD_NAME) | df['Code'].isna()]
+    published = published.iloc[np.argsort(published['Entity'].to_numpy() != WORLD_NAME, kind='stable')]
+    regional_df = pd.DataFrame({
+        'Entity': published['Entity'].astype(str).to_numpy(),
+        'Year': published['Year'].to_numpy(),
+        'cases': published[CASES_COLUMN].to_numpy(),
+    })
+    region_code = registry().region_code
+    regional_df['Code'] = regional_df['Entity'].map(region_code)
+
+    # Filter for regional data (no country codes OR World with OWID_WRL) and exclude WHO-specific regions
+    regional_vacc = vacc_df[
+        ((vacc_df['Code'].isna()) | (vacc_df['Code'] == WORLD_CODE)) &
+        (~vacc_df['Entity'].str.contains('WHO', na=False))
+    ]
+    regional_vacc = pd.DataFrame({
+        'Code': regional_vacc['Entity'].astype(str).map(region_code).to_numpy(),
+        'Year': regional_vacc['Year'].to_numpy(),
+        'immunization_rate_pct': regional_vacc[VACCINATION_COLUMN].to_numpy(),
+    })
+
+    # Merge vaccination data with regional data
+    regional_df = regional_df.merge(regional_vacc, on=['Code', 'Year'], how='left')
+
+    # Reorder columns to match expected format: Year,cases,Entity,Code,immunization_rate_pct
+    regional_df = regional_df[['Year', 'cases', 'Entity', 'Code', 'immunization_rate_pct']]
+    return regional_df, regions
+
+def build_regional_data_lite(df, vacc_df):
+    """build_regional_data over csv_core.Columns: (list of output row tuples, regions)"""
+    regions = list(dict.fromkeys(entity for entity, code in zip(df.entity, df.code) if code is None))
+    region_code = registry().region_code
+
+    # Vaccination rows by (region code, Year), kept in source order for the left join
+    vaccination = {}
+    for entity, code, year, rate in zip(vacc_df.entity, vacc_df.code, vacc_df.year,
+                                        vacc_df.values[VACCINATION_COLUMN]):
+        if (code is None or code == WORLD_CODE) and 'WHO' not in entity:
+            vaccination.setdefault((region_code(entity), year), []).append(rate)
+
+    # World rows first, then every region, each in source order
+    world = [i for i, entity in enumerate(df.entity) if entity == WORLD_NAME]
+    others = [i for i, (entity, code) in enumerate(zip(df.entity, df.code)) if code is None and entity != WORLD_NAME]
+    cases = df.values[CASES_COLUMN]
+    regional_rows = []
+    for i in world + others:
+        entity, year = df.entity[i], df.year[i]
+        code = region_code(entity)
+        for rate in vaccination.get((code, year), [NAN]):
+            regional_rows.append((year, cases[i], entity, code, rate))
+    return regional_rows, regions
+
+def write_grouping_files(df, vacc_df, mappings_file=REGIONS_FILE, output_dir=OUTPUT_DIR, lite=False):
+    """Write regional_<grouping>.csv for every grouping in the mapping table"""
+    if not mappings_file.exists():
+        return []
+    if lite:
+        totals = aggregate_regions_lite(df, vacc_df, load_region_mappings_lite(mappings_file),
+                                        CASES_COLUMN, VACCINATION_COLUMN)
+        by_grouping = {}
+        for grouping, *row in totals:
+            by_grouping.setdefault(grouping, []).append(row)
+        written = []
+        for grouping, rows in by_grouping.items():
+            output_file = output_dir / f"regional_{grouping}.csv"
+            write_csv(output_file, OUTPUT_COLUMNS, rows)
+            written.append((output_file, len({row[2] for row in rows})))
+        return written
+
+    totals = aggregate_regions(df, vacc_df, load_region_mappings(mappings_file),
+                               CASES_COLUMN, VACCINATION_COLUMN)
+    written = []
+    for grouping, rows in totals.groupby('grouping', sort=False):
+        output_file = output_dir / f"regional_{grouping}.csv"
+        rows[OUTPUT_COLUMNS].to_csv(output_file, index=False)
+        written.append((output_file, rows['Entity'].nunique()))
+    return written
+
+def groupings_key(output_dir, mappings_file=REGIONS_FILE):
+    """Digest of everything the grouping files depend on, including where they go"""
+    inputs = [INPUT_FILE, VACCINATION_FILE, mappings_file,
+              # Region codes come from the registry's reference files
+              country_registry.DATA_DIR / "countries.csv", country_registry.DATA_DIR / "centroids.json",
+              country_registry.ALIASES_FILE,
+              Path(__file__), Path(regional_aggregation.__file__), Path(country_registry.__file__),
+              Path(csv_core.__file__), SCRIPT_DIR / "source_data.py"]
+    return f"{file_digest(inputs)}:{Path(output_dir).resolve()}"
+
+def current_grouping_files(key, stamp_file=GROUPINGS_STAMP):
+    """The recorded [(path, region count)] if the stamp matches key and every file is unchanged, else None"""
+    if not stamp_file.exists():
+        return None
+    with open(stamp_file) as f:
+        stamp = json.load(f)
+    if stamp.get('key') != key:
+        return None
+    files = [(Path(entry['path']), entry['regions']) for entry in stamp['files']]
+    for (path, _), entry in zip(files, stamp['files']):
+        if not path.exists() or file_digest([path]) != entry['sha256']:
+            return None
+    return files
+
+def record_grouping_files(key, grouping_files, stamp_file=GROUPINGS_STAMP):
+    stamp_file.parent.mkdir(parents=True, exist_ok=True)
+    files = [{'path': str(path), 'regions': count, 'sha256': file_digest([path])} for path, count in grouping_files]
+    with open(stamp_file, 'w') as f:
+        json.dump({'key': key, 'files': files}, f, indent=2)
+
+def region_totals(regional_data, code):
+    """(total cases, row count) of one region's rows in the regional summary"""
+    if isinstance(regional_data, list):
+        rows = [row for row in regional_data if row[3] == code]
+        return kahan_sum(row[1] for row in rows)[0], len(rows)
+    region_data = regional_data[regional_data['Code'] == code]
+    return region_data['cases'].sum(), len(region_data)
+
 def main():
+    parser = argparse.ArgumentParser(description="Build regional_polio_data.csv and the grouping files")
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help="csv = standard library only, pandas = DataFrame path, auto = by input size")
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help="Directory for the output files")
+    parser.add_argument('--force', action='store_true', help="Rebuild the grouping files even if up to date")
+    args = parser.parse_args()
+    lite = use_csv_core([INPUT_FILE, VACCINATION_FILE], args.engine)
+    if lite:
+        pause_gc()
+
     print(f"Loading data from {INPUT_FILE}")
     
-    # Load the main dataset
-    df = pd.read_csv(INPUT_FILE)
+    with step('load') as s:
+        # Load the main dataset and the vaccination data
+        if lite:
+            df = read_columns(INPUT_FILE, [CASES_COLUMN])
+            vacc_df = read_columns(VACCINATION_FILE, [VACCINATION_COLUMN])
+        else:
+            df = source_data.read_source(INPUT_FILE)
+            vacc_df = source_data.read_source(VACCINATION_FILE)
+        s.record_read(INPUT_FILE, VACCINATION_FILE)
+        s.rows_out = len(df) + len(vacc_df)
     
-    # Get unique regions (entries without country codes)
-    regions = df[df['Code'].isna()]['Entity'].unique()
+    with step('build_regional', rows_in=len(df) + len(vacc_df)) as s:
+        regional_df, regions = (build_regional_data_lite if lite else build_regional_data)(df, vacc_df)
+        s.rows_out = len(regional_df)
     print(f"\nFound regions: {regions}")
     
     # Get unique years
-    years = sorted(df['Year'].unique())
+    years = df.year if lite else df['Year'].unique()
     print(f"\nYear range: {min(years)} - {max(years)}")
     
-    # Create regional summary data
-    regional_data = []
-    
-    # Get World totals from the existing data (not recalculated)
-    world_totals = df[df['Entity'] == 'World'][['Entity', 'Year', 'Estimated polio cases']].copy()
-    world_totals['Code'] = 'WORLD'
-    
-    # Add regional data (excluding World which we already have)
-    regions_no_world = [r for r in regions if r != 'World']
-    for region in regions_no_world:
-        region_df = df[df['Entity'] == region][['Entity', 'Year', 'Estimated polio cases']].copy()
-        region_df['Code'] = region.upper().replace(' ', '_')
-        regional_data.append(region_df)
-    
-    # Combine all regional data with world totals
-    regional_df = pd.concat([world_totals] + regional_data, ignore_index=True)
-    regional_df = regional_df.rename(columns={'Estimated polio cases': 'cases'})
-    
-    # Load vaccination data from new source
-    vacc_df = pd.read_csv(VACCINATION_FILE)
-    
-    # Filter for regional data (no country codes OR World with OWID_WRL) and exclude WHO-specific regions
-    regional_vacc = vacc_df[
-        ((vacc_df['Code'].isna()) | (vacc_df['Code'] == 'OWID_WRL')) & 
-        (~vacc_df['Entity'].str.contains('WHO', na=False))
-    ].copy()
-    regional_vacc = regional_vacc.rename(columns={'Share of one-year-olds who have had three doses of the polio vaccine': 'immunization_rate_pct'})
-    
-    # Map entity names to our codes
-    entity_to_code = {
-        'World': 'WORLD',
-        'Africa': 'AFRICA',
-        'Asia': 'ASIA',
-        'Europe': 'EUROPE',
-        'North America': 'NORTH_AMERICA',
-        'Oceania': 'OCEANIA',
-        'South America': 'SOUTH_AMERICA'
-    }
-    regional_vacc['Code'] = regional_vacc['Entity'].map(entity_to_code)
-    
-    # Merge vaccination data with regional data
-    regional_df = regional_df.merge(
-        regional_vacc[['Code', 'Year', 'immunization_rate_pct']], 
-        on=['Code', 'Year'], 
-        how='left'
-    )
-    
-    # Reorder columns to match expected format: Year,cases,Entity,Code,immunization_rate_pct
-    regional_df = regional_df[['Year', 'cases', 'Entity', 'Code', 'immunization_rate_pct']]
-    
     # Save regional summary
-    output_file = OUTPUT_DIR / "regional_polio_data.csv"
-    regional_df.to_csv(output_file, index=False)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = args.output_dir / "regional_polio_data.csv"
+    with step('write', rows_in=len(regional_df)) as s:
+        if lite:
+            write_csv(output_file, ['Year', 'cases', 'Entity', 'Code', 'immunization_rate_pct'], regional_df)
+        else:
+            regional_df.to_csv(output_file, index=False)
+        s.record_write(output_file)
     print(f"\nSaved regional data to {output_file}")
+
+    # Extra groupings (continents, income groups, ...) from the region mapping table
+    with step('groupings', rows_in=len(df) + len(vacc_df)) as s:
+        key = groupings_key(args.output_dir)
+        grouping_files = None if args.force else current_grouping_files(key)
+        up_to_date = grouping_files is not None
+        if not up_to_date:
+            grouping_files = write_grouping_files(df, vacc_df, output_dir=args.output_dir, lite=lite)
+            record_grouping_files(key, grouping_files)
+            s.record_write(*(path for path, _ in grouping_files))
+        s.rows_out = len(grouping_files)
+    for grouping_file, region_count in grouping_files:
+        print(f"{'Up to date' if up_to_date else 'Saved'}: {region_count} regions in {grouping_file}")
     
     # Print summary
     print("\nRegional Summary:")
-    all_regions = ['World'] + [r for r in regions if r != 'World']
+    all_regions = [WORLD_NAME] + [r for r in regions if r != WORLD_NAME]
     for region in all_regions:
-        region_code = 'WORLD' if region == 'World' else region.upper().replace(' ', '_')
-        region_data = regional_df[regional_df['Code'] == region_code]
-        if not region_data.empty:
-            total_cases = region_data['cases'].sum()
+        total_cases, row_count = region_totals(regional_df, registry().region_code(region))
+        if row_count:
             print(f"  {region}: {total_cases:,.0f} total cases")
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
@@ -1,12 +1,27 @@
 #!/usr/bin/env python3
 """
-Process complete polio dataset from 1980-2023
+Process complete polio dataset (1980-2023 in the current export)
 Using comprehensive data from Our World in Data
+
+Small inputs are processed with the standard library (csv_core) and never
+import pandas; larger ones, and --stream, use pandas. Both write identical files.
 """
 
-import pandas as pd
+import argparse
+from collections import Counter
 from pathlib import Path
-import numpy as np
+
+from csv_core import (ENGINES, assign_bin, kahan_sum, lazy_import, load_bin_edges, pause_gc,
+                      read_columns, use_csv_core, write_csv)
+from create_case_counts_lookup import (BINARY_FILE as CASE_COUNTS_BINARY, OUTPUT_FILE as CASE_COUNTS_JSON,
+                                       CaseCountAccumulator, extract_case_rows, write_binary, write_json)
+from country_registry import registry
+from year_deltas import DELTAS_FILE, KEYFRAME_INTERVAL, delta_stats, export_deltas
+from metrics import run_main, step
+
+pd = lazy_import('pandas')
+binning = lazy_import('binning')
+source_data = lazy_import('source_data')
 
 # Define paths
 SCRIPT_DIR = Path(__file__).parent
@@ -14,6 +29,9 @@ DATA_DIR = SCRIPT_DIR.parent.parent
 OUTPUT_DIR = DATA_DIR / "DataFiles"
 INPUT_FILE = SCRIPT_DIR.parent / "FinalDataRaw" / "number-of-estimated-paralytic-polio-cases-by-world-region.csv"
 
+CASES_COLUMN = 'Estimated polio cases'
+DEFAULT_CHUNK_SIZE = 250_000
+
 # Backup existing data
 BACKUP_DIR = DATA_DIR / "DataFiles_backup_before_complete_update"
 
@@ -25,115 +43,163 @@ def backup_existing_data():
         
         # Copy existing year files
         import shutil
-        for year in range(1980, 2024):
-            src = OUTPUT_DIR / f"year_{year}.csv"
-            if src.exists():
-                dst = BACKUP_DIR / f"year_{year}.csv"
-                shutil.copy2(src, dst)
-                print(f"Backed up {src.name}")
-
-def load_bins():
-    """Load bin definitions"""
-    bins_path = OUTPUT_DIR / "bins.csv"
-    bins_df = pd.read_csv(bins_path)
-    return bins_df
-
-def get_bin_for_value(value, bins_df):
-    """Determine which bin a value falls into"""
-    if pd.isna(value) or value == 0:
-        return 0
-    
-    # Skip bin 0 which has NaN edge_max
-    for _, bin_row in bins_df[bins_df['bin'] > 0].iterrows():
-        if pd.isna(bin_row['edge_max']):  # Last bin (highest)
-            return bin_row['bin']
-        elif value <= bin_row['edge_max']:
-            return bin_row['bin']
-    
-    return bins_df.iloc[-1]['bin']  # Default to highest bin
+        for src in sorted(OUTPUT_DIR.glob("year_*.csv")):
+            dst = BACKUP_DIR / src.name
+            shutil.copy2(src, dst)
+            print(f"Backed up {src.name}")
 
-def main():
-    print("Processing complete polio dataset for 1980-2023...")
-    
-    # Backup existing data first
-    # backup_existing_data()  # Skipping backup - we have git
-    
-    # Load data
-    df = pd.read_csv(INPUT_FILE)
-    print(f"Loaded {len(df)} rows of data")
-    
-    # Filter out regional/world aggregates (rows without country codes)
-    df_countries = df[df['Code'].notna()].copy()
-    print(f"Found {len(df_countries)} country-specific entries")
-    
-    # Check for unique countries
-    countries = df_countries['Entity'].unique()
-    print(f"Found {len(countries)} unique countries")
-    
-    # Load bins for categorization
-    bins_df = load_bins()
-    
-    # Track statistics
-    all_years = sorted(df_countries['Year'].unique())
-    print(f"Years in dataset: {min(all_years)} to {max(all_years)}")
+def load_bins(lite=False):
+    """Load bin definitions compiled for vectorized (or, lite, per-value) lookup"""
+    if lite:
+        return load_bin_edges(OUTPUT_DIR / "bins.csv")
+    return binning.load_bin_table(OUTPUT_DIR / "bins.csv")
+
+def find_duplicate_codes(df_countries):
+    """Return {year: {code: [entities]}} for codes listed more than once in a year"""
+    dupes = df_countries[df_countries.duplicated(subset=['Year', 'Code'], keep=False)]
+    report = {}
+    for (year, code), entities in dupes.groupby(['Year', 'Code'], sort=True, observed=True)['Entity']:
+        report.setdefault(int(year), {})[code] = entities.tolist()
+    return report
+
+def find_name_variations(df_countries):
+    """
+    Return {code: set(entities)} for codes that appear under several names,
+    counting only the rows kept per year (the first of any duplicate code)
+    """
+    kept = df_countries.drop_duplicates(subset=['Year', 'Code'], keep='first')
+    names = kept.groupby('Code', observed=True)['Entity'].unique()
+    return {code: set(entities) for code, entities in names.items() if len(entities) > 1}
+
+def build_year_frames(df_countries, bin_table):
+    """
+    Dedupe, filter and bin the whole dataset in one pass, then split it by year.
+    Returns {year: DataFrame[Code, Bin]} for every year present in the data;
+    years whose rows all have zero/missing cases map to an empty frame.
+    """
+    # Stable sort keeps the source row order within each year
+    df_sorted = df_countries.sort_values('Year', kind='stable')
+    df_sorted = df_sorted.drop_duplicates(subset=['Year', 'Code'], keep='first')
     
-    processed_count = 0
-    empty_years = []
-    problematic_countries = set()
-    country_changes = {}
+    # Remove rows with no data or zero cases, then bin everything at once
+    cases = df_sorted[CASES_COLUMN]
+    df_cases = df_sorted[cases.notna() & (cases > 0)].copy()
+    df_cases['Bin'] = binning.assign_bins(df_cases[CASES_COLUMN], bin_table)
     
-    # Process each year
-    for year in range(1980, 2024):
-        # Filter data for this year
-        year_data = df_countries[df_countries['Year'] == year].copy()
-        
-        if len(year_data) == 0:
-            print(f"WARNING: No data for year {year}")
-            empty_years.append(year)
-            continue
-        
-        # Check for duplicate country codes
-        duplicates = year_data[year_data.duplicated(subset=['Code'], keep=False)]
-        if len(duplicates) > 0:
-            print(f"\nWARNING: Duplicate codes in {year}:")
-            for code in duplicates['Code'].unique():
-                entries = year_data[year_data['Code'] == code]
-                print(f"  {code}: {entries['Entity'].tolist()}")
-                problematic_countries.update(entries['Entity'].tolist())
-            # Keep first occurrence of each code
-            year_data = year_data.drop_duplicates(subset=['Code'], keep='first')
-        
-        # Track country name changes
-        for _, row in year_data.iterrows():
-            code = row['Code']
-            entity = row['Entity']
-            if code not in country_changes:
-                country_changes[code] = set()
-            country_changes[code].add(entity)
-        
-        # Remove rows with no data or zero cases
-        year_data = year_data[year_data['Estimated polio cases'].notna()]
-        year_data = year_data[year_data['Estimated polio cases'] > 0]
-        
-        if len(year_data) == 0:
-            print(f"No cases reported for year {year}")
-            # Create empty file to maintain consistency
-            output_data = pd.DataFrame(columns=['Code', 'Bin'])
-        else:
-            # Add bin values
-            year_data['Bin'] = year_data['Estimated polio cases'].apply(
-                lambda x: get_bin_for_value(x, bins_df)
-            )
-            
-            # Format as required (Code,Bin for 2-column format)
-            output_data = year_data[['Code', 'Bin']].copy()
-        
-        # Save to file
-        output_file = OUTPUT_DIR / f"year_{year}.csv"
+    year_frames = {int(year): pd.DataFrame(columns=['Code', 'Bin'])
+                   for year in df_sorted['Year'].unique()}
+    for year, group in df_cases.groupby('Year', sort=True):
+        year_frames[int(year)] = group[['Code', 'Bin']]
+    return year_frames
+
+def write_year_file(year, output_data, output_dir=OUTPUT_DIR):
+    """Write a single year_YYYY.csv (Code,Bin 2-column format) from a frame or (code, bin) list"""
+    output_file = output_dir / f"year_{year}.csv"
+    if isinstance(output_data, list):
+        write_csv(output_file, ['Code', 'Bin'], output_data)
+    else:
         output_data.to_csv(output_file, index=False)
-        print(f"Created {output_file.name} with {len(output_data)} countries")
-        processed_count += 1
-    
+    return output_file
+
+def write_year_files(year_frames, max_workers=None, output_dir=OUTPUT_DIR):
+    """Write all year files concurrently; returns {year: output path}"""
+    if all(isinstance(frame, list) for frame in year_frames.values()):
+        # Small (code, bin) lists are written faster than a pool starts up
+        return {year: write_year_file(year, frame, output_dir) for year, frame in year_frames.items()}
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {year: pool.submit(write_year_file, year, frame, output_dir)
+                   for year, frame in year_frames.items()}
+        return {year: future.result() for year, future in futures.items()}
+
+def frame_snapshot(output_data):
+    """{code: bin} for one year's frame (the year file's contents)"""
+    if isinstance(output_data, list):
+        return dict(output_data)
+    return dict(zip(output_data['Code'].astype(str), output_data['Bin'].astype(int)))
+
+def write_deltas(snapshots, keyframe_interval, path=DELTAS_FILE):
+    """Delta export mode: keyframes every K years plus per-year changes"""
+    with step('deltas', rows_in=len(snapshots)) as s:
+        doc = export_deltas(snapshots, keyframe_interval, path)
+        s.rows_out = len(doc['entries'])
+        s.record_write(path)
+    stored, full = delta_stats(doc)
+    print(f"Created year_deltas.json: {stored} entries vs {full} in full snapshots "
+          f"(keyframe every {keyframe_interval} years)")
+
+def code_pairs(df_countries):
+    """Distinct (Code, Entity) pairs of the country rows, for the registry check"""
+    pairs = df_countries[['Code', 'Entity']].drop_duplicates()
+    return zip(pairs['Code'].astype(str), pairs['Entity'].astype(str))
+
+def yearly_case_stats(df_countries):
+    """{year: (sum, count)} of case values (input to the decade summary)"""
+    stats = df_countries.groupby('Year')[CASES_COLUMN].agg(['sum', 'count'])
+    return {int(year): (float(total), int(count)) for year, total, count in stats.itertuples()}
+
+# MARK: - Lightweight path
+
+def country_rows(columns):
+    """(Entity, Code, Year, cases) tuples for rows with a country code, in source order"""
+    return [row for row in zip(columns.entity, columns.code, columns.year, columns.values[CASES_COLUMN])
+            if row[1] is not None]
+
+def find_duplicate_codes_lite(rows):
+    """find_duplicate_codes over country_rows()"""
+    keys = [(year, code) for _, code, year, _ in rows]
+    counts = Counter(keys)
+    if len(counts) == len(keys):
+        return {}
+    entities = {}
+    for (entity, *_), key in zip(rows, keys):
+        if counts[key] > 1:
+            entities.setdefault(key, []).append(entity)
+    report = {}
+    for (year, code), names in sorted(entities.items()):
+        report.setdefault(year, {})[code] = names
+    return report
+
+def find_name_variations_lite(rows):
+    """find_name_variations over country_rows()"""
+    # Built in reverse, so the first row of each (year, code) is the one kept
+    first = {(year, code): entity for entity, code, year, _ in reversed(rows)}
+    pairs = {(code, entity) for (_, code), entity in first.items()}
+    counts = Counter(code for code, _ in pairs)
+    names = {}
+    for code, entity in pairs:
+        if counts[code] > 1:
+            names.setdefault(code, set()).add(entity)
+    return names
+
+def code_pairs_lite(rows):
+    """code_pairs over country_rows()"""
+    return {(code, entity) for entity, code, _, _ in rows}
+
+def build_year_frames_lite(rows, bin_edges):
+    """build_year_frames over country_rows(): {year: [(code, bin), ...]}"""
+    year_frames = {year: [] for year in sorted({row[2] for row in rows})}
+    seen = set()
+    # Rows are taken in source order, so the first row of each (year, code) is kept
+    for _, code, year, cases in rows:
+        if (year, code) in seen:
+            continue
+        seen.add((year, code))
+        if cases > 0:  # False for NaN
+            year_frames[year].append((code, assign_bin(cases, bin_edges)))
+    return year_frames
+
+def yearly_case_stats_lite(rows):
+    """yearly_case_stats over country_rows()"""
+    values = {}
+    for _, _, year, cases in rows:
+        values.setdefault(year, []).append(cases)
+    return {year: kahan_sum(year_values) for year, year_values in sorted(values.items())}
+
+# MARK: - Report
+
+def print_report(processed_count, empty_years, name_changes, problematic_countries, year_stats):
     print(f"\n{'='*60}")
     print(f"PROCESSING COMPLETE")
     print(f"{'='*60}")
@@ -143,7 +209,6 @@ def main():
         print(f"\nYears with no data: {empty_years}")
     
     # Report country name changes
-    name_changes = {code: names for code, names in country_changes.items() if len(names) > 1}
     if name_changes:
         print(f"\nCountries with name variations:")
         for code, names in sorted(name_changes.items()):
@@ -156,19 +221,260 @@ def main():
     
     # Summary statistics
     print("\nSummary of cases by decade:")
-    df_countries['Decade'] = (df_countries['Year'] // 10) * 10
-    decade_summary = df_countries.groupby('Decade')['Estimated polio cases'].agg(['sum', 'count', 'mean'])
-    decade_summary['sum'] = decade_summary['sum'].astype(int)
-    decade_summary['mean'] = decade_summary['mean'].round(0).astype(int)
-    print(decade_summary)
+    decades = {}
+    for year, stats in sorted(year_stats.items()):
+        decades.setdefault(year // 10 * 10, []).append(stats)
+    print(f"{'Decade':<6} {'sum':>10} {'count':>6} {'mean':>6}")
+    for decade, stats in decades.items():
+        total, _ = kahan_sum(total for total, _ in stats)
+        count = sum(count for _, count in stats)
+        mean = round(total / count) if count else 0
+        print(f"{decade:<6} {int(total):>10} {count:>6} {mean:>6}")
     
     # Year-over-year change
     print("\nDramatic changes:")
-    total_1980 = df_countries[df_countries['Year'] == 1980]['Estimated polio cases'].sum()
-    total_2023 = df_countries[df_countries['Year'] == 2023]['Estimated polio cases'].sum()
-    print(f"1980: {int(total_1980):,} total cases")
-    print(f"2023: {int(total_2023):,} total cases")
-    print(f"Reduction: {((total_1980 - total_2023) / total_1980 * 100):.1f}%")
+    first_year, last_year = min(year_stats), max(year_stats)
+    total_first = year_stats[first_year][0]
+    total_last = year_stats[last_year][0]
+    print(f"{first_year}: {int(total_first):,} total cases")
+    print(f"{last_year}: {int(total_last):,} total cases")
+    if total_first:
+        print(f"Reduction: {((total_first - total_last) / total_first * 100):.1f}%")
+    else:
+        print(f"Reduction: n/a (no cases in {first_year})")
+
+def missing_years(years):
+    """Years inside the data's range that have no rows at all"""
+    years = sorted(years)
+    present = set(years)
+    return [year for year in range(years[0], years[-1] + 1) if year not in present]
+
+def process_in_memory(input_file=INPUT_FILE, keyframe_interval=None, lite=False, output_dir=OUTPUT_DIR):
+    """
+    Load the whole dataset and process every year in one grouped pass.
+    lite=True does the same with csv_core and plain tuples instead of pandas.
+    """
+    # Load data
+    with step('load') as s:
+        df = read_columns(input_file, [CASES_COLUMN]) if lite else source_data.read_source(input_file)
+        s.record_read(input_file)
+        s.rows_out = len(df)
+    print(f"Loaded {len(df)} rows of data")
+    
+    # Filter out regional/world aggregates (rows without country codes)
+    with step('filter', rows_in=len(df)) as s:
+        df_countries = country_rows(df) if lite else df[df['Code'].notna()].copy()
+        s.rows_out = len(df_countries)
+    print(f"Found {len(df_countries)} country-specific entries")
+    
+    # Check for unique countries
+    if lite:
+        countries = {row[0] for row in df_countries}
+        all_years = sorted({row[2] for row in df_countries})
+    else:
+        countries = df_countries['Entity'].unique()
+        all_years = sorted(int(y) for y in df_countries['Year'].unique())
+    print(f"Found {len(countries)} unique countries")
+    
+    # Load bins for categorization
+    bin_table = load_bins(lite)
+    
+    # Year range comes from the data itself
+    print(f"Years in dataset: {min(all_years)} to {max(all_years)}")
+    
+    problematic_countries = set()
+    
+    # Check for duplicate country codes
+    with step('validate', rows_in=len(df_countries)):
+        duplicates = (find_duplicate_codes_lite if lite else find_duplicate_codes)(df_countries)
+        # Track country name changes
+        name_changes = (find_name_variations_lite if lite else find_name_variations)(df_countries)
+        # Codes and names the country registry cannot map, reported in bulk
+        registry_warnings = registry().reconcile((code_pairs_lite if lite else code_pairs)(df_countries))
+    for year, codes in duplicates.items():
+        print(f"\nWARNING: Duplicate codes in {year}:")
+        for code, entities in codes.items():
+            print(f"  {code}: {entities}")
+            problematic_countries.update(entities)
+    for warning in registry_warnings:
+        print(f"\nWARNING: {warning}")
+    
+    # Dedupe, filter and bin every year in one pass
+    with step('binning', rows_in=len(df_countries)) as s:
+        year_frames = (build_year_frames_lite if lite else build_year_frames)(df_countries, bin_table)
+        s.rows_out = sum(len(frame) for frame in year_frames.values())
+    empty_years = missing_years(year_frames)
+    for year in empty_years:
+        print(f"WARNING: No data for year {year}")
+    
+    # Save all year files concurrently
+    with step('write', rows_in=sum(len(frame) for frame in year_frames.values())) as s:
+        written = write_year_files(year_frames, output_dir=output_dir)
+        s.rows_out = len(written)
+        s.record_write(*written.values())
+    for year, output_file in sorted(written.items()):
+        if not len(year_frames[year]):
+            print(f"No cases reported for year {year}")
+        print(f"Created {output_file.name} with {len(year_frames[year])} countries")
+    
+    if keyframe_interval:
+        write_deltas({year: frame_snapshot(frame) for year, frame in year_frames.items()}, keyframe_interval,
+                     output_dir / DELTAS_FILE.name)
+    
+    with step('report'):
+        print_report(len(written), empty_years, name_changes, problematic_countries,
+                     (yearly_case_stats_lite if lite else yearly_case_stats)(df_countries))
+
+# MARK: - Streaming mode
+
+def spill_years(input_file, spill_dir, chunk_size):
+    """
+    Read the input in fixed-size chunks, drop regional aggregates and append
+    each year's country rows (in source order) to its own spill file.
+    Returns (total rows read, country rows kept, unique country names).
+    """
+    total_rows = kept_rows = 0
+    entities = set()
+    reader = pd.read_csv(input_file, chunksize=chunk_size,
+                         usecols=['Entity', 'Code', 'Year', CASES_COLUMN],
+                         dtype={'Entity': str, 'Code': str})
+    for chunk in reader:
+        total_rows += len(chunk)
+        chunk = chunk[chunk['Code'].notna()]
+        kept_rows += len(chunk)
+        entities.update(chunk['Entity'].unique())
+        for year, group in chunk.groupby('Year', sort=False):
+            path = spill_dir / f"{int(year)}.csv"
+            group.to_csv(path, mode='a', header=not path.exists(), index=False)
+    return total_rows, kept_rows, entities
+
+def read_spill(path):
+    return pd.read_csv(path, dtype={'Entity': str, 'Code': str})
+
+def year_case_counts(year_df):
+    """Case counts rows for one year, with the same rules as create_case_counts_lookup.py"""
+    return extract_case_rows(year_df).drop_duplicates(subset=['Code'], keep='last')
+
+def process_streaming(chunk_size, spill_root=None, input_file=INPUT_FILE, keyframe_interval=None,
+                      output_dir=OUTPUT_DIR):
+    """
+    Bounded-memory variant of process_in_memory for inputs that do not fit in RAM.
+    Only one year's rows are held in memory at a time; the outputs are
+    byte-identical to the in-memory path, plus case_counts.bin/.json.
+    """
+    bin_table = load_bins()
+    problematic_countries = set()
+    names_by_code = {}
+    pairs = set()
+    case_counts = CaseCountAccumulator()
+    stats = {}
+    snapshots = {}
+    
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="polio_spill_", dir=spill_root) as tmp:
+        spill_dir = Path(tmp)
+        with step('spill') as s:
+            total_rows, kept_rows, entities = spill_years(input_file, spill_dir, chunk_size)
+            s.record_read(input_file)
+            s.rows_in, s.rows_out = total_rows, kept_rows
+        print(f"Streamed {total_rows} rows of data in chunks of {chunk_size}")
+        print(f"Found {kept_rows} country-specific entries")
+        print(f"Found {len(entities)} unique countries")
+        
+        spills = sorted(spill_dir.glob("*.csv"), key=lambda p: int(p.stem))
+        all_years = [int(p.stem) for p in spills]
+        print(f"Years in dataset: {min(all_years)} to {max(all_years)}")
+        empty_years = missing_years(all_years)
+        for year in empty_years:
+            print(f"WARNING: No data for year {year}")
+        
+        with step('years', rows_in=kept_rows) as s:
+            s.rows_out = 0
+            for path in spills:
+                year = int(path.stem)
+                year_df = read_spill(path)
+                s.record_read(path)
+                
+                for _, codes in find_duplicate_codes(year_df).items():
+                    print(f"\nWARNING: Duplicate codes in {year}:")
+                    for code, entities in codes.items():
+                        print(f"  {code}: {entities}")
+                        problematic_countries.update(entities)
+                pairs.update(code_pairs(year_df))
+                kept = year_df.drop_duplicates(subset=['Code'], keep='first')
+                for code, entities in kept.groupby('Code', observed=True)['Entity'].unique().items():
+                    names_by_code.setdefault(code, set()).update(entities)
+                
+                output_data = build_year_frames(year_df, bin_table)[year]
+                output_file = write_year_file(year, output_data, output_dir)
+                s.rows_out += len(output_data)
+                s.record_write(output_file)
+                if output_data.empty:
+                    print(f"No cases reported for year {year}")
+                print(f"Created {output_file.name} with {len(output_data)} countries")
+                if keyframe_interval:
+                    snapshots[year] = frame_snapshot(output_data)
+                
+                year_cases = year_case_counts(year_df)
+                case_counts.add_year(year, year_cases['Code'], year_cases['cases'])
+                stats.update(yearly_case_stats(year_df))
+                path.unlink()  # free disk as we go
+    
+    # Case counts are held as int32 arrays per year (output-sized)
+    with step('case_counts') as s:
+        years, codes, matrix = case_counts.build()
+        binary_file, json_file = output_dir / CASE_COUNTS_BINARY.name, output_dir / CASE_COUNTS_JSON.name
+        write_binary(years, codes, matrix, binary_file)
+        write_json(years, codes, matrix, json_file)
+        s.rows_out = len(years) * len(codes)
+        s.record_write(binary_file, json_file)
+    print(f"Created case_counts.bin and case_counts.json ({len(years)} years x {len(codes)} countries)")
+    if keyframe_interval:
+        write_deltas(snapshots, keyframe_interval, output_dir / DELTAS_FILE.name)
+    
+    for warning in registry().reconcile(pairs):
+        print(f"\nWARNING: {warning}")
+    name_changes = {code: names for code, names in names_by_code.items() if len(names) > 1}
+    print_report(len(spills), empty_years, name_changes, problematic_countries, stats)
+
+def main():
+    parser = argparse.ArgumentParser(description="Create year_YYYY.csv files from the OWID case data")
+    parser.add_argument('--input', type=Path, default=INPUT_FILE,
+                        help="Case data CSV in the OWID schema (default: FinalDataRaw export)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Process the input in chunks with bounded memory (also writes case counts)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per chunk in streaming mode (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--spill-dir', type=Path, default=None,
+                        help="Directory for temporary per-year spill files in streaming mode")
+    parser.add_argument('--deltas', action='store_true',
+                        help="Also write year_deltas.json (keyframes plus per-year changes)")
+    parser.add_argument('--keyframe-interval', type=int, default=KEYFRAME_INTERVAL,
+                        help=f"Years between full keyframes in year_deltas.json (default {KEYFRAME_INTERVAL})")
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help="csv = standard library only, pandas = DataFrame path, auto = by input size "
+                             "(--stream always uses pandas)")
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR,
+                        help="Directory for the year files (default: DataFiles)")
+    args = parser.parse_args()
+    if args.keyframe_interval < 1:
+        parser.error("--keyframe-interval must be at least 1")
+    keyframe_interval = args.keyframe_interval if args.deltas else None
+    
+    print("Processing complete polio dataset...")
+    
+    # Backup existing data first
+    # backup_existing_data()  # Skipping backup - we have git
+    
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    if args.stream:
+        process_streaming(args.chunk_size, args.spill_dir, args.input, keyframe_interval, args.output_dir)
+    else:
+        lite = use_csv_core([args.input], args.engine)
+        if lite:
+            pause_gc()
+        process_in_memory(args.input, keyframe_interval, lite, args.output_dir)
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Aggregate country rows into regions for any number of groupings at once.
+
+A region mapping table has one row per country code, a population weight and
+one column per grouping:
+
+  Code,Population,continent,un_subregion,wb_region,income_group
+  AFG,38041754,Asia,Southern Asia,South Asia,Low income
+
+Country-year rows are joined once to the mapping in long form
+(Code, grouping, region), so every grouping is computed by the same single
+groupby over (grouping, region, Year). Adding a grouping adds a column to the
+table, not another pass over the data.
+
+Region codes come from the shared country registry (CountryRegistry.region_code),
+the same as the published aggregates in prepare_regional_data.py.
+
+Per region and year:
+  cases                  sum of country cases (NaN if no country has a value)
+  immunization_rate_pct  population-weighted mean over countries with coverage data
+
+The default table (RawData/country_regions.csv) is generated from the
+Natural Earth admin-0 attributes; POP_EST is a single recent estimate, so the
+weights are static across years. Custom groupings can be added as extra columns.
+
+The *_lite functions compute the same totals over csv_core.Columns with the
+standard library only (same row order, summation and rounding as pandas).
+
+Usage:
+  python regional_aggregation.py --from-natural-earth   # regenerate country_regions.csv
+  python regional_aggregation.py                        # print a summary per grouping
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+from country_registry import PSEUDO_CODE_PREFIX, registry
+from csv_core import NAN, kahan_sum, lazy_import, round_half_even, sums_exactly
+from metrics import run_main
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+RAW_DATA_DIR = SCRIPT_DIR.parent / "RawData"
+REGIONS_FILE = RAW_DATA_DIR / "country_regions.csv"
+NATURAL_EARTH_FILE = RAW_DATA_DIR / "ne_10m_admin_0_countries"
+
+CODE_COLUMN = 'Code'
+WEIGHT_COLUMN = 'Population'
+OUTPUT_COLUMNS = ['Year', 'cases', 'Entity', 'Code', 'immunization_rate_pct']
+
+# Natural Earth attribute -> grouping column
+NATURAL_EARTH_GROUPINGS = {
+    'CONTINENT': 'continent',
+    'SUBREGION': 'un_subregion',
+    'REGION_WB': 'wb_region',
+    'INCOME_GRP': 'income_group',
+}
+
+# Countries that have no admin-0 row of their own in Natural Earth
+MANUAL_REGIONS = [
+    {'Code': 'REU', 'Population': 859959, 'continent': 'Africa', 'un_subregion': 'Eastern Africa',
+     'wb_region': 'Sub-Saharan Africa', 'income_group': 'High income: OECD'},
+]
+
+def load_region_mappings(path=REGIONS_FILE):
+    """Mapping table with Code, an optional Population weight and grouping columns"""
+    mappings = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if CODE_COLUMN not in mappings.columns:
+        raise KeyError(f"{path} has no {CODE_COLUMN} column")
+    duplicates = mappings[CODE_COLUMN][mappings[CODE_COLUMN].duplicated()].unique()
+    if len(duplicates):
+        raise ValueError(f"{path} maps these codes more than once: {sorted(duplicates)}")
+    if WEIGHT_COLUMN in mappings.columns:
+        mappings[WEIGHT_COLUMN] = pd.to_numeric(mappings[WEIGHT_COLUMN], errors='coerce')
+    return mappings
+
+def mappings_from_natural_earth(source=NATURAL_EARTH_FILE):
+    """Build the default mapping table from the Natural Earth .dbf attributes"""
+    from shapefile_reader import DbfTable
+    from create_centroids import CODE_FIELD, MISSING_CODE
+
+    table = DbfTable(source)
+    codes = np.array(table.column(CODE_FIELD), dtype=object)
+    # ISO_A3 is -99 for a few countries (France, Norway); ADM0_A3 still has their code
+    fallback = np.array(table.column('ADM0_A3'), dtype=object)
+    codes = np.where(codes == MISSING_CODE, fallback, codes)
+
+    mappings = pd.DataFrame({CODE_COLUMN: codes, WEIGHT_COLUMN: table.column('POP_EST')})
+    for field, grouping in NATURAL_EARTH_GROUPINGS.items():
+        # Drop Natural Earth's sort prefixes ('1. High income: OECD') and -99 placeholders
+        values = pd.Series(table.column(field)).str.replace(r'^\d+\.\s*', '', regex=True)
+        mappings[grouping] = values.where(values != MISSING_CODE, '')
+    mappings = mappings[~table.deleted & (mappings[CODE_COLUMN] != MISSING_CODE)]
+    mappings = mappings.drop_duplicates(CODE_COLUMN, keep='first')
+    mappings = pd.concat([mappings, pd.DataFrame(MANUAL_REGIONS)], ignore_index=True)
+    mappings = mappings.drop_duplicates(CODE_COLUMN, keep='last')
+    mappings[WEIGHT_COLUMN] = mappings[WEIGHT_COLUMN].astype(np.int64)
+    return mappings.sort_values(CODE_COLUMN).reset_index(drop=True)
+
+def country_rows(df, value_column, name):
+    """Country-level rows (real ISO codes only) as DataFrame[Code, Year, name]"""
+    codes = df[CODE_COLUMN].astype(str)
+    countries = df[df[CODE_COLUMN].notna() & ~codes.str.startswith(PSEUDO_CODE_PREFIX)]
+    return pd.DataFrame({
+        CODE_COLUMN: countries[CODE_COLUMN].astype(str).to_numpy(),
+        'Year': countries['Year'].astype(np.int64).to_numpy(),
+        name: countries[value_column].to_numpy(dtype=np.float64),
+    })
+
+def aggregate_regions(cases_df, vacc_df, mappings, cases_column, vaccination_column):
+    """
+    All groupings in one grouped pass.
+    Returns DataFrame[grouping, Entity, Code, Year, cases, immunization_rate_pct].
+    """
+    country_years = country_rows(cases_df, cases_column, 'cases').merge(
+        country_rows(vacc_df, vaccination_column, 'vaccination'),
+        on=[CODE_COLUMN, 'Year'], how='outer')
+
+    groupings = [c for c in mappings.columns if c not in (CODE_COLUMN, WEIGHT_COLUMN)]
+    weights = mappings[WEIGHT_COLUMN] if WEIGHT_COLUMN in mappings.columns else pd.Series(1.0, index=mappings.index)
+    membership = mappings[[CODE_COLUMN] + groupings].assign(weight=weights.to_numpy()).melt(
+        id_vars=[CODE_COLUMN, 'weight'], value_vars=groupings, var_name='grouping', value_name='Entity')
+    membership = membership[membership['Entity'] != '']
+
+    joined = country_years.merge(membership, on=CODE_COLUMN, how='inner')
+    has_vaccination = joined['vaccination'].notna() & joined['weight'].notna()
+    joined['weight'] = np.where(has_vaccination, joined['weight'], 0.0)
+    joined['weighted'] = np.where(has_vaccination, joined['vaccination'] * joined['weight'], 0.0)
+
+    totals = (joined.groupby(['grouping', 'Entity', 'Year'], sort=True)[['cases', 'weighted', 'weight']]
+              .sum(min_count=1).reset_index())
+    totals['immunization_rate_pct'] = (totals['weighted'] / totals['weight'].where(totals['weight'] > 0)).round(1)
+    totals['Code'] = totals['Entity'].map(registry().region_code)
+    return totals[['grouping'] + OUTPUT_COLUMNS]
+
+# MARK: - Lightweight path
+
+def parse_weight(text):
+    """pd.to_numeric(errors='coerce') for one field"""
+    try:
+        return float(text)
+    except ValueError:
+        return NAN
+
+def load_region_mappings_lite(path=REGIONS_FILE):
+    """load_region_mappings as a list of row dicts (Population parsed to float)"""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        mappings = list(reader)
+        columns = reader.fieldnames or []
+    if CODE_COLUMN not in columns:
+        raise KeyError(f"{path} has no {CODE_COLUMN} column")
+    seen, duplicates = set(), set()
+    for row in mappings:
+        (duplicates if row[CODE_COLUMN] in seen else seen).add(row[CODE_COLUMN])
+    if duplicates:
+        raise ValueError(f"{path} maps these codes more than once: {sorted(duplicates)}")
+    if WEIGHT_COLUMN in columns:
+        for row in mappings:
+            row[WEIGHT_COLUMN] = parse_weight(row[WEIGHT_COLUMN])
+    return mappings
+
+def member_rows_lite(columns, value_column, codes):
+    """country_rows for the given codes as {Code: {Year: [values in source order]}}"""
+    rows = {}
+    for code, year, value in zip(columns.code, columns.year, columns.values[value_column]):
+        if code in codes:
+            years = rows.get(code)
+            if years is None:
+                rows[code] = {year: [value]}
+            elif year in years:
+                years[year].append(value)
+            else:
+                years[year] = [value]
+    return rows
+
+def aggregate_regions_lite(cases_columns, vacc_columns, mappings, cases_column, vaccination_column):
+    """
+    aggregate_regions over csv_core.Columns. Returns tuples
+    (grouping, Year, cases, Entity, Code, immunization_rate_pct) sorted by
+    (grouping, Entity, Year).
+    """
+    groupings = [c for c in (mappings[0] if mappings else ()) if c not in (CODE_COLUMN, WEIGHT_COLUMN)]
+    # code -> (weight, {year: entries} of every region it belongs to); a code has
+    # one weight, so each row's weighted value is computed once for all its regions
+    regions = {}
+    membership = {}
+    for grouping in groupings:
+        for row in mappings:
+            if row[grouping] != '':
+                by_year = regions.setdefault((grouping, row[grouping]), {})
+                membership.setdefault(row[CODE_COLUMN], (row.get(WEIGHT_COLUMN, 1.0), []))[1].append(by_year)
+
+    cases = member_rows_lite(cases_columns, cases_column, membership)
+    vaccination = member_rows_lite(vacc_columns, vaccination_column, membership)
+    # Outer join in (Code, Year) order, as DataFrame.merge(how='outer') sorts it.
+    # Each country-year's (cases, weighted, weight) entry is shared by all of
+    # its regions, and every region-year keeps its entries in join order, so
+    # the sums run in the same order as pandas'.
+    missing, no_years = [NAN], {}
+    joined = []
+    for code in sorted(cases.keys() | vaccination.keys()):
+        weight, region_years = membership[code]
+        case_years, vacc_years = cases.get(code, no_years), vaccination.get(code, no_years)
+        for year in sorted(case_years.keys() | vacc_years.keys()):
+            for case in case_years.get(year, missing):
+                for vacc in vacc_years.get(year, missing):
+                    entry = (case, vacc * weight, weight) if vacc == vacc and weight == weight else (case, 0.0, 0.0)
+                    joined.append(entry)
+                    for by_year in region_years:
+                        group = by_year.get(year)
+                        if group is None:
+                            by_year[year] = [entry]
+                        else:
+                            group.append(entry)
+
+    # A region-year holds each entry at most once, so its weight total is at
+    # most the column's and one check decides plain addition for every group
+    exact_weights = sums_exactly([weight for _, _, weight in joined])
+    totals = []
+    region_code = registry().region_code
+    for (grouping, entity), by_year in sorted(regions.items()):
+        code = region_code(entity)
+        for year, entries in sorted(by_year.items()):
+            cases, weighted, weights = zip(*entries)
+            case_sum, case_count = kahan_sum(cases)
+            weighted, _ = kahan_sum(weighted)
+            weight = sum(weights, 0.0) if exact_weights else kahan_sum(weights)[0]
+            rate = round_half_even(weighted / weight, 1) if weight > 0 else NAN
+            totals.append((grouping, year, case_sum if case_count else NAN, entity, code, rate))
+    return totals
+
+def main():
+    if '--from-natural-earth' in sys.argv:
+        mappings = mappings_from_natural_earth()
+        mappings.to_csv(REGIONS_FILE, index=False)
+        print(f"Saved {len(mappings)} country mappings to {REGIONS_FILE}")
+        return
+
+    from source_data import CASES_FILE, VACCINATION_FILE, read_source
+    from prepare_regional_data import CASES_COLUMN, VACCINATION_COLUMN
+
+    mappings = load_region_mappings()
+    totals = aggregate_regions(read_source(CASES_FILE), read_source(VACCINATION_FILE), mappings,
+                               CASES_COLUMN, VACCINATION_COLUMN)
+    for grouping, rows in totals.groupby('grouping', sort=False):
+        print(f"{grouping}: {rows['Entity'].nunique()} regions, {len(rows)} region-years")
+
+if __name__ == "__main__":
+    run_main(main)
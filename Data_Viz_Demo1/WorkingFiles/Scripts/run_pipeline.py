@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Incremental runner for the WorkingFiles/Scripts data pipeline.
+
+Each stage declares its script (plus any helper modules it imports), its
+input files and the DataFiles outputs it produces. A hash manifest records
+what every stage last ran against, so only stages whose inputs, code or
+outputs changed are re-executed. Independent stages run in parallel; a stage
+that consumes another stage's outputs waits for it. Offline stages (tooling
+whose outputs nothing in the app reads) are skipped unless named.
+
+Usage:
+  python run_pipeline.py                 # run stale stages
+  python run_pipeline.py --force         # rerun everything
+  python run_pipeline.py --dry-run       # show what would run
+  python run_pipeline.py regional_data   # limit to named stages
+  python run_pipeline.py textures        # offline stages only run when named
+  python run_pipeline.py --force --metrics --profile year_files
+                                         # record per-stage metrics (+ cProfile dump)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from metrics import METRICS_DIR_ENV, METRICS_ROOT, PROFILE_ENV, flatten, print_metrics
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent.parent
+WORKING_DIR = SCRIPT_DIR.parent
+MANIFEST_FILE = WORKING_DIR / ".pipeline_manifest.json"
+
+FINAL_DATA_RAW = "WorkingFiles/FinalDataRaw"
+RAW_DATA = "WorkingFiles/RawData"
+DATA_FILES = "DataFiles"
+
+# Read by every script that loads the shared country registry (country_registry.registry())
+REGISTRY_INPUTS = [
+    f"{DATA_FILES}/countries.csv",
+    f"{DATA_FILES}/centroids.json",
+    f"{RAW_DATA}/country_aliases.csv",
+    f"{RAW_DATA}/country_regions.csv",
+]
+
+@dataclass
+class Stage:
+    """A pipeline step: paths are globs relative to the Data_Viz_Demo1 folder"""
+    name: str
+    script: str
+    inputs: list
+    outputs: list
+    modules: list = field(default_factory=list)
+    args: list = field(default_factory=list)
+    offline: bool = False  # not part of the default run
+
+    @property
+    def code(self):
+        return [self.script] + self.modules
+
+STAGES = [
+    Stage(
+        name="year_files",
+        script="process_complete_polio_dataset.py",
+        args=["--deltas"],
+        modules=["binning.py", "source_data.py", "create_case_counts_lookup.py", "year_deltas.py", "csv_core.py",
+                 "country_registry.py", "metrics.py"],
+        inputs=[
+            f"{FINAL_DATA_RAW}/number-of-estimated-paralytic-polio-cases-by-world-region.csv",
+            f"{DATA_FILES}/bins.csv",
+            *REGISTRY_INPUTS,
+        ],
+        outputs=[f"{DATA_FILES}/year_*.csv", f"{DATA_FILES}/year_deltas.json"],
+    ),
+    Stage(
+        name="year_bundle",
+        script="export_year_bundle.py",
+        modules=["binning.py", "metrics.py"],
+        inputs=[f"{DATA_FILES}/year_*.csv", f"{DATA_FILES}/bins.csv"],
+        outputs=[f"{DATA_FILES}/year_bins.bin"],
+    ),
+    Stage(
+        name="year_frames",
+        script="export_year_frames.py",
+        modules=["binning.py", "export_year_bundle.py", "create_case_counts_lookup.py", "source_data.py",
+                 "csv_core.py", "metrics.py"],
+        inputs=[f"{DATA_FILES}/year_bins.bin", f"{DATA_FILES}/case_counts.bin", f"{DATA_FILES}/bins.csv"],
+        outputs=[f"{DATA_FILES}/year_frames.bin"],
+    ),
+    Stage(
+        name="case_counts",
+        script="create_case_counts_lookup.py",
+        modules=["source_data.py", "csv_core.py", "metrics.py"],
+        inputs=[f"{FINAL_DATA_RAW}/number-of-estimated-paralytic-polio-cases-by-world-region.csv"],
+        outputs=[f"{DATA_FILES}/case_counts.bin", f"{DATA_FILES}/case_counts.json"],
+    ),
+    Stage(
+        name="case_stats",
+        script="export_case_stats.py",
+        modules=["create_case_counts_lookup.py", "country_registry.py", "csv_core.py", "metrics.py"],
+        inputs=[f"{DATA_FILES}/case_counts.bin"],
+        outputs=[f"{DATA_FILES}/case_stats.bin"],
+    ),
+    Stage(
+        name="regional_data",
+        script="prepare_regional_data.py",
+        modules=["regional_aggregation.py", "country_registry.py", "source_data.py", "csv_core.py", "metrics.py"],
+        inputs=[
+            f"{FINAL_DATA_RAW}/number-of-estimated-paralytic-polio-cases-by-world-region.csv",
+            f"{FINAL_DATA_RAW}/polio-vaccine-coverage-of-one-year-olds.csv",
+            *REGISTRY_INPUTS,
+        ],
+        outputs=[f"{DATA_FILES}/regional_*.csv"],
+    ),
+    Stage(
+        name="country_years",
+        script="export_country_years.py",
+        modules=["binning.py", "source_data.py", "create_case_counts_lookup.py", "export_year_bundle.py",
+                 "prepare_regional_data.py", "process_complete_polio_dataset.py", "regional_aggregation.py",
+                 "year_deltas.py", "country_registry.py", "csv_core.py", "metrics.py"],
+        inputs=[
+            f"{FINAL_DATA_RAW}/number-of-estimated-paralytic-polio-cases-by-world-region.csv",
+            f"{FINAL_DATA_RAW}/polio-vaccine-coverage-of-one-year-olds.csv",
+            f"{DATA_FILES}/bins.csv",
+            # Validated against these
+            f"{DATA_FILES}/year_*.csv",
+            f"{DATA_FILES}/case_counts.bin",
+        ],
+        outputs=[f"{DATA_FILES}/country_years.bin"],
+    ),
+    Stage(
+        name="centroids",
+        script="create_centroids.py",
+        modules=["shapefile_reader.py", "metrics.py"],
+        inputs=[f"{RAW_DATA}/ne_10m_admin_0_countries.*"],
+        outputs=[f"{DATA_FILES}/centroids.json"],
+    ),
+    Stage(
+        name="spatial_index",
+        script="build_spatial_index.py",
+        modules=["metrics.py"],
+        inputs=[f"{DATA_FILES}/centroids.json"],
+        outputs=[f"{DATA_FILES}/centroid_index.bin"],
+    ),
+    Stage(
+        name="textures",
+        script="build_texture_pyramid.py",
+        modules=["metrics.py"],
+        inputs=[
+            "Assets.xcassets/world_equirect.imageset/*.png",
+            "Assets.xcassets/polioimage*.imageset/*.png",
+            "Assets.xcassets/timelineimage*.imageset/*.png",
+        ],
+        outputs=["../Textures/*"],
+        offline=True,
+    ),
+    Stage(
+        name="timeline",
+        script="convert_timeline_to_json.py",
+        modules=["metrics.py"],
+        inputs=[f"{RAW_DATA}/polio_timeline.csv"],
+        outputs=[f"{DATA_FILES}/polio_timeline.json"],
+    ),
+    Stage(
+        name="timeline_categories",
+        script="convert_timeline_categories_to_json.py",
+        modules=["metrics.py"],
+        inputs=[f"{RAW_DATA}/polio_timeline_categories.csv"],
+        outputs=[f"{DATA_FILES}/polio_timeline_categories.json"],
+    ),
+]
+
+# MARK: - Hashing
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a single file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def expand(patterns, base):
+    """Resolve glob patterns to a sorted list of existing files"""
+    files = set()
+    for pattern in patterns:
+        files.update(p for p in base.glob(pattern) if p.is_file())
+    return sorted(files)
+
+def hash_files(patterns, base):
+    """Combined hash over every file matched by patterns (names and contents)"""
+    digest = hashlib.sha256()
+    for path in expand(patterns, base):
+        digest.update(str(path.relative_to(base)).encode())
+        digest.update(hash_file(path).encode())
+    return digest.hexdigest()
+
+def stage_fingerprint(stage):
+    """Hashes of a stage's inputs, code and current outputs (plus its arguments)"""
+    return {
+        'args': stage.args,
+        'inputs': hash_files(stage.inputs, DATA_DIR),
+        'code': hash_files(stage.code, SCRIPT_DIR),
+        'outputs': hash_files(stage.outputs, DATA_DIR),
+    }
+
+# MARK: - Manifest
+
+def load_manifest(path=MANIFEST_FILE):
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def is_stale(stage, manifest):
+    """A stage is stale if it never ran, or its inputs, code or outputs changed"""
+    recorded = manifest.get(stage.name)
+    if recorded is None:
+        return True
+    if not expand(stage.outputs, DATA_DIR):
+        return True
+    return recorded != stage_fingerprint(stage)
+
+# MARK: - Scheduling
+
+def dependencies(stages):
+    """Map stage name -> names of stages whose outputs it reads"""
+    deps = {}
+    for stage in stages:
+        deps[stage.name] = set()
+        for other in stages:
+            if other is stage:
+                continue
+            produced = set(expand(other.outputs, DATA_DIR)) | set(other.outputs)
+            consumed = set(expand(stage.inputs, DATA_DIR)) | set(stage.inputs)
+            if produced & consumed:
+                deps[stage.name].add(other.name)
+    return deps
+
+def schedule(stages):
+    """Group stages into waves that can run in parallel"""
+    deps = dependencies(stages)
+    done, waves = set(), []
+    remaining = {stage.name: stage for stage in stages}
+    while remaining:
+        wave = [s for name, s in remaining.items() if deps[name] <= done]
+        if not wave:
+            raise RuntimeError(f"Dependency cycle between stages: {sorted(remaining)}")
+        waves.append(wave)
+        for stage in wave:
+            done.add(stage.name)
+            del remaining[stage.name]
+    return waves
+
+def run_stage(stage, metrics_dir=None, profile=False):
+    """Run a stage script from the Scripts directory (the scripts use relative paths)"""
+    env = dict(os.environ)
+    if metrics_dir:
+        env[METRICS_DIR_ENV] = str(metrics_dir / stage.name)
+        if profile:
+            env[PROFILE_ENV] = '1'
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, stage.script, *stage.args],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    return result, time.perf_counter() - start
+
+# MARK: - Metrics
+
+def stage_metrics(stage, metrics_dir):
+    """The metrics a stage's script wrote, or None if it wrote none"""
+    path = metrics_dir / stage.name / f"{Path(stage.script).stem}.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def write_run_metrics(metrics_dir, records):
+    """pipeline.json: one entry per stage that ran, with its script's metrics"""
+    path = metrics_dir / "pipeline.json"
+    with open(path, 'w') as f:
+        json.dump({'started': metrics_dir.name, 'stages': records}, f, indent=2)
+    return path
+
+def print_run_metrics(records, top=10):
+    for record in records:
+        if record['metrics']:
+            print(f"\n{record['stage']} ({record['status']}, {record['wall_s']:.2f}s)")
+            print_metrics(record['metrics'])
+    # Sub-steps only: the per-script totals are listed above
+    steps = [(s['wall_s'], record['stage'], s['name'])
+             for record in records if record['metrics']
+             for depth, s in flatten(record['metrics']) if depth > 0]
+    if steps:
+        print(f"\nSlowest steps:")
+        for wall, stage, name in sorted(steps, reverse=True)[:top]:
+            print(f"  {wall:8.3f}s  {stage} / {name}")
+
+def run_pipeline(stages, force=False, dry_run=False, jobs=None, verbose=False, metrics_dir=None, profile=()):
+    """
+    Run stale stages wave by wave; returns the names of stages that failed.
+    With metrics_dir, each stage records metrics to metrics_dir/<stage>/ and
+    a combined pipeline.json is written; stages named in profile also dump
+    cProfile stats.
+    """
+    manifest = load_manifest()
+    failed, ran, records = [], [], []
+    selected = {stage.name for stage in stages}
+    deps = dependencies(STAGES)
+
+    for wave in schedule(STAGES):
+        wave = [s for s in wave if s.name in selected]
+        # Upstream failures poison everything that reads their outputs
+        blocked = [s for s in wave if deps[s.name] & set(failed)]
+        for stage in blocked:
+            print(f"  SKIP  {stage.name} (upstream failed)")
+            failed.append(stage.name)
+        wave = [s for s in wave if s not in blocked]
+
+        # Anything downstream of a stage that just ran is rebuilt too
+        stale = [s for s in wave if force or deps[s.name] & set(ran) or is_stale(s, manifest)]
+        for stage in wave:
+            if stage not in stale:
+                print(f"  OK    {stage.name} (up to date)")
+        if dry_run:
+            for stage in stale:
+                print(f"  RUN   {stage.name} (dry run)")
+                ran.append(stage.name)
+            continue
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(zip(stale, pool.map(
+                lambda s: run_stage(s, metrics_dir, s.name in profile), stale)))
+
+        for stage, (result, elapsed) in results:
+            if metrics_dir:
+                records.append({
+                    'stage': stage.name,
+                    'status': 'failed' if result.returncode else 'ok',
+                    'wall_s': round(elapsed, 6),
+                    'metrics': stage_metrics(stage, metrics_dir),
+                })
+            if result.returncode != 0:
+                print(f"  FAIL  {stage.name} ({elapsed:.2f}s)")
+                print(result.stdout + result.stderr)
+                failed.append(stage.name)
+                manifest.pop(stage.name, None)
+                continue
+            print(f"  RAN   {stage.name} ({elapsed:.2f}s)")
+            if verbose:
+                print(result.stdout)
+            manifest[stage.name] = stage_fingerprint(stage)
+            ran.append(stage.name)
+
+    if not dry_run:
+        save_manifest(manifest)
+    if metrics_dir and not dry_run:
+        print_run_metrics(records)
+        print(f"\nMetrics written to {write_run_metrics(metrics_dir, records)}")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the polio data pipeline incrementally")
+    parser.add_argument('stages', nargs='*', help="Stage names to consider (default: all)")
+    parser.add_argument('--force', action='store_true', help="Rerun stages even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="Only report which stages are stale")
+    parser.add_argument('--jobs', type=int, default=None, help="Max stages to run in parallel")
+    parser.add_argument('--verbose', action='store_true', help="Print each stage's output")
+    parser.add_argument('--list', action='store_true', help="List stages and exit")
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"Record timing, rows, bytes and memory per stage under {METRICS_ROOT.name}/")
+    parser.add_argument('--profile', action='append', default=[], metavar='STAGE',
+                        help="Also dump cProfile stats for STAGE (implies --metrics; repeatable)")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            print(f"{stage.name:20s} {stage.script}{'  (offline, run by name)' if stage.offline else ''}")
+        return
+
+    by_name = {stage.name: stage for stage in STAGES}
+    unknown = [name for name in args.stages + args.profile if name not in by_name]
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(unknown)}")
+    stages = [by_name[name] for name in args.stages] if args.stages else [s for s in STAGES if not s.offline]
+
+    metrics_dir = None
+    if args.metrics or args.profile:
+        metrics_dir = METRICS_ROOT / datetime.now().strftime('%Y%m%d-%H%M%S')
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    print("Running pipeline...")
+    failed = run_pipeline(stages, force=args.force, dry_run=args.dry_run,
+                          jobs=args.jobs, verbose=args.verbose,
+                          metrics_dir=metrics_dir, profile=set(args.profile))
+    print(f"\nPipeline finished in {time.perf_counter() - start:.2f}s")
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Minimal memory-mapped reader for ESRI shapefiles (.shp/.shx/.dbf).
+
+Only NumPy is needed. Each file is mapped with np.memmap and records are
+exposed as views into the mapping, so nothing is copied until a value is used:
+
+  ShapeFile   .shp geometry, indexed through .shx when it exists
+                (Point and Polygon/PolyLine records)
+  DbfTable    .dbf attributes as one structured view over all records
+
+Polygon helpers:
+
+  polygon_parts(record)        (parts, points) views for one polygon record
+  largest_part_centroid(...)   area-weighted centroid of the largest ring
+
+Usage:
+  python shapefile_reader.py ../RawData/ne_10m_admin_0_countries.dbf
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from metrics import run_main
+
+SHP_HEADER = struct.Struct('>7i')
+SHP_HEADER_SIZE = 100
+RECORD_HEADER = np.dtype([('number', '>i4'), ('length', '>i4')])
+SHX_ENTRY = np.dtype([('offset', '>i4'), ('length', '>i4')])
+FILE_CODE = 9994
+
+NULL_SHAPE = 0
+POINT = 1
+POLYLINE = 3
+POLYGON = 5
+SUPPORTED_TYPES = {NULL_SHAPE, POINT, POLYLINE, POLYGON}
+
+DBF_HEADER = struct.Struct('<BBBBIHH20x')
+DBF_FIELD = struct.Struct('<11sc4xBB14x')
+DBF_DELETED = ord('*')
+
+class ShapeFile:
+    """Geometry records of a .shp file, read through a memory map"""
+
+    def __init__(self, path):
+        self.path = Path(path).with_suffix('.shp')
+        self.raw = np.memmap(self.path, dtype=np.uint8, mode='r')
+        if len(self.raw) < SHP_HEADER_SIZE:
+            raise ValueError(f"{self.path} is too small to be a shapefile")
+        file_code = SHP_HEADER.unpack(self.raw[:SHP_HEADER.size].tobytes())[0]
+        if file_code != FILE_CODE:
+            raise ValueError(f"{self.path} has bad file code {file_code}")
+        self.shape_type = int(self.raw[32:36].view('<i4')[0])
+        if self.shape_type not in SUPPORTED_TYPES:
+            raise ValueError(f"{self.path}: shape type {self.shape_type} is not supported")
+        self.bbox = self.raw[36:68].view('<f8')
+        self.offsets, self.lengths = self._index()
+
+    def _index(self):
+        """Byte offset and content length of every record"""
+        shx = self.path.with_suffix('.shx')
+        if shx.exists():
+            entries = np.memmap(shx, dtype=np.uint8, mode='r')[SHP_HEADER_SIZE:].view(SHX_ENTRY)
+            # .shx offsets and lengths are in 16-bit words
+            return entries['offset'].astype(np.int64) * 2, entries['length'].astype(np.int64) * 2
+
+        # No index: walk the record headers once
+        offsets, lengths = [], []
+        position = SHP_HEADER_SIZE
+        while position + RECORD_HEADER.itemsize <= len(self.raw):
+            header = self.raw[position:position + RECORD_HEADER.itemsize].view(RECORD_HEADER)[0]
+            offsets.append(position)
+            lengths.append(int(header['length']) * 2)
+            position += RECORD_HEADER.itemsize + lengths[-1]
+        return np.array(offsets, dtype=np.int64), np.array(lengths, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def record(self, i):
+        """uint8 view of one record's content (after the 8-byte record header)"""
+        start = int(self.offsets[i]) + RECORD_HEADER.itemsize
+        end = start + int(self.lengths[i])
+        if end > len(self.raw):
+            raise ValueError(f"{self.path}: record {i} is truncated")
+        return self.raw[start:end]
+
+    def record_type(self, i):
+        return int(self.record(i)[:4].view('<i4')[0])
+
+    def point(self, i):
+        """(x, y) of a Point record, or None for a null shape"""
+        content = self.record(i)
+        if self.record_type(i) == NULL_SHAPE:
+            return None
+        x, y = content[4:20].view('<f8')
+        return float(x), float(y)
+
+    def points(self):
+        """(n, 2) array of every Point record; null shapes are NaN"""
+        if self.shape_type != POINT:
+            raise ValueError(f"{self.path} is not a point shapefile")
+        result = np.full((len(self), 2), np.nan)
+        for i in range(len(self)):
+            point = self.point(i)
+            if point is not None:
+                result[i] = point
+        return result
+
+    def parts(self, i):
+        """(parts, points) views of a Polygon/PolyLine record, or None for a null shape"""
+        if self.record_type(i) == NULL_SHAPE:
+            return None
+        return polygon_parts(self.record(i))
+
+def polygon_parts(content):
+    """
+    Decode one Polygon/PolyLine record without copying.
+    Returns (parts, points): part start indices (int32) and an (n, 2) float64 view.
+    """
+    num_parts, num_points = content[36:44].view('<i4')
+    parts_end = 44 + 4 * int(num_parts)
+    points_end = parts_end + 16 * int(num_points)
+    if points_end > len(content):
+        raise ValueError("Polygon record is shorter than its part and point counts")
+    parts = content[44:parts_end].view('<i4')
+    points = content[parts_end:points_end].view('<f8').reshape(-1, 2)
+    return parts, points
+
+def ring_moments(parts, points):
+    """
+    Signed area and first moments (shoelace terms) of every ring at once.
+    Returns (area, cx, cy) arrays with one entry per part.
+    """
+    x, y = points[:, 0], points[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    # Drop the terms that would join the last point of one ring to the next ring
+    starts = parts.astype(np.int64)
+    boundaries = starts[1:] - 1
+    cross[boundaries[boundaries < len(cross)]] = 0.0
+    sum_x = (x[:-1] + x[1:]) * cross
+    sum_y = (y[:-1] + y[1:]) * cross
+
+    # reduceat needs non-empty segments; rings always have at least 4 points
+    area = np.add.reduceat(cross, starts) / 2.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cx = np.add.reduceat(sum_x, starts) / (6.0 * area)
+        cy = np.add.reduceat(sum_y, starts) / (6.0 * area)
+    return area, cx, cy
+
+def largest_part_centroid(parts, points):
+    """Area-weighted centroid (x, y) of the ring with the largest area"""
+    if len(points) < 3:
+        return (float(points[:, 0].mean()), float(points[:, 1].mean())) if len(points) else None
+    area, cx, cy = ring_moments(parts, points)
+    largest = int(np.argmax(np.abs(area)))
+    if area[largest] == 0:
+        # Degenerate ring: fall back to the mean of its vertices
+        end = parts[largest + 1] if largest + 1 < len(parts) else len(points)
+        ring = points[parts[largest]:end]
+        return float(ring[:, 0].mean()), float(ring[:, 1].mean())
+    return float(cx[largest]), float(cy[largest])
+
+class DbfTable:
+    """dBASE III attribute table as one structured view over the mapped records"""
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = Path(path).with_suffix('.dbf')
+        self.encoding = encoding
+        raw = np.memmap(self.path, dtype=np.uint8, mode='r')
+        _, _, _, _, count, header_size, record_size = DBF_HEADER.unpack(raw[:DBF_HEADER.size].tobytes())
+
+        self.fields = []
+        names, formats, offsets = ['_deleted'], ['u1'], [0]
+        offset = 1
+        for position in range(DBF_HEADER.size, header_size - 1, DBF_FIELD.size):
+            descriptor = raw[position:position + DBF_FIELD.size].tobytes()
+            if descriptor[0] == 0x0D:
+                break
+            name, kind, length, decimals = DBF_FIELD.unpack(descriptor)
+            name = name.split(b'\0')[0].decode('ascii')
+            self.fields.append((name, kind.decode('ascii'), length, decimals))
+            names.append(name)
+            formats.append(f'S{length}')
+            offsets.append(offset)
+            offset += length
+
+        end = header_size + count * record_size
+        if end > len(raw):
+            raise ValueError(f"{self.path} is truncated ({len(raw)} < {end} bytes)")
+        dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': record_size})
+        self.records = raw[header_size:end].view(dtype)
+        self.kinds = {name: kind for name, kind, _, _ in self.fields}
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def deleted(self):
+        return self.records['_deleted'] == DBF_DELETED
+
+    def column(self, name):
+        """
+        Decode one column: N/F fields become float64 (blank = NaN),
+        everything else a list of stripped strings.
+        """
+        if name not in self.kinds:
+            raise KeyError(f"{self.path.name} has no field {name!r}")
+        values = self.records[name]
+        if self.kinds[name] in ('N', 'F'):
+            stripped = np.char.strip(values)
+            result = np.full(len(values), np.nan)
+            filled = stripped != b''
+            result[filled] = stripped[filled].astype(np.float64)
+            return result
+        return [v.decode(self.encoding, 'replace').strip().strip('\0') for v in values]
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    path = Path(sys.argv[1])
+    if path.with_suffix('.dbf').exists():
+        table = DbfTable(path)
+        print(f"{table.path.name}: {len(table)} records, {len(table.fields)} fields")
+    if path.with_suffix('.shp').exists():
+        shapes = ShapeFile(path)
+        print(f"{shapes.path.name}: {len(shapes)} records, shape type {shapes.shape_type}, "
+              f"bbox {np.round(shapes.bbox, 3).tolist()}")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Shared access to the OWID source CSVs through a typed columnar cache.
+
+Each source CSV is parsed once and stored as an uncompressed .npz in
+WorkingFiles/.cache, named after the source's resolved path and validated
+against the SHA-256 of its contents. Later reads load the arrays directly
+and skip CSV parsing and type inference.
+
+Column types in the returned DataFrame:
+  Entity, Code   categorical (missing Code stays NaN)
+  Year           int16
+  value columns  float32 when that is lossless for every value, else float64
+                 (values near bin edges must not shift bins)
+
+Usage:
+  python source_data.py            # warm the cache for all FinalDataRaw CSVs
+  python source_data.py --clear    # delete cached files
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics import run_main
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+FINAL_DATA_DIR = SCRIPT_DIR.parent / "FinalDataRaw"
+CACHE_DIR = SCRIPT_DIR.parent / ".cache"
+
+CASES_FILE = FINAL_DATA_DIR / "number-of-estimated-paralytic-polio-cases-by-world-region.csv"
+VACCINATION_FILE = FINAL_DATA_DIR / "polio-vaccine-coverage-of-one-year-olds.csv"
+
+CACHE_VERSION = 2
+CATEGORICAL_COLUMNS = ('Entity', 'Code')
+YEAR_COLUMN = 'Year'
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a source file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(source):
+    """Cache file for a source: its stem plus a hash of the resolved path, so
+    same-named CSVs in different directories never share an entry"""
+    source = Path(source).resolve()
+    path_key = hashlib.sha256(str(source).encode('utf-8')).hexdigest()[:12]
+    return CACHE_DIR / f"{source.stem}-{path_key}.npz"
+
+def parse_csv(source):
+    """Parse a source CSV into compact column types"""
+    # round_trip parses decimals exactly like float(); the default parser can be
+    # one ulp off for long fractions, which would disagree with the csv_core path
+    df = pd.read_csv(source, dtype={c: 'category' for c in CATEGORICAL_COLUMNS},
+                     float_precision='round_trip')
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            continue
+        if column == YEAR_COLUMN:
+            years = df[column].to_numpy()
+            if years.min() < np.iinfo(np.int16).min or years.max() > np.iinfo(np.int16).max:
+                raise ValueError(f"{source}: Year values do not fit in int16")
+            df[column] = years.astype(np.int16)
+        elif pd.api.types.is_float_dtype(df[column]) or pd.api.types.is_integer_dtype(df[column]):
+            values = df[column].to_numpy(dtype=np.float64)
+            narrow = values.astype(np.float32)
+            if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+                df[column] = narrow
+            else:
+                df[column] = values
+    return df
+
+def to_arrays(df, source_hash):
+    """Flatten a parsed DataFrame into plain arrays for np.savez"""
+    arrays = {}
+    columns = []
+    for i, column in enumerate(df.columns):
+        key = f"c{i}"
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            arrays[f"{key}_codes"] = df[column].cat.codes.to_numpy()
+            arrays[f"{key}_categories"] = df[column].cat.categories.to_numpy(dtype=str)
+            columns.append({'name': column, 'key': key, 'kind': 'category'})
+        else:
+            arrays[key] = df[column].to_numpy()
+            columns.append({'name': column, 'key': key, 'kind': 'values'})
+    meta = {'version': CACHE_VERSION, 'sha256': source_hash, 'rows': len(df), 'columns': columns}
+    arrays['meta'] = np.array(json.dumps(meta))
+    return arrays
+
+def from_arrays(npz):
+    """Rebuild the DataFrame from cached arrays"""
+    meta = json.loads(str(npz['meta']))
+    data = {}
+    for column in meta['columns']:
+        key = column['key']
+        if column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(
+                npz[f"{key}_codes"], categories=npz[f"{key}_categories"])
+        else:
+            data[column['name']] = npz[key]
+    return pd.DataFrame(data)
+
+def read_cached_meta(path):
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            return json.loads(str(npz['meta']))
+    except (OSError, ValueError, KeyError):
+        return None
+
+def write_cache(arrays, path):
+    """Write atomically so parallel pipeline stages never see a partial file"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+def read_source(source, use_cache=True):
+    """
+    Load a source CSV as a typed DataFrame, through the columnar cache.
+    The cache is rebuilt whenever the source file's hash changes.
+    """
+    source = Path(source)
+    if not use_cache:
+        return parse_csv(source)
+
+    source_hash = file_hash(source)
+    path = cache_path(source)
+    meta = read_cached_meta(path) if path.exists() else None
+    if meta and meta.get('version') == CACHE_VERSION and meta.get('sha256') == source_hash:
+        with np.load(path, allow_pickle=False) as npz:
+            return from_arrays(npz)
+
+    df = parse_csv(source)
+    write_cache(to_arrays(df, source_hash), path)
+    return df
+
+def clear_cache():
+    removed = 0
+    for path in CACHE_DIR.glob("*.npz"):
+        path.unlink()
+        removed += 1
+    return removed
+
+def main():
+    if '--clear' in sys.argv:
+        print(f"Removed {clear_cache()} cached files from {CACHE_DIR}")
+        return
+    for source in sorted(FINAL_DATA_DIR.glob("*.csv")):
+        df = read_source(source)
+        size = cache_path(source).stat().st_size
+        print(f"Cached {source.name}: {len(df)} rows, {size / 1024:.1f} KB")
+        print(f"  {', '.join(f'{c}:{t}' for c, t in df.dtypes.astype(str).items())}")
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Delta-encode the per-year {code: bin} snapshots.
+
+Every K-th year (in year order) is stored as a full keyframe; every other year
+only lists what changed since the previous year:
+
+  {
+    "version": 1,
+    "keyframe_interval": 5,
+    "years": [1980, 1981, ...],
+    "entries": [
+      {"year": 1980, "keyframe": {"AFG": 7, ...}},
+      {"year": 1981, "added": {"BEN": 2}, "changed": {"AFG": 6}, "removed": ["ALB"]},
+      ...
+    ]
+  }
+
+A client scrubbing to year Y starts from the nearest keyframe at or before Y
+and applies the deltas after it, touching only countries that change.
+
+Usage:
+  python year_deltas.py                # encode DataFiles/year_*.csv and verify
+  python year_deltas.py --verify       # only verify an existing year_deltas.json
+  python year_deltas.py --keyframe-interval 10
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from metrics import run_main, step
+
+# Define paths
+SCRIPT_DIR = Path(__file__).parent
+OUTPUT_DIR = SCRIPT_DIR.parent.parent / "DataFiles"
+DELTAS_FILE = OUTPUT_DIR / "year_deltas.json"
+
+VERSION = 1
+KEYFRAME_INTERVAL = 5
+
+def diff_years(previous, current):
+    """(added, changed, removed) between two {code: bin} snapshots"""
+    added = {code: b for code, b in current.items() if code not in previous}
+    changed = {code: b for code, b in current.items() if code in previous and previous[code] != b}
+    removed = sorted(code for code in previous if code not in current)
+    return added, changed, removed
+
+def encode_deltas(snapshots, keyframe_interval=KEYFRAME_INTERVAL):
+    """Encode {year: {code: bin}} into the keyframe + delta document"""
+    if keyframe_interval < 1:
+        raise ValueError("keyframe_interval must be at least 1")
+    years = sorted(snapshots)
+    entries = []
+    previous = None
+    for i, year in enumerate(years):
+        current = {code: int(b) for code, b in snapshots[year].items()}
+        if i % keyframe_interval == 0:
+            entries.append({'year': year, 'keyframe': current})
+        else:
+            added, changed, removed = diff_years(previous, current)
+            entry = {'year': year}
+            # Empty sections are omitted to keep unchanged years tiny
+            if added:
+                entry['added'] = added
+            if changed:
+                entry['changed'] = changed
+            if removed:
+                entry['removed'] = removed
+            entries.append(entry)
+        previous = current
+    return {'version': VERSION, 'keyframe_interval': keyframe_interval, 'years': years, 'entries': entries}
+
+def apply_entry(state, entry):
+    """Apply one entry to a {code: bin} state in place (a keyframe replaces it)"""
+    if 'keyframe' in entry:
+        state.clear()
+        state.update(entry['keyframe'])
+        return state
+    for code in entry.get('removed', []):
+        state.pop(code, None)
+    state.update(entry.get('added', {}))
+    state.update(entry.get('changed', {}))
+    return state
+
+def decode_deltas(doc):
+    """Rebuild every snapshot: {year: {code: bin}}"""
+    if doc.get('version') != VERSION:
+        raise ValueError(f"Unsupported deltas version {doc.get('version')}")
+    state, snapshots = {}, {}
+    for entry in doc['entries']:
+        snapshots[entry['year']] = dict(apply_entry(state, entry))
+    return snapshots
+
+def decode_year(doc, year):
+    """One snapshot, replaying only from the nearest keyframe at or before year"""
+    positions = {entry['year']: i for i, entry in enumerate(doc['entries'])}
+    if year not in positions:
+        raise KeyError(f"No entry for {year}")
+    start = positions[year]
+    while 'keyframe' not in doc['entries'][start]:
+        start -= 1
+    state = {}
+    for entry in doc['entries'][start:positions[year] + 1]:
+        apply_entry(state, entry)
+    return state
+
+def verify_deltas(doc, snapshots):
+    """Round-trip check against the full snapshots; returns a list of errors"""
+    errors = []
+    if doc['years'] != sorted(snapshots):
+        errors.append(f"Year mismatch: snapshots {sorted(snapshots)} vs deltas {doc['years']}")
+    decoded = decode_deltas(doc)
+    for year in sorted(snapshots):
+        expected = {code: int(b) for code, b in snapshots[year].items()}
+        if decoded.get(year) != expected:
+            errors.append(f"{year}: sequential decode differs from year_{year}.csv")
+        elif decode_year(doc, year) != expected:
+            errors.append(f"{year}: decode from keyframe differs from year_{year}.csv")
+    return errors
+
+def delta_stats(doc):
+    """Entries stored vs entries a full snapshot per year would need"""
+    stored = full = 0
+    state = {}
+    for entry in doc['entries']:
+        stored += len(entry.get('keyframe', {})) + len(entry.get('added', {})) \
+            + len(entry.get('changed', {})) + len(entry.get('removed', []))
+        full += len(apply_entry(state, entry))
+    return stored, full
+
+def write_deltas(doc, path=DELTAS_FILE):
+    """Minified JSON (no whitespace)"""
+    with open(path, 'w') as f:
+        json.dump(doc, f, separators=(',', ':'))
+
+def load_deltas(path=DELTAS_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+def export_deltas(snapshots, keyframe_interval=KEYFRAME_INTERVAL, path=DELTAS_FILE):
+    """Encode, verify and write; raises ValueError if the round trip fails"""
+    doc = encode_deltas(snapshots, keyframe_interval)
+    errors = verify_deltas(doc, snapshots)
+    if errors:
+        raise ValueError("Delta round trip failed: " + "; ".join(errors[:5]))
+    write_deltas(doc, path)
+    return doc
+
+def main():
+    from export_year_bundle import load_year_files
+
+    parser = argparse.ArgumentParser(description="Delta-encode the year files")
+    parser.add_argument('--keyframe-interval', type=int, default=KEYFRAME_INTERVAL,
+                        help=f"Store a full snapshot every K years (default {KEYFRAME_INTERVAL})")
+    parser.add_argument('--verify', action='store_true', help="Only verify an existing year_deltas.json")
+    args = parser.parse_args()
+
+    with step('load') as s:
+        snapshots = load_year_files(OUTPUT_DIR)
+        s.record_read(*OUTPUT_DIR.glob("year_*.csv"))
+        s.rows_out = sum(len(snapshot) for snapshot in snapshots.values())
+    if args.verify:
+        doc = load_deltas()
+    else:
+        with step('encode', rows_in=s.rows_out) as s:
+            doc = encode_deltas(snapshots, args.keyframe_interval)
+            s.rows_out = delta_stats(doc)[0]
+        with step('write') as s:
+            write_deltas(doc)
+            s.record_write(DELTAS_FILE)
+        stored, full = delta_stats(doc)
+        csv_bytes = sum(p.stat().st_size for p in OUTPUT_DIR.glob("year_*.csv"))
+        print(f"Encoded {len(doc['years'])} years (keyframe every {doc['keyframe_interval']})")
+        print(f"Entries: {stored} stored vs {full} in full snapshots ({stored / max(full, 1):.0%})")
+        print(f"File size: {DELTAS_FILE.stat().st_size / 1024:.1f} KB (year CSVs: {csv_bytes / 1024:.1f} KB)")
+
+    with step('verify'):
+        errors = verify_deltas(doc, snapshots)
+    if errors:
+        print("\n❌ Delta verification failed:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Deltas round-trip to the year files")
+
+if __name__ == "__main__":
+    run_main(main)